@@ -0,0 +1,136 @@
+# Chat list walk benchmark: the old get_group_names loop (eight Keys.DOWN per step with fixed sleeps, reading
+# every visible title and its status ring one WebDriver call at a time, until a step reads the same chats as the
+# one before) against VirtualListScroller, on a fake chat list of 100 to 10k chats. Both run against the same fake,
+# so the report counts the WebDriver commands and steps each needs and models the browser side: the old loop's
+# fixed sleeps, a DOM_SETTLED wait of at least its quiet period per scroller step and --latency per command.
+#
+#   python bench/bench_chat_list.py
+#   python bench/bench_chat_list.py --chats 1000 --latency 0.005
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import main
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+from tests.fake_driver import FakeChatListDriver, make_scraper
+
+
+class KeyboardChatList(FakeChatListDriver):
+    # the focused chat moves one row per Keys.DOWN and the list scrolls to keep it in view
+    def __init__(self, members) -> None:
+        super().__init__(members)
+        self.focus = 0
+
+    def typed(self, locator, keys):
+        for key in keys:
+            if key==Keys.DOWN:
+                self.focus = min(self.focus + 1, len(self.members) - 1)
+                bottom = (self.focus + 1)*self.row_height
+                if bottom>self.scroll_top + self.viewport:
+                    self.scroll_to(bottom - self.viewport)
+
+
+def chats(count):
+    # every third chat is a normal chat, the others are groups
+    return [(f"Chat {i}", i%3==0) for i in range(count)]
+
+
+def old_group_names(browser, sleep):
+    # get_group_names and _get_group_names from before VirtualListScroller, the waits go through sleep
+    def visible_chats():
+        chat_names = []
+        group_names = []
+        for el in browser.find_elements(By.XPATH, "//div[@id='pane-side']//div[@aria-label='Chat list']//div[@role='listitem']//div[@data-testid='cell-frame-container']//div[@data-testid='cell-frame-title']//span"):
+            chat_names.append(el.text)
+            is_normal_chat = browser.execute_script("""return (arguments[0].parentElement.parentElement.parentElement.parentElement.querySelector("div[data-testid='chatlist-status-v3-ring']")!=null);""", el)
+            if not is_normal_chat:
+                group_names.append(el.text)
+        return (list(set(chat_names)), list(set(group_names)))
+
+    steps = 0
+    chat_names1, group_names = visible_chats()
+    browser.find_element(By.XPATH, "//div[@data-testid='chat-list']").click()
+    el = browser.find_element(By.XPATH, "//body")
+    for _ in range(5):
+        el.send_keys(Keys.TAB)
+    chat_names2 = []
+    while True:
+        for _ in range(0, 8):
+            el.send_keys(Keys.DOWN)
+            sleep(0.03)
+        sleep(0.15)
+        steps += 1
+        chat_names1, group_names1 = visible_chats()
+        if chat_names1!=chat_names2:
+            chat_names2 = chat_names1
+            group_names += group_names1
+        else:
+            break
+    return sorted(set(group_names)), steps
+
+
+def run_old(count):
+    driver = KeyboardChatList(chats(count))
+    slept = []
+    started = time.perf_counter()
+    group_names, steps = old_group_names(driver, slept.append)
+    return group_names, steps, driver, time.perf_counter() - started, sum(slept)
+
+
+def run_scroller(count):
+    driver = FakeChatListDriver(chats(count))
+    with tempfile.TemporaryDirectory() as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                scraper = make_scraper(driver, workdir)
+                started = time.perf_counter()
+                group_names = scraper.get_group_names(delta=False)
+                elapsed = time.perf_counter() - started
+        finally:
+            os.chdir(cwd)
+    steps = driver.calls["executeAsyncScript"]
+    # every settle wait lasts at least its quiet period in a real browser
+    return sorted(group_names), steps, driver, elapsed, steps*0.05
+
+
+METHODS = {"keys-down": run_old, "scroller": run_scroller}
+
+
+def run(counts, methods, latency):
+    report = []
+    for count in counts:
+        expected = sorted(title for title, is_normal in chats(count) if not is_normal)
+        for method in methods:
+            group_names, steps, driver, elapsed, waits = METHODS[method](count)
+            modeled = elapsed + waits + driver.commands*latency
+            report.append({
+                "method": method, "chats": count, "groups_found": len(group_names), "groups_missed": len(set(expected) - set(group_names)),
+                "steps": steps, "commands": driver.commands, "seconds": elapsed, "waits": waits, "modeled_seconds": modeled,
+            })
+            print(f"{method:<10}{count:>7} chats {len(group_names):>6} groups ({report[-1]['groups_missed']} missed) {steps:>5} steps "
+                  f"{driver.commands:>7} cmds  {elapsed:7.3f}s run + {waits:7.2f}s waits = {modeled:8.2f}s modeled", flush=True)
+    return report
+
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(description="Compare the Keys.DOWN chat list walk with VirtualListScroller")
+    parser.add_argument("--chats", type=int, nargs="+", default=[100, 1000, 10000], help="Chats in the fake chat list")
+    parser.add_argument("--methods", nargs="+", choices=list(METHODS), default=list(METHODS), help="Walks to compare")
+    parser.add_argument("--latency", type=float, default=0.002, help="Modeled seconds per WebDriver command")
+    parser.add_argument("--json", help="Write the report to this JSON file")
+    args = parser.parse_args()
+    report = run(args.chats, args.methods, args.latency)
+    if args.json:
+        with open(args.json, "w", encoding="UTF-8") as fp:
+            json.dump(report, fp, indent=2)
@@ -0,0 +1,127 @@
+# Contact index benchmark: 1M synthetic memberships spread over groups that share part of their members.
+# Times e164_mobiles over every raw mobile, building data/contacts.sqlite3 group by group, find_contact and
+# shared_contacts, against answering the same lookup the way it was done before the index: re-reading every
+# group's excel export with pandas.
+#
+#   python bench/bench_contact_index.py
+#   python bench/bench_contact_index.py --rows 100000 --groups 50 --lookups 1000
+import argparse
+import contextlib
+import io
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import main
+
+
+def synthetic_groups(rows, groups, seed=0):
+    # members are drawn from a pool half the size of the memberships, so most numbers are in several groups
+    rng = random.Random(seed)
+    pool = max(1, rows//2)
+    per_group = rows//groups
+    result = {}
+    for g in range(groups):
+        ids = rng.sample(range(pool), min(per_group, pool))
+        result[f"Group {g}"] = [(f"Member {i}", f"+91 9{i:09d}") for i in ids]
+    return result
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def write_exports(groups, data_dir):
+    # the per group excel files the scraper saves, written with openpyxl's streaming writer to keep set up short
+    from openpyxl import Workbook
+    for title, members in groups.items():
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet(title)
+        sheet.append(["Name", "Mobile"])
+        for row in members:
+            sheet.append(row)
+        workbook.save(str(Path(data_dir) / f"{title}.xlsx"))
+
+
+def find_in_exports(data_dir, mobile):
+    # the lookup without the index: read every export and match the normalized mobiles
+    import pandas as pd
+    mobile = main.e164_mobiles([mobile])[0]
+    found = []
+    for path in sorted(Path(data_dir).glob("*.xlsx")):
+        df = pd.read_excel(path, dtype=str, engine="openpyxl")
+        for name, e164 in zip(df["Name"], main.e164_mobiles(df["Mobile"])):
+            if e164==mobile:
+                found.append((path.stem, name))
+    return found
+
+
+def run(rows, groups, lookups, excel=True):
+    report = {"rows": rows, "groups": groups}
+    data = synthetic_groups(rows, groups)
+    raw = [mobile for members in data.values() for _, mobile in members]
+    report["memberships"] = len(raw)
+
+    _, report["e164_seconds"] = timed(main.e164_mobiles, raw)
+    print(f"e164_mobiles       {len(raw):>9} mobiles {report['e164_seconds']:8.3f}s {len(raw)/report['e164_seconds']:>12,.0f} mobiles/s", flush=True)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        contact_index = main.ContactIndex(Path(data_dir) / "contacts.sqlite3")
+        try:
+            started = time.perf_counter()
+            for title, members in data.items():
+                contact_index.save_group(title, [name for name, _ in members], [mobile for _, mobile in members], len(members))
+            report["index_build_seconds"] = time.perf_counter() - started
+            stats = contact_index.stats()
+            print(f"index build        {stats['memberships']:>9} memberships {report['index_build_seconds']:8.3f}s, {stats['contacts']} contacts in {stats['groups']} groups "
+                  f"(e164_mobiles is {report['e164_seconds']/report['index_build_seconds']:.0%} of it)", flush=True)
+
+            rng = random.Random(1)
+            # numbers that are in at least one group
+            numbers = [rng.choice(raw) for _ in range(lookups)]
+            latencies = []
+            for mobile in numbers:
+                _, elapsed = timed(contact_index.find_contact, mobile)
+                latencies.append(elapsed)
+            latencies.sort()
+            report["find_contact_median_ms"] = statistics.median(latencies)*1000
+            report["find_contact_p99_ms"] = latencies[int(len(latencies)*0.99) - 1]*1000
+            print(f"find_contact       {lookups:>9} lookups median {report['find_contact_median_ms']:.3f}ms p99 {report['find_contact_p99_ms']:.3f}ms", flush=True)
+
+            expected = [group_name for group_name, _, _ in contact_index.find_contact(numbers[0])]
+            shared, report["shared_contacts_seconds"] = timed(contact_index.shared_contacts, 2)
+            print(f"shared_contacts(2) {len(shared):>9} numbers {report['shared_contacts_seconds']:8.3f}s", flush=True)
+        finally:
+            contact_index.close()
+
+        if excel:
+            with contextlib.redirect_stdout(io.StringIO()):
+                _, report["excel_write_seconds"] = timed(write_exports, data, data_dir)
+            found, report["excel_lookup_seconds"] = timed(find_in_exports, data_dir, numbers[0])
+            if sorted(group_name for group_name, _ in found)!=expected:
+                raise Exception(f"the exports list {numbers[0]} in {len(found)} groups, the index in {len(expected)}")
+            print(f"re-read xlsx       {groups:>9} files   {report['excel_lookup_seconds']:8.3f}s per lookup "
+                  f"({report['excel_lookup_seconds']*1000/report['find_contact_median_ms']:,.0f}x find_contact), {len(found)} groups found", flush=True)
+    return report
+
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the contact index on synthetic memberships")
+    parser.add_argument("--rows", type=int, default=1000000, help="Memberships over all groups")
+    parser.add_argument("--groups", type=int, default=200, help="Number of groups")
+    parser.add_argument("--lookups", type=int, default=1000, help="find_contact calls timed")
+    parser.add_argument("--no-excel", action="store_true", help="Skip the re-read xlsx baseline (needs pandas and openpyxl)")
+    parser.add_argument("--json", help="Write the report to this JSON file")
+    args = parser.parse_args()
+    report = run(args.rows, args.groups, args.lookups, excel=not args.no_excel)
+    if args.json:
+        with open(args.json, "w", encoding="UTF-8") as fp:
+            json.dump(report, fp, indent=2)
@@ -0,0 +1,78 @@
+# Participant dedup benchmark: the rows a popup scroll reads, overlapping windows of a group of 1k to 100k
+# members, deduplicated by Participants (a dict keyed by normalized mobile) against the list membership checks
+# get_names_mobile used before it (`mobile not in mobiles`, `name not in names`), which grow with the group.
+#
+#   python bench/bench_participants.py
+#   python bench/bench_participants.py --sizes 1000 10000 --window 14 --step 8
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import main
+from tests.fake_driver import synthetic_members
+
+
+def scrolled_rows(members, window, step):
+    # each step reads the rendered window, so most rows are read more than once
+    rows = []
+    for first in range(0, len(members), step):
+        rows += members[first:first + window]
+    return rows
+
+
+def list_dedup(rows):
+    # the loop from get_names_mobile before Participants
+    names = []
+    mobiles = []
+    for name, mobile in rows:
+        if mobile is not None:
+            if mobile not in mobiles or (name is not None and name not in names):
+                names.append(name)
+                mobiles.append(mobile)
+        elif name is not None and name not in names:
+            names.append(name)
+            mobiles.append("")
+    return names, mobiles
+
+
+def participants_dedup(rows):
+    participants = main.Participants()
+    participants.extend(rows)
+    return participants.names_mobiles()
+
+
+METHODS = {"list": list_dedup, "participants": participants_dedup}
+
+
+def run(sizes, methods, window, step):
+    report = []
+    for size in sizes:
+        members = synthetic_members(size)
+        rows = scrolled_rows(members, window, step)
+        for method in methods:
+            started = time.perf_counter()
+            names, mobiles = METHODS[method](rows)
+            elapsed = time.perf_counter() - started
+            if list(zip(names, mobiles))!=members:
+                raise Exception(f"{method} kept {len(names)} of {size} members")
+            report.append({"method": method, "members": size, "rows": len(rows), "seconds": elapsed})
+            print(f"{method:<14}{size:>8} members {len(rows):>8} rows read {elapsed:10.4f}s {len(rows)/max(elapsed, 1e-9):>14,.0f} rows/s", flush=True)
+    return report
+
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(description="Compare Participants with the old list dedup")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Members per synthetic group")
+    parser.add_argument("--methods", nargs="+", choices=list(METHODS), default=list(METHODS), help="Dedup methods to compare")
+    parser.add_argument("--window", type=int, default=14, help="Rows rendered per scroll step")
+    parser.add_argument("--step", type=int, default=8, help="Rows scrolled per step")
+    parser.add_argument("--json", help="Write the report to this JSON file")
+    args = parser.parse_args()
+    report = run(args.sizes, args.methods, args.window, args.step)
+    if args.json:
+        with open(args.json, "w", encoding="UTF-8") as fp:
+            json.dump(report, fp, indent=2)
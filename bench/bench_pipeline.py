@@ -0,0 +1,139 @@
+# Synthetic pipeline benchmark: one group of 10 to 100k participants per run, scraped by the real
+# WhatsAppScraper.parse_and_save against tests/fake_driver.FakePopupDriver. Reports per stage the wall time,
+# the WebDriver commands sent and the peak traced memory. The streaming formats (csv, jsonl, parquet) write each
+# row while it is extracted, their export stage is only the final flush and file swap; bench/bench_sinks.py
+# compares the sinks on their own.
+#
+#   python bench/bench_pipeline.py
+#   python bench/bench_pipeline.py --sizes 1000 100000 --modes incremental --formats csv xlsx
+import argparse
+import contextlib
+import functools
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import main
+from tests.fake_driver import FakePopupDriver, make_scraper, synthetic_members
+
+
+STAGES = ("group", "extract", "export", "index")
+MODES = {
+    "incremental": dict(incremental=True),
+    "full-parse": dict(incremental=False),
+    "full-parse-lxml": dict(incremental=False, parser="lxml"),
+    "full-parse-subtree": dict(incremental=False, parser="subtree"),
+}
+
+
+class StageProbe:
+    # wraps a callable as a stage, nested stages report their own peak and pass it on to the enclosing stage
+    def __init__(self, driver, trace) -> None:
+        self.driver = driver
+        self.trace = trace
+        self.results = {}
+        self.peaks = []
+
+    def wrap(self, name, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            commands = self.driver.commands
+            base = 0
+            if self.trace:
+                base = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+            self.peaks.append(0)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                peak = self.peaks.pop()
+                if self.trace:
+                    peak = max(peak, tracemalloc.get_traced_memory()[1])
+                    tracemalloc.reset_peak()
+                if len(self.peaks)>0:
+                    self.peaks[-1] = max(self.peaks[-1], peak)
+                result = self.results.setdefault(name, {"seconds": 0.0, "commands": 0, "peak_bytes": 0})
+                result["seconds"] += elapsed
+                result["commands"] += self.driver.commands - commands
+                result["peak_bytes"] = max(result["peak_bytes"], peak - base)
+        return wrapper
+
+
+def run_group(size, mode, trace, output_format="csv"):
+    with tempfile.TemporaryDirectory() as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            driver = FakePopupDriver(synthetic_members(size))
+            with contextlib.redirect_stdout(io.StringIO()):
+                scraper = make_scraper(driver, workdir, contact_index=True, output_format=output_format, **MODES[mode])
+            probe = StageProbe(driver, trace)
+            scraper.get_names_mobile = probe.wrap("extract", scraper.get_names_mobile)
+            scraper.sink.end_group = probe.wrap("export", scraper.sink.end_group)
+            # the workbook format saves its sheets on close
+            close_sink = probe.wrap("export", scraper.sink.close)
+            scraper.contact_index.save_group = probe.wrap("index", scraper.contact_index.save_group)
+            parse_and_save = probe.wrap("group", scraper.parse_and_save)
+            if trace:
+                tracemalloc.start()
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    saved = parse_and_save(f"Group {size}")
+                    close_sink()
+            finally:
+                if trace:
+                    tracemalloc.stop()
+                scraper.contact_index.close()
+            if not saved or scraper.participants_saved!=size:
+                raise Exception(f"{mode} saved {scraper.participants_saved} of {size} participants")
+            return probe.results, dict(driver.calls)
+        finally:
+            os.chdir(cwd)
+
+
+def run(sizes, modes, memory=True, formats=("csv",)):
+    report = []
+    for output_format in formats:
+        for mode in modes:
+            for size in sizes:
+                # wall times come from an untraced run, tracemalloc slows the traced one down
+                timings, calls = run_group(size, mode, trace=False, output_format=output_format)
+                if memory:
+                    peaks, _ = run_group(size, mode, trace=True, output_format=output_format)
+                    for stage, result in timings.items():
+                        result["peak_bytes"] = peaks[stage]["peak_bytes"]
+                report.append({"format": output_format, "mode": mode, "members": size, "stages": timings, "calls": calls})
+                print_row(report[-1])
+    return report
+
+
+def print_row(entry):
+    cells = []
+    for stage in STAGES:
+        result = entry["stages"].get(stage)
+        if result is not None:
+            cells.append(f"{stage} {result['seconds']:8.3f}s {result['commands']:6d} cmds {result['peak_bytes']/1024/1024:7.2f} MiB")
+    print(f"{entry['format']:<10}{entry['mode']:<20}{entry['members']:>8}  " + " | ".join(cells), flush=True)
+
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the scraping pipeline on synthetic groups")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000, 100000], help="Participants per synthetic group")
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES), help="Popup extraction modes to compare")
+    parser.add_argument("--formats", nargs="+", choices=list(main.OUTPUT_FORMATS), default=["csv"], help="Output formats to compare")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc run")
+    parser.add_argument("--json", help="Write the report to this JSON file")
+    args = parser.parse_args()
+    report = run(args.sizes, args.modes, memory=not args.no_memory, formats=args.formats)
+    if args.json:
+        with open(args.json, "w", encoding="UTF-8") as fp:
+            json.dump(report, fp, indent=2)
@@ -0,0 +1,89 @@
+# Export sink benchmark: writes one synthetic group of 100k participants through each output format's sink
+# (start_group, a write per row, end_group, close) in its own process and reports the write time, the file size
+# and the peak RSS of that process, before and after writing.
+#
+#   python bench/bench_sinks.py
+#   python bench/bench_sinks.py --rows 1000000 --formats csv parquet
+import argparse
+import contextlib
+import io
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import main
+from tests.fake_driver import synthetic_members
+
+
+# the module each format needs on top of the standard library
+REQUIRES = {"xlsx": "pandas", "parquet": "pyarrow", "workbook": "openpyxl"}
+
+
+def peak_rss():
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss*1024
+
+
+def write_group(output_format, rows):
+    # runs in a fresh process, so the peak RSS belongs to this format only
+    members = synthetic_members(rows)
+    with tempfile.TemporaryDirectory() as data_dir:
+        with contextlib.redirect_stdout(io.StringIO()):
+            sink = main.OUTPUT_FORMATS[output_format](data_dir)
+            if output_format in REQUIRES:
+                __import__(REQUIRES[output_format])
+            baseline = peak_rss()
+            started = time.perf_counter()
+            sink.start_group("Group", "Group")
+            for name, mobile in members:
+                sink.write(name, mobile)
+            sink.end_group()
+            sink.close()
+            elapsed = time.perf_counter() - started
+        size = sum(path.stat().st_size for path in Path(data_dir).iterdir())
+    return {"format": output_format, "rows": rows, "seconds": elapsed, "bytes": size, "baseline_rss": baseline, "peak_rss": peak_rss()}
+
+
+def run(rows, formats):
+    report = []
+    for output_format in formats:
+        try:
+            __import__(REQUIRES.get(output_format, "csv"))
+        except ImportError:
+            print(f"{output_format:<10}skipped, {REQUIRES[output_format]} is not installed", flush=True)
+            continue
+        out = subprocess.run([sys.executable, __file__, "--child", output_format, "--rows", str(rows)], capture_output=True, text=True, check=True).stdout
+        report.append(json.loads(out))
+        print_row(report[-1])
+    return report
+
+
+def print_row(entry):
+    mib = 1024*1024
+    print(
+        f"{entry['format']:<10}{entry['rows']:>9} rows {entry['seconds']:8.3f}s {entry['rows']/entry['seconds']:>10,.0f} rows/s "
+        f"{entry['bytes']/mib:8.2f} MiB file  peak RSS {entry['peak_rss']/mib:8.1f} MiB (+{(entry['peak_rss'] - entry['baseline_rss'])/mib:.1f} MiB writing)",
+        flush=True,
+    )
+
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the export sinks on one synthetic group")
+    parser.add_argument("--rows", type=int, default=100000, help="Participants in the synthetic group")
+    parser.add_argument("--formats", nargs="+", choices=list(main.OUTPUT_FORMATS), default=list(main.OUTPUT_FORMATS), help="Output formats to compare")
+    parser.add_argument("--child", choices=list(main.OUTPUT_FORMATS), help=argparse.SUPPRESS)
+    parser.add_argument("--json", help="Write the report to this JSON file")
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(write_group(args.child, args.rows)))
+        sys.exit(0)
+    report = run(args.rows, args.formats)
+    if args.json:
+        with open(args.json, "w", encoding="UTF-8") as fp:
+            json.dump(report, fp, indent=2)
@@ -0,0 +1,88 @@
+# Selenium vs CDP backend: walks the virtualized participants popup of bench/virtual_list.html with
+# VirtualListScroller once per backend and reports wall time, rows/sec, WebDriver commands and CDP round trips.
+# Needs Chrome with a matching chromedriver on PATH (or Selenium Manager), plus trio and trio-websocket for cdp.
+#
+#   python bench/compare_backends.py --members 1000 10000
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+
+import main
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+
+def launch(headless=True):
+    options = Options()
+    if headless:
+        options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--remote-allow-origins=*")
+    return webdriver.Chrome(options=options)
+
+
+def walk(backend, members, headless=True):
+    browser = launch(headless)
+    metrics = main.Metrics(".")
+    with contextlib.redirect_stdout(io.StringIO()):
+        scraper = main.WhatsAppScraper(batch={}, use_cache=False, contact_index=False, metrics=metrics, backend=backend)
+    scraper.browser = browser
+    try:
+        browser.get((BENCH_DIR / "virtual_list.html").absolute().as_uri() + f"?members={members}")
+        main.WebDriverWait(browser, 10).until(main.EC.presence_of_element_located((main.By.CSS_SELECTOR, main.POPUP_LISTITEM_SELECTOR)))
+        metrics.instrument(browser)
+        if backend=="cdp":
+            scraper.connect_cdp()
+            if scraper.cdp is None:
+                raise Exception("The CDP backend couldn't connect")
+        scroller = main.VirtualListScroller(scraper, "popup", main.POPUP_LISTITEM_SELECTOR, main.POPUP_FIELDS, main.POPUP_CONTAINER_SELECTOR)
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            rows = sum(len(rows) for rows in scroller.walk())
+        elapsed = time.perf_counter() - started
+        if rows!=members:
+            raise Exception(f"{backend} walked {rows} of {members} rows")
+        return {
+            "backend": backend,
+            "members": members,
+            "seconds": elapsed,
+            "rows_per_sec": rows/elapsed if elapsed>0 else 0.0,
+            "steps": scroller.steps,
+            "webdriver_commands": sum(metrics.webdriver_commands.values()),
+            "cdp_commands": metrics.counters.get("cdp_commands", 0),
+            "cdp_round_trips": metrics.counters.get("cdp_round_trips", 0),
+        }
+    finally:
+        if scraper.cdp is not None:
+            scraper.cdp.close()
+        browser.quit()
+
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(description="Compare the selenium and cdp backends on a local virtual list")
+    parser.add_argument("--members", type=int, nargs="+", default=[1000, 10000], help="Rows of the virtual list")
+    parser.add_argument("--backends", nargs="+", choices=main.BROWSER_BACKENDS, default=main.BROWSER_BACKENDS, help="Backends to compare")
+    parser.add_argument("--visible", action="store_true", help="Run Chrome with a window")
+    args = parser.parse_args()
+    workdir = tempfile.mkdtemp()
+    shutil.copy(BENCH_DIR.parent / "settings.config", Path(workdir) / "settings.config")
+    os.chdir(workdir)
+    try:
+        for members in args.members:
+            for backend in args.backends:
+                result = walk(backend, members, headless=not args.visible)
+                print(f"{backend:<10}{members:>8} rows  {result['seconds']:8.2f}s  {result['rows_per_sec']:9.1f} rows/sec  {result['steps']:6d} steps  "
+                      f"{result['webdriver_commands']:6d} webdriver cmds  {result['cdp_commands']:6d} cdp cmds  {result['cdp_round_trips']:6d} cdp round trips", flush=True)
+    finally:
+        os.chdir(BENCH_DIR.parent)
+        shutil.rmtree(workdir, ignore_errors=True)
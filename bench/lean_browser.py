@@ -0,0 +1,159 @@
+# Plain vs --lean browser: loads a local fixture page full of avatars, icons, a web font and a video from a
+# local HTTP server, scrolls it to the bottom and reports per mode the requests the server received by kind
+# (so the ones the lean mode blocked), the wall time and the RSS of each Chrome instance's process tree.
+# Needs Chrome with a matching chromedriver on PATH (or Selenium Manager) and psutil.
+#
+#   python bench/lean_browser.py --rows 200 --instances 2
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+
+import main
+import psutil
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+
+# a 1x1 transparent png
+PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000001e221bc330000000049454e44ae426082"
+)
+CONTENT_TYPES = {
+    ".html": "text/html; charset=UTF-8",
+    ".png": "image/png",
+    ".svg": "image/svg+xml",
+    ".woff2": "font/woff2",
+    ".mp4": "video/mp4",
+}
+
+
+def fixture_page(rows):
+    items = "".join(
+        f'<div role="listitem"><img src="/avatars/{i}.png" width="49" height="49">'
+        f'<img src="/icons/{i % 20}.svg" width="16" height="16"><span>Member {i}</span></div>'
+        for i in range(rows)
+    )
+    return (
+        '<html><head><title>WhatsApp</title><style>@font-face { font-family: "Fixture"; src: url("/fonts/fixture.woff2"); } '
+        'body { font-family: "Fixture"; } [role=listitem] { height: 72px; transition: opacity .3s; }</style></head>'
+        f'<body><video src="/media/clip.mp4" autoplay muted></video><div role="list">{items}</div></body></html>'
+    )
+
+
+def make_fixture_handler(rows, requests):
+    page = fixture_page(rows).encode("UTF-8")
+
+    class FixtureHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            kind = Path(path).suffix or ".html"
+            requests[kind] += 1
+            body = page if kind==".html" else PNG if kind==".png" else b'<svg xmlns="http://www.w3.org/2000/svg"/>' if kind==".svg" else b"\0"*1024
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPES.get(kind, "application/octet-stream"))
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FixtureHandler
+
+
+def launch(lean, headless=True):
+    # the options WhatsAppScraper.launch_browser adds for --lean, on top of a bare headless Chrome
+    options = Options()
+    if headless:
+        options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    if lean:
+        for argument in main.LEAN_CHROME_ARGS:
+            options.add_argument(argument)
+        options.add_experimental_option("prefs", dict(main.LEAN_PREFS))
+    return webdriver.Chrome(options=options)
+
+
+def load(url, lean, headless=True):
+    browser = launch(lean, headless)
+    with contextlib.redirect_stdout(io.StringIO()):
+        scraper = main.WhatsAppScraper(batch={}, use_cache=False, contact_index=False, lean=lean)
+    scraper.browser = browser
+    try:
+        scraper.record_browser_processes()
+        if lean:
+            scraper.configure_lean()
+        started = time.perf_counter()
+        browser.get(url)
+        main.WebDriverWait(browser, 30).until(lambda browser: browser.execute_script("return document.readyState")=="complete")
+        browser.execute_script("window.scrollTo(0, document.body.scrollHeight)")
+        scraper.wait_dom_settled(quiet=0.5, timeout=5)
+        elapsed = time.perf_counter() - started
+        processes = scraper.get_browser_processes()
+        rss = 0
+        for process in processes:
+            with contextlib.suppress(psutil.Error):
+                rss += process.memory_info().rss
+        return {"seconds": elapsed, "rss": rss, "processes": len(processes)}
+    finally:
+        browser.quit()
+
+
+def run(rows, instances, headless=True):
+    requests = Counter()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_fixture_handler(rows, requests))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    report = []
+    try:
+        for lean in (False, True):
+            for instance in range(instances):
+                requests.clear()
+                result = load(url, lean, headless)
+                result.update(mode="lean" if lean else "plain", instance=instance, requests=dict(requests))
+                report.append(result)
+    finally:
+        server.shutdown()
+    plain = [entry for entry in report if entry["mode"]=="plain"]
+    for entry in report:
+        # what the plain browser fetched and this one didn't
+        entry["blocked"] = max(0, sum(plain[0]["requests"].values()) - sum(entry["requests"].values()))
+        print_row(entry)
+    return report
+
+
+def print_row(entry):
+    kinds = " ".join(f"{kind[1:]} {entry['requests'].get(kind, 0):4d}" for kind in CONTENT_TYPES)
+    print(f"{entry['mode']:<6}#{entry['instance']}  {entry['seconds']:6.2f}s  requests: {kinds}  blocked {entry['blocked']:4d}  "
+          f"RSS {entry['rss']/1024/1024:7.1f} MiB over {entry['processes']} processes", flush=True)
+
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(description="Compare a plain and a --lean Chrome on a local fixture page")
+    parser.add_argument("--rows", type=int, default=200, help="List rows, each with an avatar and an icon")
+    parser.add_argument("--instances", type=int, default=2, help="Chrome instances launched per mode")
+    parser.add_argument("--visible", action="store_true", help="Run Chrome with a window")
+    args = parser.parse_args()
+    workdir = tempfile.mkdtemp()
+    shutil.copy(BENCH_DIR.parent / "settings.config", Path(workdir) / "settings.config")
+    os.chdir(workdir)
+    try:
+        run(args.rows, args.instances, headless=not args.visible)
+    finally:
+        os.chdir(BENCH_DIR.parent)
+        shutil.rmtree(workdir, ignore_errors=True)
@@ -4,27 +4,24 @@
 import os
 import sys
 import shutil
-import signal
-import psutil
-from contextlib import suppress
-import configparser
-import argparse
+from contextlib import suppress, contextmanager, nullcontext
+import functools
+import itertools
 from pathlib import Path
 import time
 import random
-import pandas as pd
+import re
+import queue
+import fnmatch
+from collections import deque
 import json
-from selenium import webdriver
-from selenium.webdriver.support.wait import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, StaleElementReferenceException
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from bs4 import BeautifulSoup
+import csv
 import traceback
 
+# Local page used by the browser readiness probe, no network needed
+HEALTH_CHECK_LOCAL_TITLE = "WhatsAppScraper health check"
+HEALTH_CHECK_LOCAL_URL = f"data:text/html,<title>{HEALTH_CHECK_LOCAL_TITLE}</title><body>ok</body>".replace(" ", "%20")
+
 TRUTHY = [
     'TRUE', 'True', 'true', 'T', 't', True,
     '1', 1,
@@ -46,26 +43,82 @@ DATA_DIR = BASE_DIR / "data"
 CHROME_DIR = BASE_DIR / "chrome"
 USER_DATA_DIR = CHROME_DIR / "user-data"
 GROUP_NAMES_PATH = BASE_DIR / "groupnames.json"
+GROUP_CACHE_PATH = BASE_DIR / "groupcache.json"
+CONTACT_INDEX_PATH = DATA_DIR / "contacts.sqlite3"
+JOURNAL_PATH = BASE_DIR / "journal.jsonl"
+
+# Settings, directories and the browser modules are set up on first use by load_settings,
+# make_dirs and load_browser_modules, so importing this file stays cheap and side-effect free
+SETTINGS = None
+PROJECT_NAME = None
+PROJECT_DESCRIPTION = None
+VERSION = None
+SITE_DOMAIN = None
+LOGIN_URL = None
+LOGIN_TITLE = None
+LOGIN_REDIRECT_TITLE = None
+HEALTH_CHECK_URL = None
+HEALTH_CHECK_TITLE = None
+HEALTH_CHECK_MODE = None
+GROUP_TIMEOUT = 300
+ELEMENT_TIMEOUT = 20
+CLICKABLE_TIMEOUT = 10
+OPTIONAL_ELEMENT_TIMEOUT = 2
+CIRCUIT_BREAKER_THRESHOLD = 5
+CIRCUIT_BREAKER_COOLDOWN = 60
+DEFAULT_COUNTRY_CODE = ""
+
+
+def load_settings():
+    global SETTINGS, PROJECT_NAME, PROJECT_DESCRIPTION, VERSION, SITE_DOMAIN, LOGIN_URL, LOGIN_TITLE, LOGIN_REDIRECT_TITLE, HEALTH_CHECK_URL, HEALTH_CHECK_TITLE, HEALTH_CHECK_MODE
+    global GROUP_TIMEOUT, ELEMENT_TIMEOUT, CLICKABLE_TIMEOUT, OPTIONAL_ELEMENT_TIMEOUT, DEFAULT_COUNTRY_CODE
+    global CIRCUIT_BREAKER_THRESHOLD, CIRCUIT_BREAKER_COOLDOWN
+    if SETTINGS is not None:
+        return SETTINGS
+    import configparser
+    config = configparser.RawConfigParser()
+    config.read(CONFIGURATION_FILE)
+    SETTINGS = dict(config.items('settings'))
+
+    PROJECT_NAME = SETTINGS.get('project_name').strip()
+    PROJECT_DESCRIPTION = SETTINGS.get('project_description').strip()
+    VERSION = SETTINGS.get('version').strip()
+    SITE_DOMAIN = SETTINGS.get('site_domain').strip()
+    LOGIN_URL = SETTINGS.get('login_url').strip()
+    LOGIN_TITLE = SETTINGS.get('login_title').strip()
+    LOGIN_REDIRECT_TITLE = SETTINGS.get('login_redirect_title').strip()
 
+    HEALTH_CHECK_URL = SETTINGS.get('health_check_url').strip()
+    HEALTH_CHECK_TITLE = SETTINGS.get('health_check_title').strip()
+    HEALTH_CHECK_MODE = (SETTINGS.get('health_check_mode') or 'local').strip()
 
-DATA_DIR.mkdir(exist_ok=True)
-CHROME_DIR.mkdir(exist_ok=True)
-USER_DATA_DIR.mkdir(exist_ok=True)
+    GROUP_TIMEOUT = float(SETTINGS.get('group_timeout') or GROUP_TIMEOUT)
+    ELEMENT_TIMEOUT = float(SETTINGS.get('element_timeout') or ELEMENT_TIMEOUT)
+    CLICKABLE_TIMEOUT = float(SETTINGS.get('clickable_timeout') or CLICKABLE_TIMEOUT)
+    OPTIONAL_ELEMENT_TIMEOUT = float(SETTINGS.get('optional_element_timeout') or OPTIONAL_ELEMENT_TIMEOUT)
+    CIRCUIT_BREAKER_THRESHOLD = int(SETTINGS.get('circuit_breaker_threshold') or CIRCUIT_BREAKER_THRESHOLD)
+    CIRCUIT_BREAKER_COOLDOWN = float(SETTINGS.get('circuit_breaker_cooldown') or CIRCUIT_BREAKER_COOLDOWN)
+    DEFAULT_COUNTRY_CODE = (SETTINGS.get('default_country_code') or DEFAULT_COUNTRY_CODE).strip().lstrip("+")
+    return SETTINGS
 
-config = configparser.RawConfigParser()
-config.read(CONFIGURATION_FILE)
-SETTINGS = dict(config.items('settings'))
 
-PROJECT_NAME = SETTINGS.get('project_name').strip()
-PROJECT_DESCRIPTION = SETTINGS.get('project_description').strip()
-VERSION = SETTINGS.get('version').strip()
-SITE_DOMAIN = SETTINGS.get('site_domain').strip()
-LOGIN_URL = SETTINGS.get('login_url').strip()
-LOGIN_TITLE = SETTINGS.get('login_title').strip()
-LOGIN_REDIRECT_TITLE = SETTINGS.get('login_redirect_title').strip()
+def make_dirs():
+    DATA_DIR.mkdir(exist_ok=True)
+    CHROME_DIR.mkdir(exist_ok=True)
+    USER_DATA_DIR.mkdir(exist_ok=True)
 
-HEALTH_CHECK_URL = SETTINGS.get('health_check_url').strip()
-HEALTH_CHECK_TITLE = SETTINGS.get('health_check_title').strip()
+
+def load_browser_modules():
+    global webdriver, WebDriverWait, EC, TimeoutException, By, Keys, Service, Options, BeautifulSoup
+    from selenium import webdriver
+    from selenium.webdriver.support.wait import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.common.keys import Keys
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+    from bs4 import BeautifulSoup
 
 USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36",
@@ -74,6 +127,90 @@ USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/107.0.0.0 Safari/537.36",
 ]
 
+HTML_PARSERS = ["html.parser", "lxml", "subtree"]
+# containers holding the participant rows, fetched alone by the subtree parser
+PARTICIPANT_CONTAINER_SELECTORS = ["div[data-testid='popup-contents']", "div[data-testid='drawer-right']"]
+
+# Returns the outerHTML of the first element matching each selector
+OUTER_HTML_SCRIPT = """
+return arguments[0].map(function (selector) {
+    var el = document.querySelector(selector);
+    return el ? el.outerHTML : "";
+}).join("");
+"""
+
+POPUP_CONTAINER_SELECTOR = "div[data-testid='contacts-modal']"
+# scrolls the popup list and tells whether it reached the bottom
+POPUP_SCROLL_SCRIPT = """
+var scroller = arguments[0].parentElement.parentElement.parentElement.parentElement;
+scroller.scroll(0, arguments[1]);
+return scroller.scrollTop + scroller.clientHeight >= scroller.scrollHeight - 1;
+"""
+POPUP_LISTITEM_SELECTOR = "div[data-testid='popup-contents'] div[data-testid='contacts-modal'] div[role='listitem']"
+PARTICIPANT_NAME_SELECTOR = "div[data-testid='cell-frame-title'] span"
+PARTICIPANT_MOBILE_SELECTOR = "div[data-testid='cell-frame-secondary'] div[role='gridcell'] span span"
+
+POPUP_FIELDS = [[PARTICIPANT_NAME_SELECTOR, "text"], [PARTICIPANT_MOBILE_SELECTOR, "text"]]
+
+# One step of a virtualized list walk (popup participants, chat list) in a single round trip:
+# returns the rows not returned before in display order, then scrolls the list's scroll container by one
+# window of rows unless it is at its end. A window is the span of rendered rows (the viewport plus the rows the
+# list keeps rendered around it) minus one measured row, so no row falls between two windows.
+# arguments: item selector, fields [[selector, "text" | "innerText" | "exists"]], state key, reset, start top
+VIRTUAL_LIST_SCRIPT = """
+var itemSelector = arguments[0], fields = arguments[1], key = arguments[2], reset = arguments[3], startTop = arguments[4];
+var lists = window.__wgsLists = window.__wgsLists || {};
+if (reset || !lists[key]) { lists[key] = {seen: {}, scroller: null}; }
+var list = lists[key];
+var items = Array.prototype.slice.call(document.querySelectorAll(itemSelector));
+function scrollContainer(el) {
+    for (var node = el && el.parentElement; node; node = node.parentElement) {
+        var overflow = getComputedStyle(node).overflowY;
+        if ((overflow == "auto" || overflow == "scroll") && node.scrollHeight > node.clientHeight) { return node; }
+    }
+    return null;
+}
+if (!list.scroller || !list.scroller.isConnected) { list.scroller = scrollContainer(items[0]); }
+var scroller = list.scroller;
+var viewport = scroller ? scroller.clientHeight : 0;
+if (scroller && startTop != null) {
+    scroller.scrollTop = startTop;
+    return JSON.stringify({rows: [], top: scroller.scrollTop, step: 0, rowHeight: 0, atEnd: false, moved: true});
+}
+var rows = [], heights = [], renderedTop = null, renderedBottom = null;
+items.forEach(function (item) {
+    var rect = item.getBoundingClientRect();
+    if (rect.height > 0) {
+        heights.push(rect.height);
+        renderedTop = renderedTop == null ? rect.top : Math.min(renderedTop, rect.top);
+        renderedBottom = renderedBottom == null ? rect.bottom : Math.max(renderedBottom, rect.bottom);
+    }
+    var row = fields.map(function (field) {
+        var el = item.querySelector(field[0]);
+        if (field[1] == "exists") { return el != null; }
+        return el ? (field[1] == "innerText" ? el.innerText : el.textContent) : null;
+    });
+    var rowKey = JSON.stringify(row);
+    if (!list.seen.hasOwnProperty(rowKey)) {
+        list.seen[rowKey] = 1;
+        rows.push([rect.top, row]);
+    }
+});
+rows.sort(function (a, b) { return a[0] - b[0]; });
+heights.sort(function (a, b) { return a - b; });
+var rowHeight = heights.length ? heights[Math.floor(heights.length / 2)] : 0;
+var top = scroller ? scroller.scrollTop : 0;
+var atEnd = !scroller || top + viewport >= scroller.scrollHeight - 1;
+var window_ = renderedTop == null ? viewport : Math.max(viewport, renderedBottom - renderedTop);
+var stepSize = Math.max(rowHeight, window_ - rowHeight);
+var moved = false;
+if (!atEnd) {
+    scroller.scrollTop = top + stepSize;
+    moved = scroller.scrollTop > top;
+}
+return JSON.stringify({rows: rows.map(function (row) { return row[1]; }), top: top, step: stepSize, rowHeight: rowHeight, atEnd: atEnd, moved: moved});
+"""
+
 
 def confirmation_input(ask_str, ask_type):
     if ask_type not in ['Y/n', 'y/N', 'N/y', 'n/Y']:
@@ -94,14 +231,1568 @@ def confirmation_input(ask_str, ask_type):
             return ask_value in [''] + TRUTHY
 
 
+CHAT_LIST_TITLE_SELECTOR = "#pane-side div[aria-label='Chat list'] div[role='listitem'] div[data-testid='cell-frame-container'] div[data-testid='cell-frame-title'] span"
+CHAT_LIST_ITEM_SELECTOR = "#pane-side div[aria-label='Chat list'] div[role='listitem']"
+# [title, is_normal_chat] per chat row
+CHAT_LIST_FIELDS = [["div[data-testid='cell-frame-container'] div[data-testid='cell-frame-title'] span", "innerText"], ["div[data-testid='chatlist-status-v3-ring']", "exists"]]
+
+# Returns [title, is_normal_chat] for every visible chat row in a single round trip,
+# ordered top to bottom as displayed (the virtual list does not keep DOM order)
+CHAT_LIST_ROWS_SCRIPT = """
+var rows = [];
+document.querySelectorAll(arguments[0]).forEach(function (el) {
+    var row = el.parentElement.parentElement.parentElement.parentElement;
+    rows.push([el.getBoundingClientRect().top, el.innerText, row.querySelector("div[data-testid='chatlist-status-v3-ring']") != null]);
+});
+rows.sort(function (a, b) { return a[0] - b[0]; });
+return JSON.stringify(rows.map(function (row) { return [row[1], row[2]]; }));
+"""
+
+SEARCH_RESULT_TITLE_SELECTOR = "#pane-side div[aria-label='Search results.'] div[role='listitem'] div[data-testid='cell-frame-container'] div[data-testid='cell-frame-title'] span"
+
+# Returns the titles of all search results, or the result element at arguments[1] when given
+SEARCH_RESULTS_SCRIPT = """
+var els = Array.prototype.slice.call(document.querySelectorAll(arguments[0]));
+if (arguments[1] != null) { return els[arguments[1]] || null; }
+return JSON.stringify(els.map(function (el) { return el.textContent; }));
+"""
+
+# Reads the "<n> participants" count shown in the group info drawer, null when not found
+MEMBER_COUNT_SCRIPT = """
+var drawer = document.querySelector(arguments[0]);
+if (!drawer) { return null; }
+var match = (drawer.innerText || "").match(/(\\d[\\d,.\\s]*)\\s+(participants|members)/i);
+return match ? parseInt(match[1].replace(/[^\\d]/g, ""), 10) : null;
+"""
+
+# Delta sync stops scrolling after this many already indexed chats in their indexed order
+DELTA_SYNC_UNCHANGED_RUN = 20
+
+# Resolves as soon as the target subtree has seen no mutation for the quiet period,
+# or when the hard cap expires. Resolves true when the DOM settled before the cap.
+DOM_SETTLED_FUNCTION = """function (selector, quiet, cap) {
+    return new Promise(function (done) {
+        var target = (selector && document.querySelector(selector)) || document.documentElement || document;
+        var finished = false, quietTimer = null, capTimer = null, observer = null;
+        function finish(settled) {
+            if (finished) { return; }
+            finished = true;
+            clearTimeout(quietTimer);
+            clearTimeout(capTimer);
+            if (observer) { observer.disconnect(); }
+            done(settled);
+        }
+        observer = new MutationObserver(function () {
+            clearTimeout(quietTimer);
+            quietTimer = setTimeout(function () { finish(true); }, quiet);
+        });
+        observer.observe(target, {childList: true, subtree: true, attributes: true, characterData: true});
+        quietTimer = setTimeout(function () { finish(true); }, quiet);
+        capTimer = setTimeout(function () { finish(false); }, cap);
+    });
+}"""
+
+DOM_SETTLED_SCRIPT = f"""
+var done = arguments[arguments.length - 1];
+({DOM_SETTLED_FUNCTION})(arguments[0], arguments[1], arguments[2]).then(done);
+"""
+
+DOM_SETTLE_QUIET = 0.1
+DOM_SETTLE_TIMEOUT = 5
+
+# --lean: nothing below is needed to read names and numbers
+LEAN_BLOCKED_URLS = [
+    "*.jpg", "*.jpeg", "*.png", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.mp4", "*.webm", "*.ogg", "*.opus", "*.mp3",
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+    "*pps.whatsapp.net/*", "*mmg.whatsapp.net/*", "*media*.whatsapp.net/*",
+]
+LEAN_WINDOW_SIZE = (1024, 768)
+LEAN_CHROME_ARGS = [
+    f"--window-size={LEAN_WINDOW_SIZE[0]},{LEAN_WINDOW_SIZE[1]}",
+    "--blink-settings=imagesEnabled=false",
+    "--disable-smooth-scrolling",
+    "--disable-remote-fonts",
+    "--mute-audio",
+    "--autoplay-policy=user-gesture-required",
+]
+LEAN_PREFS = {"profile.managed_default_content_settings.images": 2}
+LEAN_STYLE_SCRIPT = """
+document.addEventListener("DOMContentLoaded", function () {
+    var style = document.createElement("style");
+    style.textContent = "*, *::before, *::after { animation: none !important; transition: none !important; scroll-behavior: auto !important; }";
+    document.head.appendChild(style);
+});
+"""
+
+# seconds the chromedriver / chrome process tree gets to exit on SIGTERM before it is killed
+BROWSER_EXIT_GRACE = 5
+
+
+class ChatIndex:
+    # Persisted chat list index: {title: {is_group, first_seen, last_seen, position}}
+    def __init__(self, path=GROUP_NAMES_PATH) -> None:
+        self.path = Path(path)
+        self.chats = {}
+        if self.path.exists():
+            with open(self.path, "r", encoding="UTF-8") as fp:
+                data = json.load(fp)
+            if isinstance(data, list):
+                # legacy flat list of group names
+                self.chats = {title: {"is_group": True, "first_seen": None, "last_seen": None, "position": None} for title in data}
+            else:
+                self.chats = data.get("chats", {})
+
+    def group_names(self):
+        return list(filter(None, sorted(title for title, chat in self.chats.items() if chat.get("is_group"))))
+
+    def start_sync(self):
+        self.seen = {}
+        self.run = 0
+        self.prev_position = None
+
+    def observe(self, rows):
+        # rows are (title, is_group) top to bottom, returns True once the unchanged run is long enough
+        reached = False
+        for title, is_group in rows:
+            if not title or title in self.seen:
+                continue
+            self.seen[title] = is_group
+            chat = self.chats.get(title)
+            position = chat.get("position") if chat is not None and chat.get("is_group")==is_group else None
+            if position is not None and self.prev_position is not None and position==self.prev_position+1:
+                self.run += 1
+            else:
+                self.run = 0 if position is None else 1
+            self.prev_position = position
+            reached = reached or self.run>=DELTA_SYNC_UNCHANGED_RUN
+        return reached
+
+    def finish_sync(self, complete):
+        # a complete walk drops chats no longer listed, a delta walk keeps the rest below in indexed order
+        now = time.time()
+        order = list(self.seen.keys())
+        if not complete:
+            rest = sorted((title for title in self.chats if title not in self.seen), key=lambda title: (self.chats[title].get("position") is None, self.chats[title].get("position") or 0))
+            order += rest
+        new_chats = 0
+        chats = {}
+        for position, title in enumerate(order):
+            chat = self.chats.get(title)
+            if chat is None:
+                new_chats += 1
+                chat = {"first_seen": now}
+            chats[title] = {
+                "is_group": self.seen[title] if title in self.seen else chat.get("is_group"),
+                "first_seen": chat.get("first_seen") or now,
+                "last_seen": now if title in self.seen else chat.get("last_seen"),
+                "position": position,
+            }
+        removed = len([title for title in self.chats if title not in chats])
+        self.chats = chats
+        self.save()
+        return new_chats, removed
+
+    def save(self):
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="UTF-8") as fp:
+            json.dump(obj={"version": 1, "chats": self.chats}, fp=fp, indent=4, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+def normalize_title(title):
+    import unicodedata
+    return " ".join(unicodedata.normalize("NFKC", title or "").casefold().split())
+
+
+def rank_title(group_name, title):
+    # lower is better: exact, normalized, title starting with the name, title containing the name, then a common
+    # prefix covering 70% of the name (which is how a title shorter than the name can match), None for no match
+    if title==group_name:
+        return 0
+    name = normalize_title(group_name)
+    title = normalize_title(title)
+    if not name or not title:
+        return None
+    if title==name:
+        return 1
+    if title.startswith(name):
+        return 2
+    if name in title:
+        return 3
+    common = len(os.path.commonprefix([name, title]))
+    if common>=max(1, len(name) - int(30*len(name)/100)):
+        return 4
+    return None
+
+
+def best_title_index(group_name, titles):
+    # ties go to the title closest in length to the name
+    ranked = [(rank, abs(len(title) - len(group_name)), i) for i, title in enumerate(titles) for rank in [rank_title(group_name, title)] if rank is not None]
+    return min(ranked)[2] if len(ranked)>0 else None
+
+
+def xpath_literal(value):
+    # quotes a string for XPath, including strings containing both quote characters
+    if "'" not in value:
+        return f"'{value}'"
+    if '"' not in value:
+        return f'"{value}"'
+    return "concat(" + ", \"'\", ".join(f"'{part}'" for part in value.split("'")) + ")"
+
+
+def participants_fingerprint(names, mobiles):
+    import hashlib
+    digest = hashlib.sha1()
+    for name, mobile in sorted(zip((name or "" for name in names), (normalize_mobile(mobile) for mobile in mobiles))):
+        digest.update(f"{name}\t{mobile}\n".encode("UTF-8"))
+    return digest.hexdigest()
+
+
+class GroupCache:
+    # Per-group result of the last scrape: {group name: {member_count, count, fingerprint, output, updated_at, changed_at}}
+    def __init__(self, path=GROUP_CACHE_PATH, save_path=None) -> None:
+        self.path = Path(path)
+        self.save_path = self.path if save_path is None else Path(save_path)
+        self.groups = {}
+        self.lookups = 0
+        self.hits = 0
+        if self.path.exists():
+            try:
+                with open(self.path, "r", encoding="UTF-8") as fp:
+                    self.groups = json.load(fp)
+            except Exception as e:
+                print("GroupCache Error: ", e)
+
+    def is_unchanged(self, group_name, member_count, output):
+        # unchanged when the drawer shows the same member count and the last export for this output is still there
+        self.lookups += 1
+        group = self.groups.get(group_name)
+        if group is None or member_count is None or output is None:
+            return False
+        if group.get("member_count")!=member_count or group.get("output")!=str(output) or not Path(output).exists():
+            return False
+        self.hits += 1
+        return True
+
+    def update(self, group_name, member_count, names, mobiles, output):
+        # returns True when the scraped participants differ from the last scrape (or there was none)
+        now = time.time()
+        previous = self.groups.get(group_name) or {}
+        fingerprint = participants_fingerprint(names, mobiles)
+        changed = previous.get("fingerprint")!=fingerprint
+        self.groups[group_name] = {
+            "member_count": member_count,
+            "count": len(names),
+            "fingerprint": fingerprint,
+            "output": None if output is None else str(output),
+            "updated_at": now,
+            "changed_at": now if changed else previous.get("changed_at", previous.get("updated_at")),
+        }
+        self.save()
+        return changed
+
+    def merge(self, path):
+        # folds a worker's cache file into this one and removes it
+        path = Path(path)
+        if path.exists():
+            other = GroupCache(path)
+            for group_name, group in other.groups.items():
+                if group.get("updated_at", 0)>=self.groups.get(group_name, {}).get("updated_at", 0):
+                    self.groups[group_name] = group
+            self.save()
+            path.unlink()
+
+    def save(self):
+        tmp_path = self.save_path.with_name(self.save_path.name + ".tmp")
+        with open(tmp_path, "w", encoding="UTF-8") as fp:
+            json.dump(obj=self.groups, fp=fp, indent=4, ensure_ascii=False)
+        os.replace(tmp_path, self.save_path)
+
+
+BROWSER_BACKENDS = ["selenium", "cdp"]
+
+KEY_CODES = {
+    "Tab": ("Tab", 9),
+    "End": ("End", 35),
+}
+
+
+def script_expression(script, *args):
+    # turns a selenium style script (arguments[n], return) into a CDP expression, args must be JSON values
+    return f"(function () {{{script}}}).apply(null, {json.dumps(list(args))})"
+
+
+def settled_expression(selector, quiet, timeout, then_expression="true"):
+    return f"({DOM_SETTLED_FUNCTION})({json.dumps(selector)}, {int(quiet*1000)}, {int(timeout*1000)}).then(function () {{ return {then_expression}; }})"
+
+
+class CdpBackend:
+    # Talks to the page target of the selenium launched Chrome over its DevTools websocket.
+    # A trio loop runs in a background thread; batch sends all commands before awaiting any reply.
+    def __init__(self, debugger_address, target_id=None, timeout=30, metrics=None) -> None:
+        import threading
+        self.debugger_address = debugger_address
+        self.target_id = target_id
+        self.timeout = timeout
+        self.metrics = metrics
+        self.last_id = 0
+        self.pending = {}
+        self.commands = 0
+        self.round_trips = 0
+        self.error = None
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        self.ready.wait(timeout)
+        if self.error is not None or not self.ready.is_set():
+            raise Exception(f"Couldn't connect to DevTools at {debugger_address}: {self.error}")
+
+    def websocket_url(self):
+        import urllib.request
+        with urllib.request.urlopen(f"http://{self.debugger_address}/json", timeout=self.timeout) as response:
+            targets = [target for target in json.loads(response.read()) if target.get("type")=="page"]
+        for target in targets:
+            if self.target_id is not None and target.get("id")==self.target_id:
+                return target["webSocketDebuggerUrl"]
+        if len(targets)==0:
+            raise Exception("No page target found")
+        return targets[0]["webSocketDebuggerUrl"]
+
+    def run(self):
+        import trio
+        try:
+            trio.run(self.main)
+        except Exception as e:
+            self.error = e
+            self.ready.set()
+
+    async def main(self):
+        import trio
+        from trio_websocket import open_websocket_url
+        async with open_websocket_url(self.websocket_url(), max_message_size=256*1024*1024) as ws:
+            self.ws = ws
+            self.token = trio.lowlevel.current_trio_token()
+            self.closed = trio.Event()
+            async with trio.open_nursery() as nursery:
+                nursery.start_soon(self.reader)
+                self.ready.set()
+                await self.closed.wait()
+                nursery.cancel_scope.cancel()
+
+    async def reader(self):
+        while True:
+            message = json.loads(await self.ws.get_message())
+            pending = self.pending.get(message.get("id"))
+            if pending is not None:
+                pending[1] = message
+                pending[0].set()
+
+    async def send_batch(self, commands):
+        import trio
+        ids = []
+        for method, params in commands:
+            self.last_id += 1
+            self.pending[self.last_id] = [trio.Event(), None]
+            await self.ws.send_message(json.dumps({"id": self.last_id, "method": method, "params": params or {}}))
+            ids.append(self.last_id)
+        results = []
+        with trio.fail_after(self.timeout):
+            for id in ids:
+                await self.pending[id][0].wait()
+                results.append(self.pending.pop(id)[1])
+        return results
+
+    def batch(self, commands):
+        import trio
+        self.commands += len(commands)
+        self.round_trips += 1
+        if self.metrics is not None:
+            # exported next to the webdriver command counts to compare the two backends
+            self.metrics.count("cdp_commands", len(commands))
+            self.metrics.count("cdp_round_trips")
+        results = []
+        for message in trio.from_thread.run(self.send_batch, commands, trio_token=self.token):
+            if "error" in message:
+                raise Exception(f"CDP error: {message['error']}")
+            result = message.get("result", {})
+            if "exceptionDetails" in result:
+                raise Exception(f"CDP script error: {result['exceptionDetails'].get('text')} {result['exceptionDetails'].get('exception', {}).get('description', '')}")
+            results.append(result)
+        return results
+
+    @staticmethod
+    def evaluate_command(expression, await_promise=False):
+        return ("Runtime.evaluate", {"expression": expression, "returnByValue": True, "awaitPromise": await_promise})
+
+    @staticmethod
+    def key_commands(key, count=1):
+        code, key_code = KEY_CODES[key]
+        commands = []
+        for _ in range(0, count):
+            for event_type in ("keyDown", "keyUp"):
+                commands.append(("Input.dispatchKeyEvent", {"type": event_type, "key": key, "code": code, "windowsVirtualKeyCode": key_code, "nativeVirtualKeyCode": key_code}))
+        return commands
+
+    def evaluate(self, expression, await_promise=False):
+        return self.batch([self.evaluate_command(expression, await_promise)])[0].get("result", {}).get("value")
+
+    def press_keys_and_evaluate(self, key, count, expression):
+        # all key events and the trailing (awaited) evaluation go out in one round trip
+        return self.batch(self.key_commands(key, count) + [self.evaluate_command(expression, True)])[-1].get("result", {}).get("value")
+
+    def close(self):
+        import trio
+        with suppress(Exception):
+            trio.from_thread.run_sync(self.closed.set, trio_token=self.token)
+        self.thread.join(5)
+
+
+class VirtualListScroller:
+    # Walks a virtualized list (popup participants, chat list) one window per step with VIRTUAL_LIST_SCRIPT,
+    # waiting for the list to settle between steps, until the scroll container reports its end
+    def __init__(self, scraper, name, item_selector, fields, settle_selector, record_stage=None, quiet=0.05, timeout=1, max_stalls=3) -> None:
+        self.scraper = scraper
+        self.name = name
+        self.item_selector = item_selector
+        self.fields = fields
+        self.settle_selector = settle_selector
+        self.record_stage = record_stage
+        self.quiet = quiet
+        self.timeout = timeout
+        self.max_stalls = max_stalls
+        self.top = None
+        self.steps = 0
+        self.rows = 0
+        self.row_height = 0
+        self.step_size = 0
+        self.elapsed = 0.0
+
+    def step(self, reset=False, settle=True, start_top=None):
+        args = (self.item_selector, self.fields, self.name, reset, start_top)
+        if self.scraper.cdp is not None:
+            # the settle wait and the step go out as one DevTools evaluation
+            expression = script_expression(VIRTUAL_LIST_SCRIPT, *args)
+            if settle:
+                expression = settled_expression(self.settle_selector, self.quiet, self.timeout, expression)
+            result = self.scraper.cdp.evaluate(expression, await_promise=True)
+        else:
+            if settle:
+                self.scraper.wait_dom_settled(self.settle_selector, quiet=self.quiet, timeout=self.timeout)
+            result = self.scraper.browser.execute_script(VIRTUAL_LIST_SCRIPT, *args)
+        return json.loads(result or "{}")
+
+    def walk(self, start_top=None):
+        # yields the new rows of each step as tuples, self.top is the scroll offset they were read at
+        started = time.perf_counter()
+        stalls = 0
+        try:
+            settle = False
+            if start_top is not None:
+                self.step(reset=True, settle=False, start_top=start_top)
+                settle = True
+            reset = True
+            while True:
+                if self.scraper.deadline is not None:
+                    self.scraper.deadline.check(f"scrolling the {self.name.replace('_', ' ')}")
+                result = self.step(reset=reset, settle=settle)
+                reset = False
+                settle = True
+                rows = [tuple(row) for row in result.get("rows", [])]
+                self.top = result.get("top")
+                self.row_height = result.get("rowHeight") or self.row_height
+                self.step_size = result.get("step") or self.step_size
+                self.steps += 1
+                self.rows += len(rows)
+                if self.record_stage is not None:
+                    self.scraper.record(self.record_stage, y=self.top, rows=rows, at_end=result.get("atEnd", True))
+                yield rows
+                if result.get("atEnd", True):
+                    break
+                # a list still loading more rows does not move, give it a few settles before giving up
+                stalls = 0 if result.get("moved") else stalls + 1
+                if stalls>=self.max_stalls:
+                    break
+        finally:
+            self.elapsed = time.perf_counter() - started
+            self.report()
+
+    def report(self):
+        rows_per_sec = self.rows/self.elapsed if self.elapsed>0 else 0.0
+        print(f"Scrolled the {self.name.replace('_', ' ')}: {self.rows} rows in {self.steps} steps of {self.step_size:.0f}px ({self.row_height:.0f}px rows), {self.elapsed:.1f}s, {rows_per_sec:.1f} rows/sec")
+        if self.scraper.metrics is not None:
+            self.scraper.metrics.count(f"{self.name}_rows", self.rows)
+            self.scraper.metrics.count(f"{self.name}_scroll_steps", self.steps)
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class Deadline:
+    # Time budget of one group operation; every wait takes min(its own budget, time left) and records how long it took
+    def __init__(self, total) -> None:
+        self.total = total
+        self.started = time.perf_counter()
+        self.waits = []
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def remaining(self):
+        return self.total - self.elapsed()
+
+    def check(self, stage):
+        if self.remaining()<=0:
+            raise DeadlineExceeded(f"Group deadline of {self.total:.0f}s spent while {stage}")
+
+    def budget(self, timeout, stage):
+        self.check(stage)
+        return max(0.1, min(timeout, self.remaining()))
+
+    def record_wait(self, stage, elapsed):
+        self.waits.append((stage, elapsed))
+
+    def summary(self):
+        longest = max(self.waits, key=lambda wait: wait[1]) if len(self.waits)>0 else (None, 0.0)
+        return {
+            "elapsed": self.elapsed(),
+            "waits": len(self.waits),
+            "waited": sum(elapsed for _, elapsed in self.waits),
+            "longest_wait": longest[1],
+            "longest_wait_stage": longest[0],
+        }
+
+
+class Retry(Exception):
+    # raised by an attempt that should be run again by the RetryScheduler
+    pass
+
+
+class RestartSession(Exception):
+    # unwinds the interactive session so start_scraping re-configures the browser and logs in again
+    pass
+
+
+# operation: (retries after the first attempt, base delay, max delay) in seconds
+RETRY_POLICIES = {
+    "get_page": (3, 2, 30),
+    "config_browser": (3, 5, 60),
+    "login": (3, 5, 60),
+    "session": (3, 10, 120),
+}
+
+
+class CircuitBreaker:
+    # Opens after `threshold` consecutive failures and pauses the caller for the cooldown instead of
+    # letting it hammer chrome; the next call after the pause is a trial, failing it doubles the cooldown
+    def __init__(self, threshold=5, cooldown=60, max_cooldown=900, sleep=time.sleep) -> None:
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.sleep = sleep
+        self.failures = 0
+        self.open_until = None
+        self.current_cooldown = cooldown
+        self.opened = 0
+
+    def wait(self):
+        if self.open_until is None:
+            return
+        pause = self.open_until - time.monotonic()
+        if pause>0:
+            print(f"Circuit open after {self.failures} consecutive failures, pausing {pause:.0f}s")
+            self.sleep(pause)
+        self.open_until = None
+
+    def record(self, ok):
+        if ok:
+            self.failures = 0
+            self.current_cooldown = self.cooldown
+            return
+        self.failures += 1
+        if self.failures>=self.threshold:
+            if self.failures>self.threshold:
+                self.current_cooldown = min(self.max_cooldown, self.current_cooldown*2)
+            self.open_until = time.monotonic() + self.current_cooldown
+            self.opened += 1
+
+
+class RetryScheduler:
+    # Runs an operation's attempts in a loop with full-jitter exponential backoff between them, each
+    # operation within its RETRY_POLICIES budget, every attempt going through the shared circuit breaker
+    def __init__(self, policies=RETRY_POLICIES, breaker=None, sleep=time.sleep) -> None:
+        self.policies = policies
+        self.breaker = breaker if breaker is not None else CircuitBreaker(sleep=sleep)
+        self.sleep = sleep
+        self.attempts = {}
+
+    def delay(self, operation, attempt):
+        _, base, cap = self.policies[operation]
+        return random.uniform(0, min(cap, base * 2**attempt))
+
+    def backoff(self, operation, attempt):
+        delay = self.delay(operation, attempt)
+        print(f"Retrying {operation} in {delay:.1f}s ({attempt+1}/{self.policies[operation][0]})")
+        self.sleep(delay)
+
+    def run(self, operation, func, retry_on=(), retry_if=None):
+        # func raising Retry or one of retry_on, or returning a value retry_if accepts, gets another attempt;
+        # once the budget is spent the last exception is raised again or the last value is returned
+        retries = self.policies[operation][0]
+        for attempt in range(0, retries+1):
+            self.breaker.wait()
+            self.attempts[operation] = self.attempts.get(operation, 0) + 1
+            try:
+                result = func()
+            except (Retry, *retry_on) as e:
+                print(f"WhatsAppScraper.{operation} attempt {attempt+1} failed: ", e)
+                self.breaker.record(False)
+                if attempt>=retries:
+                    raise
+            else:
+                if retry_if is None or not retry_if(result):
+                    self.breaker.record(True)
+                    return result
+                print(f"WhatsAppScraper.{operation} attempt {attempt+1} failed")
+                self.breaker.record(False)
+                if attempt>=retries:
+                    return result
+            self.backoff(operation, attempt)
+
+
+def percentile(values, p):
+    values = sorted(values)
+    if len(values)==0:
+        return 0.0
+    return values[min(len(values)-1, int(round(p/100*(len(values)-1))))]
+
+
+class Metrics:
+    # Nested timing spans and counters of one run, exported as a JSON report and a Prometheus textfile
+    def __init__(self, path) -> None:
+        self.path = Path(path)
+        self.started = time.time()
+        self.stack = []
+        self.spans = {}
+        self.counters = {}
+        self.webdriver_commands = {}
+        # extra labels on every exported series, e.g. {"worker": "1"} so pool workers' textfiles don't collide
+        self.labels = {}
+
+    @contextmanager
+    def span(self, name):
+        self.stack.append(name)
+        key = "/".join(self.stack)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.stack.pop()
+            span = self.spans.get(key)
+            if span is None:
+                span = self.spans[key] = {"count": 0, "total": 0.0, "max": 0.0}
+            span["count"] += 1
+            span["total"] += elapsed
+            span["max"] = max(span["max"], elapsed)
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def instrument(self, browser):
+        # counts every WebDriver command and the page_source bytes transferred
+        execute = browser.execute
+        metrics = self
+
+        def counted_execute(driver_command, params=None):
+            metrics.webdriver_commands[driver_command] = metrics.webdriver_commands.get(driver_command, 0) + 1
+            response = execute(driver_command, params)
+            if driver_command=="getPageSource" and isinstance(response, dict):
+                metrics.count("page_source_bytes", len((response.get("value") or "").encode("utf-8")))
+            return response
+
+        browser.execute = counted_execute
+
+    def report(self):
+        return {
+            "started_at": self.started,
+            "elapsed": time.time() - self.started,
+            "spans": self.spans,
+            "counters": self.counters,
+            "webdriver_commands": self.webdriver_commands,
+        }
+
+    def prometheus(self):
+        lines = []
+        def label(value):
+            return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        def labels(**extra):
+            pairs = [f'{key}="{label(value)}"' for key, value in dict(self.labels, **extra).items()]
+            return "{" + ",".join(pairs) + "}" if len(pairs)>0 else ""
+        lines.append("# TYPE whatsapp_scraper_span_seconds_total counter")
+        lines += [f'whatsapp_scraper_span_seconds_total{labels(span=key)} {span["total"]:.6f}' for key, span in self.spans.items()]
+        lines.append("# TYPE whatsapp_scraper_span_count_total counter")
+        lines += [f'whatsapp_scraper_span_count_total{labels(span=key)} {span["count"]}' for key, span in self.spans.items()]
+        lines.append("# TYPE whatsapp_scraper_span_max_seconds gauge")
+        lines += [f'whatsapp_scraper_span_max_seconds{labels(span=key)} {span["max"]:.6f}' for key, span in self.spans.items()]
+        lines.append("# TYPE whatsapp_scraper_webdriver_commands_total counter")
+        lines += [f'whatsapp_scraper_webdriver_commands_total{labels(command=command)} {count}' for command, count in self.webdriver_commands.items()]
+        for name, value in self.counters.items():
+            lines.append(f"# TYPE whatsapp_scraper_{name}_total counter")
+            lines.append(f"whatsapp_scraper_{name}_total{labels()} {value}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, name="whatsapp_scraper"):
+        self.path.mkdir(parents=True, exist_ok=True)
+        json_path = self.path / f"{name}-{time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started))}.json"
+        with open(json_path, "w", encoding="UTF-8") as fp:
+            json.dump(obj=self.report(), fp=fp, indent=4, ensure_ascii=False)
+        prom_path = self.path / f"{name}.prom"
+        tmp_path = prom_path.with_name(prom_path.name + ".tmp")
+        with open(tmp_path, "w", encoding="UTF-8") as fp:
+            fp.write(self.prometheus())
+        os.replace(tmp_path, prom_path)
+        print(f"Metrics saved at '{json_path}' and '{prom_path}'")
+
+
+def timed(name):
+    # times the decorated WhatsAppScraper method as a span when metrics are enabled
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if self.metrics is None:
+                return func(self, *args, **kwargs)
+            with self.metrics.span(name):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class Recorder:
+    # Writes the page source seen at each scraping stage to <path>/<time>-<pid>/<seq>-<stage>.html and indexes it in index.jsonl,
+    # the pid keeps pool workers started in the same second apart
+    def __init__(self, path) -> None:
+        self.path = Path(path) / f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.seq = 0
+
+    def snapshot(self, stage, page_source, **meta):
+        self.seq += 1
+        filename = f"{self.seq:06d}-{stage}.html"
+        with open(self.path / filename, "w", encoding="UTF-8") as fp:
+            fp.write(page_source)
+        entry = dict(meta, seq=self.seq, stage=stage, file=filename, time=time.time(), bytes=len(page_source))
+        with open(self.path / "index.jsonl", "a", encoding="UTF-8") as fp:
+            fp.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def load_group_names():
+    return ChatIndex().group_names()
+
+
+def select_group_names(group_names, all_groups=False, groups_file=None, group_glob=None, group_regex=None):
+    selected = []
+    if all_groups:
+        selected += group_names
+    if groups_file:
+        with open(groups_file, "r", encoding="UTF-8") as fp:
+            selected += [line.strip() for line in fp if line.strip()]
+    if group_glob:
+        selected += [group_name for group_name in group_names if fnmatch.fnmatchcase(group_name, group_glob)]
+    if group_regex:
+        pattern = re.compile(group_regex)
+        selected += [group_name for group_name in group_names if pattern.search(group_name)]
+    return list(dict.fromkeys(selected))
+
+
+def print_batch_stats(processed, failed, participants_saved, elapsed, cache_hits=0, cache_lookups=0, group_results=None):
+    elapsed = max(elapsed, 1e-9)
+    print("######################## BATCH STATS ########################")
+    print(f"Groups processed: {processed}, failed: {len(failed)}, participants saved: {participants_saved}")
+    print(f"Elapsed: {elapsed:.1f}s, groups/min: {processed*60/elapsed:.2f}, participants/sec: {participants_saved/elapsed:.2f}")
+    if cache_lookups>0:
+        print(f"Unchanged groups reused from cache: {cache_hits}/{cache_lookups} ({cache_hits*100/cache_lookups:.1f}% hit rate)")
+    if group_results:
+        durations = [result["elapsed"] for result in group_results]
+        print(f"Group latency: p50 {percentile(durations, 50):.1f}s, p90 {percentile(durations, 90):.1f}s, p99 {percentile(durations, 99):.1f}s, max {max(durations):.1f}s")
+        timed_out = [result["group_name"] for result in group_results if result.get("reason")]
+        if len(timed_out)>0:
+            print("Groups stopped by their deadline: ", timed_out)
+    if len(failed)>0:
+        print("Failed groups: ", failed)
+
+
+JOURNAL_FLUSH_ROWS = 200
+
+
+class Journal:
+    # Append-only JSONL log of an unattended run: participant rows as they are extracted, flushed and fsynced
+    # in batches together with the popup scroll offset reached, and a done record per finished group.
+    # After a crash the next run skips the done groups and resumes a partial group from its rows and offset
+    def __init__(self, path=JOURNAL_PATH, read_paths=None, flush_rows=JOURNAL_FLUSH_ROWS) -> None:
+        self.path = Path(path)
+        self.flush_rows = flush_rows
+        self.done = set()
+        self.partial = {}
+        for read_path in ([self.path] if read_paths is None else read_paths):
+            self.load(read_path)
+        for group_name in self.done:
+            self.partial.pop(group_name, None)
+        self.fp = None
+        self.group_name = None
+        self.pending = []
+        self.y = None
+
+    def load(self, path):
+        path = Path(path)
+        if not path.exists():
+            return
+        with open(path, "r", encoding="UTF-8") as fp:
+            for line in fp:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # the last line can be torn by a crash mid-write
+                    continue
+                group_name = record.get("group")
+                if record.get("type")=="rows":
+                    partial = self.partial.setdefault(group_name, {"rows": [], "y": None})
+                    partial["rows"] += record.get("rows", [])
+                    if record.get("y") is not None:
+                        partial["y"] = max(record["y"], partial["y"] or 0)
+                elif record.get("type")=="done":
+                    self.done.add(group_name)
+
+    def is_done(self, group_name):
+        return group_name in self.done
+
+    def resume(self):
+        # rows already recorded for the current group and the popup offset to carry on scrolling from
+        partial = self.partial.get(self.group_name)
+        if partial is None:
+            return [], None
+        return [tuple(row) for row in partial["rows"]], partial["y"]
+
+    def write(self, record):
+        if self.fp is None:
+            torn = False
+            if self.path.exists() and self.path.stat().st_size>0:
+                with open(self.path, "rb") as fp:
+                    fp.seek(-1, os.SEEK_END)
+                    torn = fp.read(1)!=b"\n"
+            self.fp = open(self.path, "a", encoding="UTF-8")
+            if torn:
+                # a torn last line has no newline, the next record must not be glued to it
+                self.fp.write("\n")
+        self.fp.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.fp.flush()
+        os.fsync(self.fp.fileno())
+
+    def start_group(self, group_name):
+        self.flush()
+        self.group_name = group_name
+        self.y = None
+
+    def add(self, name, mobile):
+        self.pending.append([name, mobile])
+        if len(self.pending)>=self.flush_rows:
+            self.flush()
+
+    def scrolled(self, y):
+        self.y = y
+
+    def flush(self):
+        if self.group_name is not None and len(self.pending)>0:
+            self.write({"type": "rows", "group": self.group_name, "y": self.y, "rows": self.pending})
+            self.partial.setdefault(self.group_name, {"rows": [], "y": None})["rows"] += self.pending
+            self.pending = []
+
+    def end_group(self, group_name, saved):
+        # a saved group is done for good, the rows of an unsaved one stay for the next attempt
+        self.flush()
+        if saved:
+            self.write({"type": "done", "group": group_name, "time": time.time()})
+            self.done.add(group_name)
+            self.partial.pop(group_name, None)
+        self.group_name = None
+
+    def close(self):
+        self.flush()
+        if self.fp is not None:
+            self.fp.close()
+            self.fp = None
+
+
+def worker_journal_path(worker_id):
+    return JOURNAL_PATH.with_name(f"{JOURNAL_PATH.stem}-worker-{worker_id}.jsonl")
+
+
+def journal_paths():
+    return [path for path in [JOURNAL_PATH] + sorted(JOURNAL_PATH.parent.glob(f"{JOURNAL_PATH.stem}-worker-*.jsonl")) if path.exists()]
+
+
+def clear_journals():
+    for path in journal_paths():
+        path.unlink()
+
+
+def worker_group_cache_path(worker_id):
+    return GROUP_CACHE_PATH.with_name(f"{GROUP_CACHE_PATH.stem}-worker-{worker_id}.json")
+
+
+def pool_scraper(worker_id, scraper_kwargs):
+    user_data_dir = CHROME_DIR / f"user-data-{worker_id}"
+    wp_scraper = WhatsAppScraper(batch={}, user_data_dir=user_data_dir, **scraper_kwargs)
+    if wp_scraper.group_cache is not None:
+        # lookups use the shared cache, updates go to a per-worker file merged by the parent
+        wp_scraper.group_cache.save_path = worker_group_cache_path(worker_id)
+    if isinstance(wp_scraper.sink, WorkbookSink):
+        wp_scraper.sink.workbook_path = wp_scraper.sink.workbook_path.with_name(f"{wp_scraper.sink.workbook_path.stem}-worker-{worker_id}.xlsx")
+    # each worker exports its own whatsapp_scraper-worker-<n>.prom / .json
+    wp_scraper.metrics_name = f"whatsapp_scraper-worker-{worker_id}"
+    if wp_scraper.metrics is not None:
+        wp_scraper.metrics.labels = {"worker": str(worker_id)}
+    # partial groups may have been journaled by any worker of the interrupted run
+    wp_scraper.journal = Journal(worker_journal_path(worker_id), read_paths=journal_paths())
+    return wp_scraper
+
+
+def merge_workbooks(paths):
+    # the pool workers' workbooks become the one consolidated workbook of the run, the worker files are removed
+    from openpyxl import load_workbook
+    paths = [Path(path) for path in paths if Path(path).exists()]
+    if len(paths)==0:
+        return None
+    sink = WorkbookSink()
+    for path in paths:
+        workbook = load_workbook(str(path), read_only=True)
+        try:
+            for sheet in workbook.worksheets:
+                sink.start_group(sheet.title, sheet.title)
+                for name, mobile in itertools.islice(sheet.iter_rows(values_only=True), 1, None):
+                    sink.write(name or "", mobile or "")
+                sink.end_group()
+        finally:
+            workbook.close()
+    sink.close()
+    for path in paths:
+        path.unlink()
+    return sink.workbook_path
+
+
+def pool_worker(worker_id, scraper_kwargs, jobs, results):
+    pool_scraper(worker_id, scraper_kwargs).run_worker(jobs, results)
+
+
+def run_pool(workers, batch, resume=True, worker=pool_worker, **scraper_kwargs):
+    # Each worker owns a Chrome profile (chrome/user-data-<n>) and pulls the next group from a shared
+    # queue as soon as it is idle, so slow groups never hold up the groups queued behind them
+    group_names = select_group_names(load_group_names(), **batch)
+    if not resume:
+        clear_journals()
+    journal = Journal(read_paths=journal_paths())
+    skipped = [group_name for group_name in group_names if journal.is_done(group_name)]
+    if len(skipped)>0:
+        print(f"Skipping {len(skipped)} groups already done by the interrupted run (see {JOURNAL_PATH.stem}*.jsonl, --no-resume to start over)")
+        group_names = [group_name for group_name in group_names if not journal.is_done(group_name)]
+    if len(group_names)==0:
+        print("No group name found!!! Sync the group names first or pass --groups-file")
+        return 0, []
+    import multiprocessing
+    context = multiprocessing.get_context("spawn")
+    jobs = context.Queue()
+    results = context.Queue()
+    for group_name in group_names:
+        jobs.put(group_name)
+    workers = max(1, min(workers, len(group_names)))
+    print(f"{len(group_names)} groups queued for processing across {workers} workers")
+    started = time.time()
+    processes = [context.Process(target=worker, args=(i+1, scraper_kwargs, jobs, results)) for i in range(workers)]
+    for process in processes:
+        process.start()
+    done = {}
+    while len(done)<len(group_names):
+        try:
+            result = results.get(timeout=1)
+            done[result["group_name"]] = result
+        except queue.Empty:
+            if not any(process.is_alive() for process in processes):
+                break
+    for process in processes:
+        process.join()
+    if scraper_kwargs.get("use_cache", True):
+        group_cache = GroupCache()
+        for i in range(workers):
+            group_cache.merge(worker_group_cache_path(i+1))
+    if scraper_kwargs.get("output_format")=="workbook":
+        merge_workbooks([worker_workbook_path for worker_workbook_path in dict.fromkeys(result["output"] for result in done.values()) if worker_workbook_path])
+    processed = sum(1 for result in done.values() if result["saved"])
+    failed = [group_name for group_name in group_names if group_name not in done or not done[group_name]["saved"]]
+    participants_saved = sum(result["participants"] for result in done.values())
+    cache_hits = sum(1 for result in done.values() if result["cache_hit"])
+    print_batch_stats(processed, failed, participants_saved, time.time() - started, cache_hits, len(done) if scraper_kwargs.get("use_cache", True) else 0, list(done.values()))
+    if len(failed)==0:
+        clear_journals()
+    return processed, failed
+
+
+# a secondary line made only of digits, spaces and phone punctuation, with at least 7 digits
+PHONE_SHAPED = re.compile(r"^\+?[\d\s\-().]*$")
+
+
+def is_phone_shaped(mobile):
+    mobile = str(mobile or "").strip()
+    return PHONE_SHAPED.match(mobile) is not None and sum(c.isdigit() for c in mobile)>=7
+
+
+def normalize_mobile(mobile):
+    if not mobile:
+        return ""
+    mobile = str(mobile).strip()
+    digits = "".join(c for c in mobile if c.isdigit())
+    if digits and mobile.startswith("+"):
+        return f"+{digits}"
+    return digits
+
+
+MOBILE_DIGITS = re.compile(r"\D+")
+
+
+def e164_mobiles(mobiles, country_code=None):
+    # E.164 style "+<country code><number>" for a batch of raw mobile strings, None when it can't be one.
+    # "00" is taken as the international prefix, numbers without one get the default country code
+    country_code = DEFAULT_COUNTRY_CODE if country_code is None else country_code
+    sub = MOBILE_DIGITS.sub
+    result = []
+    for mobile in mobiles:
+        mobile = str(mobile or "").strip()
+        digits = sub("", mobile)
+        if mobile.startswith("+"):
+            pass
+        elif digits.startswith("00"):
+            digits = digits[2:]
+        elif country_code and digits:
+            digits = country_code + digits.lstrip("0")
+        else:
+            digits = ""
+        result.append(f"+{digits}" if 8<=len(digits)<=15 else None)
+    return result
+
+
+class ContactIndex:
+    # SQLite store of every scraped group, contact (by E.164 mobile) and membership, for cross-group lookups
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS groups (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE,
+        member_count INTEGER,
+        updated_at REAL
+    );
+    CREATE TABLE IF NOT EXISTS contacts (
+        id INTEGER PRIMARY KEY,
+        mobile TEXT NOT NULL UNIQUE,
+        name TEXT
+    );
+    CREATE TABLE IF NOT EXISTS memberships (
+        group_id INTEGER NOT NULL REFERENCES groups(id),
+        contact_id INTEGER NOT NULL REFERENCES contacts(id),
+        name TEXT,
+        raw_mobile TEXT,
+        PRIMARY KEY (group_id, contact_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS memberships_contact ON memberships(contact_id, group_id);
+    """
+
+    def __init__(self, path=CONTACT_INDEX_PATH) -> None:
+        import sqlite3
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # pool workers share the file, WAL lets readers go on while one of them writes a group
+        self.db = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(self.SCHEMA)
+
+    def save_group(self, group_name, names, mobiles, member_count=None):
+        # replaces the group's memberships in one transaction, returns the number of indexed members
+        rows = [(name, raw, mobile) for name, raw, mobile in zip(names, mobiles, e164_mobiles(mobiles)) if mobile is not None]
+        with self.db:
+            self.db.execute(
+                "INSERT INTO groups(name, member_count, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET member_count=excluded.member_count, updated_at=excluded.updated_at",
+                (group_name, member_count, time.time())
+            )
+            group_id = self.db.execute("SELECT id FROM groups WHERE name=?", (group_name,)).fetchone()[0]
+            self.db.execute("DELETE FROM memberships WHERE group_id=?", (group_id,))
+            self.db.executemany(
+                "INSERT INTO contacts(mobile, name) VALUES (?, ?) "
+                "ON CONFLICT(mobile) DO UPDATE SET name=COALESCE(NULLIF(excluded.name, ''), contacts.name)",
+                [(mobile, name) for name, _, mobile in rows]
+            )
+            self.db.executemany(
+                "INSERT OR IGNORE INTO memberships(group_id, contact_id, name, raw_mobile) "
+                "SELECT ?, id, ?, ? FROM contacts WHERE mobile=?",
+                [(group_id, name, raw, mobile) for name, raw, mobile in rows]
+            )
+        return len(rows)
+
+    def has_group(self, group_name):
+        return self.db.execute("SELECT 1 FROM groups WHERE name=?", (group_name,)).fetchone() is not None
+
+    def find_contact(self, mobile):
+        # [(group name, name shown in that group, raw mobile)] for one number
+        mobile = e164_mobiles([mobile])[0]
+        if mobile is None:
+            return []
+        return self.db.execute(
+            "SELECT g.name, m.name, m.raw_mobile FROM contacts c "
+            "JOIN memberships m ON m.contact_id=c.id JOIN groups g ON g.id=m.group_id "
+            "WHERE c.mobile=? ORDER BY g.name",
+            (mobile,)
+        ).fetchall()
+
+    def shared_contacts(self, min_groups=2):
+        # [(mobile, name, group count, "group1 | group2 ...")] for numbers in at least min_groups groups
+        return self.db.execute(
+            "SELECT c.mobile, c.name, COUNT(*) AS groups_count, GROUP_CONCAT(g.name, ' | ') FROM memberships m "
+            "JOIN contacts c ON c.id=m.contact_id JOIN groups g ON g.id=m.group_id "
+            "GROUP BY m.contact_id HAVING COUNT(*)>=? ORDER BY groups_count DESC, c.mobile",
+            (min_groups,)
+        ).fetchall()
+
+    def stats(self):
+        return {table: self.db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in ("groups", "contacts", "memberships")}
+
+    def close(self):
+        self.db.close()
+
+
+def query_contact_index(find_contact=None, shared_contacts=None):
+    if not CONTACT_INDEX_PATH.exists():
+        print(f"No contact index at '{CONTACT_INDEX_PATH}' yet. Scrape some groups first!")
+        return
+    contact_index = ContactIndex()
+    try:
+        stats = contact_index.stats()
+        print(f"Contact index: {stats['groups']} groups, {stats['contacts']} contacts, {stats['memberships']} memberships")
+        if find_contact is not None:
+            memberships = contact_index.find_contact(find_contact)
+            print(f"{find_contact} is a member of {len(memberships)} group(s)")
+            for group_name, name, raw_mobile in memberships:
+                print(f"  {group_name}: {name or ''} {raw_mobile}")
+        if shared_contacts is not None:
+            contacts = contact_index.shared_contacts(shared_contacts)
+            print(f"{len(contacts)} number(s) in at least {shared_contacts} groups")
+            for mobile, name, groups_count, group_names in contacts:
+                print(f"  {mobile} {name or ''} ({groups_count}): {group_names}")
+    finally:
+        contact_index.close()
+
+
+class Participant:
+    __slots__ = ("name", "mobile")
+
+    def __init__(self, name, mobile) -> None:
+        self.name = name
+        self.mobile = mobile
+
+
+class Participants:
+    # Participant records indexed by normalized mobile (or name when there is no mobile), kept in first-seen order
+    def __init__(self, on_add=None) -> None:
+        self.index = {}
+        self.on_add = on_add
+
+    def key(self, name, mobile):
+        # the secondary line of a saved contact is its status, digits in a status don't identify a member
+        if is_phone_shaped(mobile):
+            return normalize_mobile(mobile)
+        if name:
+            return ("name", name, normalize_mobile(mobile))
+        if mobile:
+            return ("text", str(mobile).strip())
+        return None
+
+    def add(self, name, mobile):
+        key = self.key(name, mobile)
+        if key is None or key in self.index:
+            return False
+        participant = Participant(name, mobile or "")
+        self.index[key] = participant
+        if self.on_add is not None:
+            self.on_add(participant.name, participant.mobile)
+        return True
+
+    def extend(self, rows):
+        added = 0
+        for name, mobile in rows:
+            if self.add(name, mobile):
+                added += 1
+        return added
+
+    def __len__(self):
+        return len(self.index)
+
+    def __iter__(self):
+        return iter(self.index.values())
+
+    def names_mobiles(self):
+        names = []
+        mobiles = []
+        for participant in self.index.values():
+            names.append(participant.name)
+            mobiles.append(participant.mobile)
+        return names, mobiles
+
+
+class ExportSink:
+    # Receives the participants of one group at a time: start_group, write per row, end_group.
+    # Files are written to tmp_path and only replace filepath in end_group, an aborted group keeps the last export
+    extension = None
+
+    def __init__(self, data_dir=DATA_DIR) -> None:
+        self.data_dir = Path(data_dir)
+        self.group_name = None
+        self.filepath = None
+        self.tmp_path = None
+        self.count = 0
+
+    @property
+    def active(self):
+        return self.group_name is not None
+
+    def start_group(self, group_name, file_stem):
+        self.group_name = group_name
+        self.filepath = self.data_dir / f"{file_stem}.{self.extension}"
+        self.tmp_path = self.filepath.with_name(self.filepath.name + ".tmp")
+        self.count = 0
+
+    def replace_file(self):
+        if self.tmp_path is not None and self.tmp_path.exists():
+            os.replace(self.tmp_path, self.filepath)
+
+    def remove_tmp_file(self):
+        if self.tmp_path is not None:
+            with suppress(FileNotFoundError):
+                self.tmp_path.unlink()
+
+    def write(self, name, mobile):
+        self.count += 1
+
+    def end_group(self):
+        count = self.count
+        self.group_name = None
+        return count
+
+    def abort_group(self):
+        self.group_name = None
+
+    def close(self):
+        pass
+
+
+class ExcelSink(ExportSink):
+    # one .xlsx per group written with pandas once the group is complete
+    extension = "xlsx"
+    sheet_name = "Participants"
+
+    def start_group(self, group_name, file_stem):
+        super().start_group(group_name, file_stem)
+        self.names = []
+        self.mobiles = []
+
+    def write(self, name, mobile):
+        super().write(name, mobile)
+        self.names.append(name)
+        self.mobiles.append(mobile)
+
+    def end_group(self):
+        if self.count>0:
+            import pandas as pd
+            df = pd.DataFrame({
+                            "Name": self.names, 
+                            "Mobile": self.mobiles, 
+                        })
+            # pandas picks the excel writer by extension, the .tmp file is handed over as an open file instead
+            with open(self.tmp_path, "wb") as fp, pd.ExcelWriter(fp, engine="openpyxl") as writer:
+                df.to_excel(excel_writer=writer, sheet_name=self.sheet_name, index=False)
+            self.replace_file()
+            print(f"{self.count} participants have been saved in sheet '{self.sheet_name}' at '{self.filepath}'")
+        return super().end_group()
+
+
+class CsvSink(ExportSink):
+    extension = "csv"
+
+    def start_group(self, group_name, file_stem):
+        super().start_group(group_name, file_stem)
+        self.fp = None
+
+    def write(self, name, mobile):
+        if self.fp is None:
+            self.fp = open(self.tmp_path, "w", encoding="UTF-8", newline="")
+            self.writer = csv.writer(self.fp)
+            self.writer.writerow(["Name", "Mobile"])
+        self.writer.writerow([name, mobile])
+        super().write(name, mobile)
+
+    def close_file(self):
+        if self.fp is not None:
+            self.fp.close()
+            self.fp = None
+
+    def end_group(self):
+        self.close_file()
+        self.replace_file()
+        if self.count>0:
+            print(f"{self.count} participants have been saved at '{self.filepath}'")
+        return super().end_group()
+
+    def abort_group(self):
+        self.close_file()
+        self.remove_tmp_file()
+        super().abort_group()
+
+
+class JsonlSink(CsvSink):
+    extension = "jsonl"
+
+    def write(self, name, mobile):
+        if self.fp is None:
+            self.fp = open(self.tmp_path, "w", encoding="UTF-8")
+        self.fp.write(json.dumps({"Name": name, "Mobile": mobile}, ensure_ascii=False) + "\n")
+        ExportSink.write(self, name, mobile)
+
+
+class ParquetSink(ExportSink):
+    # row groups of batch_size rows, needs pyarrow
+    extension = "parquet"
+    batch_size = 10000
+
+    def __init__(self, data_dir=DATA_DIR) -> None:
+        super().__init__(data_dir)
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise Exception("Parquet output requires pyarrow. Please install it with 'pip install pyarrow'")
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+        self.schema = pyarrow.schema([("Name", pyarrow.string()), ("Mobile", pyarrow.string())])
+
+    def start_group(self, group_name, file_stem):
+        super().start_group(group_name, file_stem)
+        self.writer = None
+        self.names = []
+        self.mobiles = []
+
+    def flush(self):
+        if len(self.names)>0:
+            if self.writer is None:
+                self.writer = self.pq.ParquetWriter(str(self.tmp_path), self.schema)
+            self.writer.write_table(self.pa.table({"Name": self.names, "Mobile": self.mobiles}, schema=self.schema))
+            self.names = []
+            self.mobiles = []
+
+    def write(self, name, mobile):
+        super().write(name, mobile)
+        self.names.append(name)
+        self.mobiles.append(mobile)
+        if len(self.names)>=self.batch_size:
+            self.flush()
+
+    def close_writer(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def end_group(self):
+        self.flush()
+        self.close_writer()
+        self.replace_file()
+        if self.count>0:
+            print(f"{self.count} participants have been saved at '{self.filepath}'")
+        return super().end_group()
+
+    def abort_group(self):
+        self.close_writer()
+        self.remove_tmp_file()
+        super().abort_group()
+
+
+class WorkbookSink(ExportSink):
+    # all groups in one write-only openpyxl workbook, one sheet per group, saved on close.
+    # A group's rows are buffered and only become a sheet in end_group, an aborted group leaves no partial sheet
+    extension = "xlsx"
+
+    def __init__(self, data_dir=DATA_DIR, filename=None) -> None:
+        super().__init__(data_dir)
+        from openpyxl import Workbook
+        self.workbook = Workbook(write_only=True)
+        self.sheet = None
+        self.sheet_names = set()
+        self.workbook_path = self.data_dir / (filename or f"participants-{time.strftime('%Y%m%d-%H%M%S')}.xlsx")
+
+    def sheet_title(self, group_name):
+        title = "".join("_" if c in '[]:*?/\\' else c for c in group_name)[:31].strip() or "Group"
+        base = title
+        i = 1
+        while title.lower() in self.sheet_names:
+            i += 1
+            suffix = f" ({i})"
+            title = base[:31-len(suffix)] + suffix
+        self.sheet_names.add(title.lower())
+        return title
+
+    def start_group(self, group_name, file_stem):
+        super().start_group(group_name, file_stem)
+        self.filepath = self.workbook_path
+        self.tmp_path = None
+        self.rows = []
+
+    def write(self, name, mobile):
+        self.rows.append([name, mobile])
+        super().write(name, mobile)
+
+    def end_group(self):
+        if self.count>0:
+            sheet = self.workbook.create_sheet(self.sheet_title(self.group_name))
+            sheet.append(["Name", "Mobile"])
+            for row in self.rows:
+                sheet.append(row)
+            print(f"{self.count} participants have been added to sheet '{sheet.title}' of '{self.workbook_path}'")
+        self.rows = []
+        return super().end_group()
+
+    def abort_group(self):
+        self.rows = []
+        super().abort_group()
+
+    def close(self):
+        if len(self.sheet_names)>0:
+            self.workbook.save(str(self.workbook_path.absolute()))
+            print(f"Workbook saved at '{self.workbook_path}'")
+
+
+OUTPUT_FORMATS = {
+    "xlsx": ExcelSink,
+    "csv": CsvSink,
+    "jsonl": JsonlSink,
+    "parquet": ParquetSink,
+    "workbook": WorkbookSink,
+}
+
+
+def make_job_request_handler(scraper):
+    from http.server import BaseHTTPRequestHandler
+
+    class JobRequestHandler(BaseHTTPRequestHandler):
+        # GET /health, GET /jobs, GET /jobs/<id>, POST /jobs {"group_names": [...], "output_format": "xlsx"}
+        def send_json(self, status, obj):
+            body = json.dumps(obj, ensure_ascii=False).encode("UTF-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=UTF-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = self.path.rstrip("/")
+            if path=="/health":
+                return self.send_json(200, {"status": "ok", "queued": scraper.job_queue.qsize()})
+            if path=="/jobs":
+                return self.send_json(200, scraper.list_jobs())
+            if path.startswith("/jobs/"):
+                job = scraper.get_job(path[len("/jobs/"):])
+                if job is not None:
+                    return self.send_json(200, job)
+            self.send_json(404, {"error": "Not found"})
+
+        def do_POST(self):
+            if self.path.rstrip("/")!="/jobs":
+                return self.send_json(404, {"error": "Not found"})
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                job = scraper.submit_job(payload.get("group_names"), payload.get("output_format", scraper.output_format))
+                self.send_json(202, job)
+            except Exception as e:
+                self.send_json(400, {"error": str(e)})
+
+        def log_message(self, format, *args):
+            pass
+
+    return JobRequestHandler
+
+
 class WhatsAppScraper:
-    def __init__(self,invisible=False) -> None:
+    def __init__(self,invisible=False, incremental=True, batch=None, user_data_dir=USER_DATA_DIR, output_format="xlsx", full_sync=False, use_cache=True, parser="html.parser", record=None, metrics=None, group_timeout=None, backend="selenium", lean=False, contact_index=True, resume=True) -> None:
+        load_settings()
+        make_dirs()
+        load_browser_modules()
         self.invisible = invisible
+        self.output_format = output_format
+        self.full_sync = full_sync
+        self.parser = parser
+        self.recorder = Recorder(record) if record else None
+        self.metrics = Metrics(metrics) if metrics else None
+        self.metrics_name = "whatsapp_scraper"
+        self.group_timeout = group_timeout or GROUP_TIMEOUT
+        self.deadline = None
+        self.backend = backend
+        self.cdp = None
+        self.lean = lean
+        # chromedriver and the chrome processes it launched, recorded by config_browser
+        self.browser_processes = []
+        self.group_cache = GroupCache() if use_cache else None
+        self.contact_index = ContactIndex() if contact_index else None
+        # set for unattended runs (run_batch / pool workers) only
+        self.resume = resume
+        self.journal = None
+        self.member_count = None
+        self.cache_hit = False
+        self.sink = OUTPUT_FORMATS[output_format]()
+        self.user_data_dir = Path(user_data_dir)
+        self.user_data_dir.mkdir(exist_ok=True)
+        self.incremental = incremental
+        # dict of select_group_names kwargs when running unattended, None for interactive mode
+        self.batch = batch
+        self.qr_scan_timeout = 300
+        self.participants_saved = 0
         self.user_agent = USER_AGENTS[random.randrange(0, len(USER_AGENTS)-1)]
         self.page_load_timeout = 60
         self.not_ok = 0
-        self.retry = 0
-        self.max_retries = 3
+        self.browser_ok_session = None
+        self.retries = RetryScheduler(breaker=CircuitBreaker(CIRCUIT_BREAKER_THRESHOLD, CIRCUIT_BREAKER_COOLDOWN))
+
+    def wait_dom_settled(self, selector=None, quiet=DOM_SETTLE_QUIET, timeout=DOM_SETTLE_TIMEOUT):
+        try:
+            self.browser.set_script_timeout(timeout + 5)
+            return self.browser.execute_async_script(DOM_SETTLED_SCRIPT, selector, int(quiet*1000), int(timeout*1000)) is True
+        except Exception as e:
+            # the document may be navigating and not accept scripts yet
+            print("WhatsAppScraper.wait_dom_settled Error: ", e)
+            time.sleep(quiet)
+            return False
+
+    def span(self, name):
+        return nullcontext() if self.metrics is None else self.metrics.span(name)
+
+    def export_metrics(self, name="whatsapp_scraper"):
+        if self.metrics is not None:
+            try:
+                self.metrics.export(name)
+            except Exception as e:
+                print("WhatsAppScraper.export_metrics Error: ", e, traceback.format_exc())
+
+    def record(self, stage, **meta):
+        if self.recorder is None:
+            return
+        try:
+            self.recorder.snapshot(stage, self.browser.page_source, url=self.browser.current_url, title=self.browser.title, **meta)
+        except Exception as e:
+            print("WhatsAppScraper.record Error: ", e)
 
     def is_head_ready(self):
         try:
@@ -113,7 +1804,7 @@ class WhatsAppScraper:
     
     def is_dom_ready(self):
         try:
-            time.sleep(0.5)
+            self.wait_dom_settled()
             WebDriverWait(self.browser, 20).until(EC.presence_of_element_located((By.TAG_NAME, "body")))                
             try:
                 self.browser.execute_script(f'window.scrollTo(0, {random.randrange(100, 1000)})')
@@ -135,7 +1826,7 @@ class WhatsAppScraper:
         ready = False
         for _ in range(0, 3):
             try:
-                time.sleep(1)
+                self.wait_dom_settled()
                 ready = self.is_head_ready() and self.is_dom_ready() and self.is_title_valid(title)
                 if ready:
                     break
@@ -145,24 +1836,42 @@ class WhatsAppScraper:
 
 
     def get_page(self, url, title=None):
-        try:
+        def load():
             self.browser.get(url)
-            time.sleep(1)
+            self.wait_dom_settled()
             return self.is_page_ready(title)
+        try:
+            return self.retries.run("get_page", load, retry_on=(TimeoutException,))
         except TimeoutException as e:
             print("WhatsAppScraper.get_page Error1: ", e, traceback.format_exc())
-            if self.retry<=self.max_retries:
-                self.retry += 1
-                # self.config_browser()
-                return self.get_page(url, title)
             return False
         except Exception as e:
             print("WhatsAppScraper.get_page Error2: ", e, traceback.format_exc())
             return False
 
+    def probe_browser(self, timeout=5):
+        try:
+            self.browser.get(HEALTH_CHECK_LOCAL_URL)
+            WebDriverWait(self.browser, timeout, poll_frequency=0.05).until(
+                lambda browser: browser.execute_script("return document.readyState")=="complete"
+            )
+            return self.is_title_valid(HEALTH_CHECK_LOCAL_TITLE)
+        except Exception as e:
+            print("WhatsAppScraper.probe_browser Error: ", e)
+            return False
+
     def test_browser_ok(self):
+        # the verdict is cached per browser session, a new browser from config_browser is probed again
+        session_id = getattr(self.browser, "session_id", None)
+        if self.browser_ok_session is not None and self.browser_ok_session==session_id:
+            return True
         print("Testing browser")
-        if self.get_page(HEALTH_CHECK_URL, HEALTH_CHECK_TITLE):
+        if HEALTH_CHECK_MODE=="url":
+            ok = self.get_page(HEALTH_CHECK_URL, HEALTH_CHECK_TITLE)
+        else:
+            ok = self.probe_browser()
+        if ok:
+            self.browser_ok_session = session_id
             self.not_ok = 0
             print("OK")
             return True
@@ -172,44 +1881,19 @@ class WhatsAppScraper:
             return False
     
     def kill_browser_process(self):     
+        if self.cdp is not None:
+            self.cdp.close()
+            self.cdp = None
+        processes = self.get_browser_processes()
         try:
             if hasattr(self, "browser") and self.browser is not None:
                 print("Killing browser instances and process")
-                try:
-                    pid = int(self.browser.service.process.id)
-                except:
-                    pid = None
-                try:
-                    self.browser.service.process.send_signal(signal.SIGTERM)
-                except:
-                    pass
-                try:
-                    self.browser.close()
-                except:
-                    pass
+                # quit first so chromedriver closes chrome cleanly, then whatever is left of the tree goes
                 try:
                     self.browser.quit()
                 except:
                     pass
-                try:
-                    if pid is not None:
-                        os.kill(pid, signal.SIGTERM)
-                except:
-                    pass
-            try:
-                for process in psutil.process_iter():
-                    try:
-                        if process.name() == "chrome.exe" \
-                            and "--test-type=webdriver" in process.cmdline():
-                            with suppress(psutil.NoSuchProcess):
-                                try:
-                                    os.kill(process.pid, signal.SIGTERM)
-                                except:
-                                    pass
-                    except:
-                        pass
-            except:
-                pass
+            self.terminate_browser_processes(processes)
         except:
             pass
         
@@ -221,13 +1905,83 @@ class WhatsAppScraper:
                 print("Browser and Webdriver process NOT killed !!!!")
 
 
+    def get_browser_processes(self):
+        # the recorded tree plus whatever it spawned since (renderers, gpu, utility), collected
+        # before quitting so processes re-parented by a dying chromedriver are not lost
+        processes = {}
+        try:
+            import psutil
+            for process in self.browser_processes:
+                if process.is_running():
+                    processes[process.pid] = process
+                    with suppress(psutil.Error):
+                        for child in process.children(recursive=True):
+                            processes[child.pid] = child
+        except Exception as e:
+            print("WhatsAppScraper.get_browser_processes Error: ", e)
+        return list(processes.values())
+
+    def terminate_browser_processes(self, processes):
+        try:
+            import psutil
+            for process in processes:
+                with suppress(psutil.Error):
+                    process.terminate()
+            _, alive = psutil.wait_procs(processes, timeout=BROWSER_EXIT_GRACE)
+            for process in alive:
+                with suppress(psutil.Error):
+                    process.kill()
+            if len(alive)>0:
+                psutil.wait_procs(alive, timeout=BROWSER_EXIT_GRACE)
+        except Exception as e:
+            print("WhatsAppScraper.terminate_browser_processes Error: ", e)
+        self.browser_processes = []
+
+    def record_browser_processes(self):
+        try:
+            import psutil
+            driver = psutil.Process(self.browser.service.process.pid)
+            self.browser_processes = [driver] + driver.children(recursive=True)
+        except Exception as e:
+            print("WhatsAppScraper.record_browser_processes Error: ", e)
+            self.browser_processes = []
+
+    def kill_stale_browser(self):
+        # a crashed earlier run can leave chrome holding this user data dir, chrome's
+        # SingletonLock link ("<hostname>-<pid>") names its browser process
+        try:
+            import psutil
+            target = os.readlink(self.user_data_dir / "SingletonLock")
+            pid = int(target.rsplit("-", 1)[1])
+            process = psutil.Process(pid)
+            user_data_dir = str(self.user_data_dir.absolute())
+            if any(user_data_dir in arg for arg in process.cmdline()):
+                print(f"Killing stale browser process {pid}")
+                self.terminate_browser_processes([process] + process.children(recursive=True))
+        except Exception:
+            pass
+
+    @timed("config_browser")
     def config_browser(self, *args, **kwargs):
+        def launch():
+            self.launch_browser()
+            return self.test_browser_ok()
+        if not self.retries.run("config_browser", launch, retry_on=(Exception,), retry_if=lambda ok: not ok):
+            raise Exception("Failed to configure browser. Possible reason: Blocked Proxy server")
+
+    def launch_browser(self):
         print("Configuring browser...")
         chrome_driver_path = CHROME_DIR / 'chromedriver.exe'
         self.kill_browser_process()
+        self.kill_stale_browser()
         options = Options()
         options.page_load_strategy = "none"
-        options.add_argument("--start-maximized")
+        if self.lean:
+            print("Configuring browser with lean mode!")
+            for argument in LEAN_CHROME_ARGS:
+                options.add_argument(argument)
+        else:
+            options.add_argument("--start-maximized")
         options.add_argument("--ignore-gpu-blacklist")
         options.add_argument("--use-gl")
         options.add_argument("--allow-insecure-localhost")
@@ -250,7 +2004,9 @@ class WhatsAppScraper:
         options.add_argument("--disable-blink-features")
         options.add_argument("--disable-blink-features=AutomationControlled")
         options.add_argument("--disable-notifications")
-        options.add_argument(f"user-data-dir={USER_DATA_DIR.absolute()}")
+        if self.backend=="cdp":
+            options.add_argument("--remote-allow-origins=*")
+        options.add_argument(f"user-data-dir={self.user_data_dir.absolute()}")
         options.set_capability("acceptInsecureCerts", True)
         options.add_experimental_option("useAutomationExtension", False)
         options.add_experimental_option("excludeSwitches", ["enable-automation", "enable-logging"])
@@ -260,51 +2016,100 @@ class WhatsAppScraper:
             "safebrowsing.enabled" : False,
             "profile.exit_type" : "Normal"
         }
+        if self.lean:
+            prefs.update(LEAN_PREFS)
         options.add_experimental_option("prefs", prefs)
         os.environ["webdriver.chrome.driver"] = str(chrome_driver_path.absolute())
         service = Service(executable_path=chrome_driver_path, service_args=["--verbose"])
         self.browser = webdriver.Chrome(service=service, options=options)
+        self.record_browser_processes()
+        if self.metrics is not None:
+            self.metrics.instrument(self.browser)
         self.browser.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
         self.browser.execute_cdp_cmd("Network.setUserAgentOverride", {"userAgent":self.user_agent})
         self.browser.set_page_load_timeout(self.page_load_timeout)
-        self.browser.maximize_window()
+        if self.lean:
+            self.configure_lean()
+        else:
+            self.browser.maximize_window()
+        if self.backend=="cdp":
+            self.connect_cdp()
         print("browserVersion: ", self.browser.capabilities["browserVersion"])
         print("chromedriverVersion: ", self.browser.capabilities["chrome"]["chromedriverVersion"].split(" ")[0])
-        if not self.test_browser_ok():
-            self.retry += 1
-            if self.retry<=self.max_retries:
-                self.config_browser()
-            else:
-                raise Exception("Failed to configure browser. Possible reason: Blocked Proxy server")
-        else:
-            self.retry = 0
 
         
-    def get_clickable_element(self, by_tuple):
+    def configure_lean(self):
+        try:
+            self.browser.set_window_size(*LEAN_WINDOW_SIZE)
+            self.browser.execute_cdp_cmd("Network.enable", {})
+            self.browser.execute_cdp_cmd("Network.setBlockedURLs", {"urls": LEAN_BLOCKED_URLS})
+            self.browser.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": LEAN_STYLE_SCRIPT})
+            self.browser.execute_cdp_cmd("Emulation.setEmulatedMedia", {"features": [{"name": "prefers-reduced-motion", "value": "reduce"}]})
+        except Exception as e:
+            print("WhatsAppScraper.configure_lean Error: ", e, traceback.format_exc())
+
+    def connect_cdp(self):
+        try:
+            debugger_address = self.browser.capabilities["goog:chromeOptions"]["debuggerAddress"]
+            self.cdp = CdpBackend(debugger_address, self.browser.current_window_handle, metrics=self.metrics)
+            print("CDP backend connected: ", debugger_address)
+        except Exception as e:
+            print("WhatsAppScraper.connect_cdp Error: ", e, traceback.format_exc())
+            print("Falling back to the selenium backend")
+            self.cdp = None
+
+    def get_clickable_element(self, by_tuple, optional=False, stage=None):
+        # optional elements get a short probe; inside a group both waits are capped by the group deadline
         el = None
+        stage = stage or f"waiting for {by_tuple[1]}"
+        presence_timeout = OPTIONAL_ELEMENT_TIMEOUT if optional else ELEMENT_TIMEOUT
+        clickable_timeout = min(CLICKABLE_TIMEOUT, OPTIONAL_ELEMENT_TIMEOUT) if optional else CLICKABLE_TIMEOUT
+        if self.deadline is not None:
+            presence_timeout = self.deadline.budget(presence_timeout, stage)
+        started = time.perf_counter()
         try:
-            el = WebDriverWait(self.browser, 20).until(EC.presence_of_element_located(by_tuple))
-            el1 = WebDriverWait(self.browser, 10).until(EC.element_to_be_clickable(by_tuple))
+            el = WebDriverWait(self.browser, presence_timeout).until(EC.presence_of_element_located(by_tuple))
+            if self.deadline is not None:
+                clickable_timeout = self.deadline.budget(clickable_timeout, stage)
+            el1 = WebDriverWait(self.browser, clickable_timeout).until(EC.element_to_be_clickable(by_tuple))
             if el1 is not None:
                 el = el1
+        except DeadlineExceeded:
+            raise
         except Exception as e:
-            print("WhatsAppScraper.get_clickable_element Error: ", e)
+            if self.metrics is not None and isinstance(e, TimeoutException):
+                self.metrics.count("wait_timeouts")
+            if not optional:
+                print("WhatsAppScraper.get_clickable_element Error: ", e)
+        if self.deadline is not None:
+            self.deadline.record_wait(stage, time.perf_counter() - started)
+            if el is None and not optional:
+                self.deadline.check(stage)
         return el
 
-    def cleanup_session_login(self):
+    def cleanup_session(self):
+        # a blank page title means a broken session: start over with a fresh profile
         if self.is_title_valid(None) or self.is_title_valid(""):
             print("Re-configuring and Re-loging...")
-            if USER_DATA_DIR.exists():
+            if self.user_data_dir.exists():
                 self.kill_browser_process()
-                shutil.rmtree(USER_DATA_DIR)
-                USER_DATA_DIR.mkdir(exist_ok=True)
+                shutil.rmtree(self.user_data_dir)
+                self.user_data_dir.mkdir(exist_ok=True)
             self.config_browser()
-            return self.login()
+            return True
         return False
 
+    @timed("login")
     def login(self):
+        try:
+            return self.retries.run("login", self.login_once)
+        except Retry:
+            print("Couldn't login!!!")
+            return False
+
+    def login_once(self):
         if self.get_page(LOGIN_URL, LOGIN_TITLE):
-            time.sleep(3)
+            self.wait_dom_settled(quiet=0.5, timeout=3)
             qrcode_el = self.browser.find_elements(By.XPATH, "//div[@data-testid='qrcode']")
             if len(qrcode_el)==0:
                 landing_title_el = self.browser.find_elements(By.XPATH, "//div[@class='landing-title']")
@@ -313,128 +2118,219 @@ class WhatsAppScraper:
                 else:
                     return True
             print("Please scan the QR Code to login!")
+            started = time.time()
             while True:
-                if confirmation_input("Done with scanning QR code?", 'y/N')==True:
+                if self.batch is not None:
+                    if time.time() - started > self.qr_scan_timeout:
+                        print(f"QR code not scanned within {self.qr_scan_timeout}s!")
+                        return False
+                    time.sleep(2)
+                    scanned = True
+                else:
+                    scanned = confirmation_input("Done with scanning QR code?", 'y/N')
+                if scanned==True:
                     qrcode_el = self.browser.find_elements(By.XPATH, "//div[@data-testid='qrcode']")
                     if len(qrcode_el)==0:
-                        time.sleep(1)
+                        self.wait_dom_settled()
                         print(f"Waiting for login redirect title {LOGIN_REDIRECT_TITLE}!")
                         if not self.is_page_ready(LOGIN_REDIRECT_TITLE):
                             if not self.is_title_valid(LOGIN_REDIRECT_TITLE):
-                                if not self.cleanup_session_login():
-                                    print("Couldn't login!!! Re-loging....")
-                                    return self.login()
-                        time.sleep(3)
+                                self.cleanup_session()
+                                raise Retry("Login redirect failed, re-loging")
+                        self.wait_dom_settled(quiet=0.5, timeout=3)
                         return True
-                    else:
+                    elif self.batch is None:
                         print("Scanning not done yet! Please scan the QR code...")
-        return self.cleanup_session_login()
+        if self.cleanup_session():
+            raise Retry("Session reset, re-loging")
+        return False
         
+    def get_row_name_mobile(self, item):
+        name = None
+        mobile = None
+        name_el = item.select(PARTICIPANT_NAME_SELECTOR)
+        if len(name_el)>0:
+            name = name_el[0].text
+        mobile_el = item.select(PARTICIPANT_MOBILE_SELECTOR)
+        if len(mobile_el)>0:
+            mobile = mobile_el[0].text
+            if mobile is None:
+                mobile = ""
+        return name, mobile
+
+    def get_soup_rows(self, selector):
+        # rows are copied out as plain tuples and the soup is released, tags would keep the whole page tree alive
+        soup = self.get_soup()
+        rows = [self.get_row_name_mobile(item) for item in soup.select(selector)]
+        self.release_soup(soup)
+        return rows
+
+    def get_popup_rows_incremental(self, start_y=0):
+        scroller = VirtualListScroller(self, "popup", POPUP_LISTITEM_SELECTOR, POPUP_FIELDS, POPUP_CONTAINER_SELECTOR, record_stage="popup-scroll")
+        for rows in scroller.walk(start_y or None):
+            yield rows
+            if self.journal is not None:
+                self.journal.scrolled(scroller.top)
+
+    def get_popup_rows_full_parse(self, el, start_y=0):
+        last_rows = None
+        for y in itertools.count(start_y, 800):
+            if self.deadline is not None:
+                self.deadline.check("scrolling the participants popup")
+            at_end = self.browser.execute_script(POPUP_SCROLL_SCRIPT, el, y)
+            # the list re-renders after the scroll, rows read before it settles would be the previous window's
+            self.wait_dom_settled(POPUP_CONTAINER_SELECTOR, quiet=0.05, timeout=1)
+            rows = self.get_soup_rows(POPUP_LISTITEM_SELECTOR)
+            self.record("popup-scroll", y=y)
+            if rows==last_rows:
+                break
+            last_rows = rows
+            yield rows
+            if self.journal is not None:
+                self.journal.scrolled(y)
+            if at_end:
+                break
+
+    def get_soup(self):
+        # html.parser / lxml parse the whole page source, subtree parses only the participant containers
+        if self.parser=="subtree":
+            html = self.browser.execute_script(OUTER_HTML_SCRIPT, PARTICIPANT_CONTAINER_SELECTORS)
+            try:
+                return BeautifulSoup(html, "lxml")
+            except Exception:
+                return BeautifulSoup(html, "html.parser")
+        return BeautifulSoup(self.browser.page_source, self.parser)
+
+    def release_soup(self, soup):
+        # decompose on the soup object itself leaves the tree below it in a reference cycle until the next
+        # full gc, so each top level node is decomposed first
+        for child in list(soup.contents):
+            child.decompose()
+        soup.decompose()
+
+    def journal_add(self, name, mobile):
+        if self.sink.active:
+            self.sink.write(name, mobile)
+        self.journal.add(name, mobile)
+
+    @timed("get_names_mobile")
     def get_names_mobile(self):
-        names = []
-        mobiles = []
+        participants = Participants(on_add=self.sink.write if self.sink.active else None)
+        resume_y = None
+        if self.journal is not None:
+            # rows journaled before an interruption go to the sink again but not back to the journal
+            rows, resume_y = self.journal.resume()
+            if len(rows)>0:
+                participants.extend(rows)
+                print(f"Resuming with {len(participants)} journaled participants from scroll offset {resume_y}")
+            participants.on_add = self.journal_add
         is_popup = True
         try:
-            soup = BeautifulSoup(self.browser.page_source, "html.parser")
-            listitem = soup.select("div[data-testid='popup-contents'] div[data-testid='contacts-modal'] div[role='listitem']")
-            if listitem is None or len(listitem)==0:
-                listitem = soup.select("div[data-testid='drawer-right'] div[data-testid='group-info-participants-section'] div[id='pane-side'] div[role='list'] div[role='listitem']")
-                is_popup = False
-            else:
+            soup = self.get_soup()
+            is_popup = len(soup.select(POPUP_LISTITEM_SELECTOR))>0
+            if not is_popup:
+                participants.extend(self.get_row_name_mobile(item) for item in soup.select("div[data-testid='drawer-right'] div[data-testid='group-info-participants-section'] div[id='pane-side'] div[role='list'] div[role='listitem']"))
+            self.release_soup(soup)
+            if is_popup:
                 print("Fetching participants from popup")
                 by_tuple = (By.XPATH, "//div[@data-testid='popup-contents']//div[@data-testid='contacts-modal']//div[@role='listitem']")
-                el = self.get_clickable_element(by_tuple)
-                listitem1 = []
-                listitem2 = []
-                listitem3 = []
-                for y in range(0, 100000, 800):
-                    self.browser.execute_script(f"arguments[0].parentElement.parentElement.parentElement.parentElement.scroll(0, {y})", el)
-                    soup = BeautifulSoup(self.browser.page_source, "html.parser")
-                    listitem1 = soup.select("div[data-testid='popup-contents'] div[data-testid='contacts-modal'] div[role='listitem']")
-                    if listitem1!=listitem2:
-                        listitem2 = listitem1
-                        listitem3 += listitem1
-                    else:
-                        if len(listitem3)>0:
-                            listitem += listitem3
-                        break
-                    time.sleep(0.1)
-            for item in listitem:
-                name_el = item.select("div[data-testid='cell-frame-title'] span")
-                name = None
-                if len(name_el)>0:
-                    name = name_el[0].text
-                mobile_el = item.select("div[data-testid='cell-frame-secondary'] div[role='gridcell'] span span")
-                if len(mobile_el)>0:
-                    mobile = mobile_el[0].text
-                    if mobile is None:
-                        mobile = ""
-                    if mobile not in mobiles or (name is not None and name not in names):
-                        names.append(name)
-                        mobiles.append(mobile)
-                elif name is not None and name not in names:
-                    names.append(name)
-                    mobiles.append("")
+                el = self.get_clickable_element(by_tuple, stage="waiting for the participants popup")
+                if self.incremental:
+                    for rows in self.get_popup_rows_incremental(resume_y or 0):
+                        participants.extend(rows)
+                else:
+                    for rows in self.get_popup_rows_full_parse(el, resume_y or 0):
+                        participants.extend(rows)
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             print("WhatsAppScraper.get_mobiles Error: ", e, traceback.format_exc())
+        names, mobiles = participants.names_mobiles()
         return names, mobiles, is_popup
 
     def check_and_click_more(self):
         done = False
         try:
             by_tuple = (By.XPATH, "//div[@data-testid='drawer-right']//div[@data-testid='group-info-participants-section']//div[@role='button' and @data-ignore-capture='any']//span[@data-testid='down' or contains(., 'View all')]")
-            el = self.get_clickable_element(by_tuple)
+            el = self.get_clickable_element(by_tuple, optional=True, stage="looking for the View all button")
             if el:
                 el.click()
-                time.sleep(0.5)
+                self.wait_dom_settled()
                 done = True
+        except DeadlineExceeded:
+            raise
         except:
             done = False
         return done
 
     def close_popup_contacts(self):
         by_tuple = (By.XPATH, "//div[@data-testid='popup-contents']//div[@data-testid='contacts-modal']//div[@role='button']//span[@data-testid='x']")
-        el = self.get_clickable_element(by_tuple)
+        el = self.get_clickable_element(by_tuple, optional=True, stage="closing the participants popup")
         if el:
             el.click()
 
     def close_group_info(self):
         by_tuple = (By.XPATH, "//div[@data-testid='drawer-right']//div[@data-testid='chat-info-drawer']//header//div[@data-testid='btn-closer-drawer']//span[@data-testid='x']")
-        el = self.get_clickable_element(by_tuple)
+        el = self.get_clickable_element(by_tuple, optional=True, stage="closing the group info")
         try:
             if el:
                 el.click()
         except Exception as e:
             print("WhatsAppScraper.close_group_info Error: ", e, traceback.format_exc())
         
+    def get_member_count(self):
+        try:
+            self.wait_dom_settled("div[data-testid='drawer-right']")
+            return self.browser.execute_script(MEMBER_COUNT_SCRIPT, "div[data-testid='drawer-right']")
+        except Exception as e:
+            print("WhatsAppScraper.get_member_count Error: ", e)
+        return None
+
+    @timed("get_name_mobile_list")
     def get_name_mobile_list(self, group_name):
         try:
             names = []
             mobiles = []
             
-            by_tuple = (By.XPATH, f"//div[@id='main']//header[@data-testid='conversation-header']//div[@data-testid='conversation-info-header']//span[@data-testid='conversation-info-header-chat-title'][contains(text(), '{group_name}')]")
-            el = self.get_clickable_element(by_tuple)
+            by_tuple = (By.XPATH, f"//div[@id='main']//header[@data-testid='conversation-header']//div[@data-testid='conversation-info-header']//span[@data-testid='conversation-info-header-chat-title'][contains(text(), {xpath_literal(group_name)})]")
+            el = self.get_clickable_element(by_tuple, stage="waiting for the conversation header")
             if el:
                 el.click()
             
                 by_tuple = (By.XPATH, "//div[@data-testid='drawer-right']//section[@data-testid='group-info-drawer-body']")
-                el = self.get_clickable_element(by_tuple)
+                el = self.get_clickable_element(by_tuple, stage="waiting for the group info")
 
                 if el:
                     el.click()
-                    el = WebDriverWait(self.browser, 10).until(EC.presence_of_element_located((By.XPATH, "//body")))
-                    for _ in range(0, 12):
-                        el.send_keys(Keys.TAB)
-                        time.sleep(0.02)
-                    time.sleep(0.2)
-                    el.send_keys(Keys.END)
-                    time.sleep(0.2)
+                    self.record("group-info", group_name=group_name)
+                    if self.group_cache is not None:
+                        self.member_count = self.get_member_count()
+                        # a group missing from the contact index is scraped again so it gets indexed
+                        indexed = self.contact_index is None or self.contact_index.has_group(group_name)
+                        if indexed and self.group_cache.is_unchanged(group_name, self.member_count, self.sink.filepath):
+                            self.cache_hit = True
+                            self.close_group_info()
+                            self.clear_search()
+                            return names, mobiles
+                    if self.cdp is not None:
+                        self.cdp.press_keys_and_evaluate("Tab", 12, settled_expression("div[data-testid='drawer-right']", DOM_SETTLE_QUIET, DOM_SETTLE_TIMEOUT))
+                        self.cdp.press_keys_and_evaluate("End", 1, settled_expression("div[data-testid='drawer-right']", DOM_SETTLE_QUIET, DOM_SETTLE_TIMEOUT))
+                    else:
+                        el = WebDriverWait(self.browser, 10).until(EC.presence_of_element_located((By.XPATH, "//body")))
+                        for _ in range(0, 12):
+                            el.send_keys(Keys.TAB)
+                            time.sleep(0.02)
+                        self.wait_dom_settled("div[data-testid='drawer-right']")
+                        el.send_keys(Keys.END)
+                        self.wait_dom_settled("div[data-testid='drawer-right']")
                     self.check_and_click_more()
                     names, mobiles, is_popup = self.get_names_mobile()
                     if is_popup:
                         self.close_popup_contacts()
                     self.close_group_info()
                     self.clear_search()
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             print("WhatsAppScraper.get_name_mobile_list Error: ", e , traceback.format_exc())        
         return names, mobiles
@@ -451,125 +2347,140 @@ class WhatsAppScraper:
         return val
 
 
+    @timed("parse_and_save")
     def parse_and_save(self, group_name):
         try:
             saved = False
             names = []
             mobiles = []
-            names, mobiles = self.get_name_mobile_list(group_name)
-            if len(names)>0:
-                filepath = DATA_DIR / f"{self.remove_special_chars(group_name)}.xlsx"
-                df = pd.DataFrame({
-                                "Name": names, 
-                                "Mobile": mobiles, 
-                            })
-                sheet_name = "Participants"
+            self.member_count = None
+            self.cache_hit = False
+            self.sink.start_group(group_name, self.remove_special_chars(group_name))
+            output = self.sink.filepath
+            try:
+                names, mobiles = self.get_name_mobile_list(group_name)
+            except Exception:
+                self.sink.abort_group()
+                raise
+            if self.cache_hit:
+                self.sink.abort_group()
+                print(f"Group {group_name} is unchanged ({self.member_count} participants). Reusing '{output}'")
+                saved = True
+            elif len(names)>0:
                 while True:
                     try:
-                        with pd.ExcelWriter(path=str(filepath.absolute()), engine="openpyxl") as writer:
-                            df.to_excel(excel_writer=writer, sheet_name=sheet_name, index=False)
-                        print(f"{len(mobiles)} participants have been saved in sheet '{sheet_name}' at '{filepath}'")
+                        with self.span("export"):
+                            self.sink.end_group()
+                        self.participants_saved += len(mobiles)
                         saved = True
+                        changed = True
+                        if self.group_cache is not None:
+                            # groups are re-scraped on a member count change, another output format or a missing export,
+                            # the fingerprint tells whether their participants really changed
+                            changed = self.group_cache.update(group_name, self.member_count, names, mobiles, output)
+                            if changed:
+                                print(f"Group {group_name}: participants changed since the last scrape")
+                            else:
+                                print(f"Group {group_name}: participants unchanged since the last scrape")
+                        if self.contact_index is not None and (changed or not self.contact_index.has_group(group_name)):
+                            try:
+                                self.contact_index.save_group(group_name, names, mobiles, self.member_count)
+                            except Exception as e:
+                                print("WhatsAppScraper.parse_and_save ContactIndex Error: ", e)
                         break
                     except Exception as e:
                         print("WhatsAppScraper.parse_and_save Error1: ", e, traceback.format_exc())
-                        if confirmation_input("Try again?", "y/N")==False:
+                        if self.batch is not None or confirmation_input("Try again?", "y/N")==False:
                             print("Data not saved. Procceeding to next!")
+                            self.sink.abort_group()
                             break                    
             else:
+                self.sink.abort_group()
                 print(f"Group {group_name} has no participants.")
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             print("WhatsAppScraper.parse_and_save Error2: ", e, traceback.format_exc())
         return saved
 
-    def _get_group_names(self):
-        chat_names = []
-        group_names = []
+    def get_chat_rows(self):
+        rows = []
         try:
-            els = self.browser.find_elements(By.XPATH, "//div[@id='pane-side']//div[@aria-label='Chat list']//div[@role='listitem']//div[@data-testid='cell-frame-container']//div[@data-testid='cell-frame-title']//span")
-            for el in els:
-                try:
-                    chat_names.append(el.text)
-                    is_normal_chat = self.browser.execute_script("""return (arguments[0].parentElement.parentElement.parentElement.parentElement.querySelector("div[data-testid='chatlist-status-v3-ring']")!=null);""", el)
-                    if not is_normal_chat:
-                        group_names.append(el.text)
-                except StaleElementReferenceException as e:
-                    print("WhatsAppScraper._get_group_names Error1: ", e)
+            # recorded as the page returned them, [title, is_normal_chat], so a replay can serve them back
+            page_rows = json.loads(self.browser.execute_script(CHAT_LIST_ROWS_SCRIPT, CHAT_LIST_TITLE_SELECTOR) or "[]")
+            self.record("chat-list", rows=page_rows)
+            rows = [(title, not is_normal_chat) for title, is_normal_chat in page_rows]
         except Exception as e:
-            print("WhatsAppScraper._get_group_names Error2: ", e, traceback.format_exc())    
-        return (list(set(chat_names)), list(set(group_names)))
+            print("WhatsAppScraper.get_chat_rows Error: ", e, traceback.format_exc())
+        return rows
 
-    def get_group_names(self):
-        chat_names = []
-        group_names = []
+    @timed("get_group_names")
+    def get_group_names(self, delta=True):
+        index = ChatIndex()
+        index.start_sync()
+        complete = True
+        started = time.time()
         try:
-            chat_names1, group_names1 = self._get_group_names()
-            chat_names += chat_names1
-            group_names += group_names1
-            el = self.get_clickable_element((By.XPATH, "//div[@data-testid='chat-list']"))
-            if el:
-                el.click()
-                el = WebDriverWait(self.browser, 10).until(EC.presence_of_element_located((By.XPATH, "//body")))
-                el.send_keys(Keys.TAB)
-                el.send_keys(Keys.TAB)
-                el.send_keys(Keys.TAB)
-                el.send_keys(Keys.TAB)
-                el.send_keys(Keys.TAB)
-                chat_names2 = []
-                while True:
-                    for _ in range(0, 8):
-                        el.send_keys(Keys.DOWN)
-                        time.sleep(0.03)
-                    time.sleep(0.15)
-                    chat_names1, group_names1 = self._get_group_names()
-                    if chat_names1!=chat_names2:
-                        chat_names2 = chat_names1
-                        group_names += group_names1
-                    else:
-                        break
+            if index.observe(self.get_chat_rows()) and delta:
+                complete = False
+            else:
+                el = self.get_clickable_element((By.XPATH, "//div[@data-testid='chat-list']"))
+                if el:
+                    scroller = VirtualListScroller(self, "chat_list", CHAT_LIST_ITEM_SELECTOR, CHAT_LIST_FIELDS, "#pane-side", record_stage="chat-list-scroll")
+                    for rows in scroller.walk(start_top=0):
+                        if index.observe([(title, not is_normal_chat) for title, is_normal_chat in rows]) and delta:
+                            complete = False
+                            break
         except Exception as e:
+            complete = False
             print("WhatsAppScraper.get_group_names Error: ", e, traceback.format_exc())
-        group_names = list(filter(None, sorted(set(group_names))))
-        with open(GROUP_NAMES_PATH, "w", encoding="UTF-8") as fp:
-            json.dump(obj=group_names, fp=fp, indent=4)
-        return group_names
+        new_chats, removed = index.finish_sync(complete)
+        print(f"{'Full' if complete else 'Delta'} sync: {len(index.seen)} chats walked, {new_chats} new, {removed} removed, {len(index.chats)} indexed in {time.time()-started:.1f}s")
+        return index.group_names()
 
     def clear_search(self):
         try:
             by_tuple = (By.XPATH, "//div[@data-testid='chat-list-search-container']//button[@aria-label='Cancel search']")
-            el = self.get_clickable_element(by_tuple)
+            el = self.get_clickable_element(by_tuple, optional=True, stage="clearing the search")
             if el:
                 el.click()
+        except DeadlineExceeded:
+            raise
         except:
             pass
 
+    def get_search_result_titles(self, timeout=10):
+        titles = []
+        try:
+            titles = WebDriverWait(self.browser, timeout, poll_frequency=0.1).until(
+                lambda browser: json.loads(browser.execute_script(SEARCH_RESULTS_SCRIPT, SEARCH_RESULT_TITLE_SELECTOR, None) or "[]")
+            )
+            self.wait_dom_settled("#pane-side", quiet=0.05, timeout=1)
+            titles = json.loads(self.browser.execute_script(SEARCH_RESULTS_SCRIPT, SEARCH_RESULT_TITLE_SELECTOR, None) or "[]") or titles
+        except TimeoutException:
+            pass
+        return titles
+
+    @timed("find_and_get_group")
     def find_and_get_group(self, group_name):
         self.clear_search()
         els = self.browser.find_elements(By.XPATH, "//div[@data-testid='chat-list-search']//p")
         if len(els)>0:
             el = els[0]
             el.send_keys(group_name)
-            time.sleep(0.5)
-            l = len(group_name)
-            error = ""
-            r = int(30*l/100)
-            if r==0:
-                r = 1
-            for i in range(0, r):
-                try:
-                    truncated_group_name = group_name[:l-i]
-                    print("truncated_group_name: ", truncated_group_name)
-                    by_tuple = (By.XPATH, f"//div[@id='pane-side']//div[@aria-label='Search results.']//div[@role='listitem']//div[@data-testid='cell-frame-container']//div[@data-testid='cell-frame-title']//span[contains(text(), '{truncated_group_name}')]")
-                    el = self.get_clickable_element(by_tuple)
-                except Exception as e:
-                    error = str(e)
-                    el = None
-            if el:
-                el.click()
-                time.sleep(1)
-                return True
-            else:
-                print("WhatsAppScraper.find_and_get_group Error: ", error)
+            self.wait_dom_settled("#pane-side")
+            titles = self.get_search_result_titles()
+            self.record("search-results", group_name=group_name, titles=titles)
+            idx = best_title_index(group_name, titles)
+            if idx is not None:
+                print("Matched search result: ", titles[idx])
+                el = self.browser.execute_script(SEARCH_RESULTS_SCRIPT, SEARCH_RESULT_TITLE_SELECTOR, idx)
+                if el:
+                    el.click()
+                    self.wait_dom_settled("#main")
+                    self.record("group-opened", group_name=group_name)
+                    return True
+            print("WhatsAppScraper.find_and_get_group Error: ", f"No search result matches {group_name} in {titles}")
         return False
 
     def ask_target_group_name(self, group_names):
@@ -597,77 +2508,306 @@ class WhatsAppScraper:
             
 
 
-    def start_scraping(self):
+    def close_sink(self):
+        try:
+            self.sink.close()
+        except Exception as e:
+            print("WhatsAppScraper.close_sink Error: ", e, traceback.format_exc())
+
+    def reset_group_view(self):
+        # best effort cleanup after a group was stopped halfway, outside of any deadline
+        self.deadline = None
+        with suppress(Exception):
+            self.close_popup_contacts()
+        with suppress(Exception):
+            self.close_group_info()
+        with suppress(Exception):
+            self.clear_search()
+
+    @timed("group")
+    def process_group_unattended(self, group_name):
+        print(f"Processing group name: {group_name}")
+        saved = False
+        reason = None
+        participants_saved = self.participants_saved
+        self.cache_hit = False
+        # a run of failed groups opens the circuit and pauses here before chrome is hit again
+        self.retries.breaker.wait()
+        if self.journal is not None:
+            self.journal.start_group(group_name)
+        deadline = self.deadline = Deadline(self.group_timeout)
+        try:
+            if self.find_and_get_group(group_name):
+                saved = self.parse_and_save(group_name)
+            else:
+                print(f"Couldn't find group: {group_name}")
+        except DeadlineExceeded as e:
+            reason = str(e)
+            print(f"Skipping group: {group_name}. {reason}")
+            self.reset_group_view()
+        except Exception as e:
+            print("WhatsAppScraper.process_group_unattended Error: ", e, traceback.format_exc())
+            print(f"Skipping group: {group_name}")
+        result = {
+            "group_name": group_name,
+            "saved": saved,
+            "participants": self.participants_saved - participants_saved,
+            "cache_hit": saved and self.cache_hit,
+            "reason": reason,
+            "output": str(self.sink.filepath) if saved and self.sink.filepath is not None else None,
+        }
+        result.update(deadline.summary())
+        self.retries.breaker.record(saved)
+        if self.journal is not None:
+            self.journal.end_group(group_name, saved)
+        print(f"Group took {result['elapsed']:.1f}s, {result['waits']} element waits, {result['waited']:.1f}s waiting, longest wait {result['longest_wait']:.1f}s ({result['longest_wait_stage']})")
+        self.deadline = None
+        print("####################################################################")
+        print()
+        return result
+
+    def run_batch(self, group_names):
+        if not self.resume:
+            clear_journals()
+        self.journal = Journal()
+        jobs = deque(select_group_names(group_names, **self.batch))
+        skipped = [group_name for group_name in jobs if self.journal.is_done(group_name)]
+        if len(skipped)>0:
+            print(f"Skipping {len(skipped)} groups already done by the interrupted run (see {JOURNAL_PATH}, --no-resume to start over)")
+            jobs = deque(group_name for group_name in jobs if not self.journal.is_done(group_name))
+        print(f"{len(jobs)} groups queued for processing")
+        processed = 0
+        failed = []
+        self.participants_saved = 0
+        cache_hits = 0
+        group_results = []
+        started = time.time()
+        while len(jobs)>0:
+            group_name = jobs.popleft()
+            result = self.process_group_unattended(group_name)
+            group_results.append(result)
+            if result["saved"]:
+                processed += 1
+                cache_hits += int(result["cache_hit"])
+            else:
+                failed.append(group_name)
+        print_batch_stats(processed, failed, self.participants_saved, time.time() - started, cache_hits, processed+len(failed) if self.group_cache is not None else 0, group_results)
+        self.journal.close()
+        if len(failed)==0:
+            clear_journals()
+        self.journal = None
+        return processed, failed
+
+    def run_worker(self, jobs, results):
         try:
-            max_retries = 3
-            retry = 0
+            self.config_browser()
+            if not self.login():
+                raise Exception("Couldn't login!")
+            WebDriverWait(self.browser, 20).until(EC.presence_of_element_located((By.TAG_NAME, "title")))
             while True:
                 try:
-                    self.config_browser()
+                    group_name = jobs.get_nowait()
+                except queue.Empty:
                     break
-                except Exception as e:
-                    print("WhatsAppScraper.start_scraping Error: ", e, traceback.format_exc())
-                    retry += 1
-                if retry>max_retries:
-                    raise Exception("Browser can't be configured at this moment!")
-            time.sleep(1)
-            if self.login():
-                WebDriverWait(self.browser, 20).until(EC.presence_of_element_located((By.TAG_NAME, "title")))
-                group_names = []
-                while True:
-                    if confirmation_input("Sync the group names?", "N/y")==True:
-                        print("Fetching group names...")
-                        group_names = self.get_group_names()
-                    else:
-                        if GROUP_NAMES_PATH.exists():
-                            print("Loading group names...")
-                            with open(GROUP_NAMES_PATH, "r", encoding="UTF-8") as fp:
-                                group_names = json.load(fp)
-                        else:
-                            break
-                    if len(group_names)==0:
-                        print("No group name found!!!")
-                    else:
-                        break
-                
-                while len(group_names)>0:
-                    target_group_names = self.ask_target_group_name(group_names)
-                    for i, group_name in enumerate(target_group_names):
-                        if confirmation_input(f"Process group name: {group_name}", 'y/N')==False:continue
-                        try:
-                            while True:
-                                print(f"Processing group name: {group_name}")
-                                try:
-                                    found = self.find_and_get_group(group_name)
-                                    if found:
-                                        if self.parse_and_save(group_name)==True:break
-                                    else:
-                                        print(f"Couldn't find group: {group_name}")
-                                        if confirmation_input(f"Retry with re-configuring and re-login...", "N/y")==True:
-                                            return self.start_scraping()
-                                        else:
-                                            print(f"Trying to find the group {group_name} again...")
-                                except Exception as e:
-                                    print("WhatsAppScraper.start_scraper Error: ", e, traceback.format_exc())
-                                    print(f"Skipping group: {group_name}")
-                                    break
-                            print("####################################################################")
-                            print()
-                        except Exception as e:
-                            print("WhatsAppScraper.start_scraping Error1: ", e, traceback.format_exc())
-                    print("######################## DONE ########################")
-                    print()
-                    if confirmation_input("Process again?", "Y/n")==False:
-                        break
-                print("######################## COMPLETED ########################")
+                results.put(self.process_group_unattended(group_name))
+        except Exception as e:
+            print("WhatsAppScraper.run_worker Error: ", e, traceback.format_exc())
+        if self.journal is not None:
+            self.journal.close()
+        self.close_sink()
+        self.export_metrics(self.metrics_name)
+        self.kill_browser_process()
+
+    def submit_job(self, group_names, output_format):
+        if isinstance(group_names, str):
+            group_names = [group_names]
+        if not group_names or not all(isinstance(group_name, str) for group_name in group_names):
+            raise Exception("group_names must be a non-empty list of group names")
+        if output_format not in OUTPUT_FORMATS:
+            raise Exception(f"output_format must be one of {list(OUTPUT_FORMATS.keys())}")
+        with self.jobs_lock:
+            self.last_job_id += 1
+            job = {
+                "id": str(self.last_job_id),
+                "group_names": group_names,
+                "output_format": output_format,
+                "status": "queued",
+                "results": [],
+                "queued_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+            }
+            self.jobs[job["id"]] = job
+        self.job_queue.put(job["id"])
+        return dict(job)
+
+    def get_job(self, job_id):
+        with self.jobs_lock:
+            job = self.jobs.get(job_id)
+            return None if job is None else dict(job, results=list(job["results"]))
+
+    def list_jobs(self):
+        with self.jobs_lock:
+            return [{"id": job["id"], "status": job["status"], "group_names": job["group_names"]} for job in self.jobs.values()]
+
+    def run_job(self, job_id):
+        job = self.jobs[job_id]
+        with self.jobs_lock:
+            job["status"] = "running"
+            job["started_at"] = time.time()
+        sink = self.sink
+        try:
+            self.sink = OUTPUT_FORMATS[job["output_format"]]()
+            for group_name in job["group_names"]:
+                result = self.process_group_unattended(group_name)
+                with self.jobs_lock:
+                    job["results"].append(result)
+            self.sink.close()
+            status = "done"
+        except Exception as e:
+            print("WhatsAppScraper.run_job Error: ", e, traceback.format_exc())
+            status = "failed"
+        self.sink = sink
+        with self.jobs_lock:
+            job["status"] = status
+            job["finished_at"] = time.time()
+            job["elapsed"] = job["finished_at"] - job["started_at"]
+        print(f"Job {job_id} {status} in {job['elapsed']:.1f}s")
+
+    def serve(self, host="127.0.0.1", port=8765):
+        # keeps one logged-in browser warm and runs the submitted jobs one after another on this thread
+        import threading
+        from http.server import ThreadingHTTPServer
+        self.batch = {} if self.batch is None else self.batch
+        self.jobs = {}
+        self.jobs_lock = threading.Lock()
+        self.job_queue = queue.Queue()
+        self.last_job_id = 0
+        self.server_address = None
+        server = None
+        try:
+            self.config_browser()
+            if not self.login():
+                raise Exception("Couldn't login!")
+            WebDriverWait(self.browser, 20).until(EC.presence_of_element_located((By.TAG_NAME, "title")))
+            server = ThreadingHTTPServer((host, port), make_job_request_handler(self))
+            # port 0 binds a free port, server_address has the one actually used
+            self.server_address = server.server_address
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            print(f"Listening for scrape jobs on http://{host}:{self.server_address[1]}/jobs")
+            while True:
+                job_id = self.job_queue.get()
+                if job_id is None:
+                    break
+                self.run_job(job_id)
+                self.export_metrics(self.metrics_name)
+        except KeyboardInterrupt:
+            print("Stopping daemon...")
+        except Exception as e:
+            print("WhatsAppScraper.serve Error: ", e, traceback.format_exc())
+        if server is not None:
+            server.shutdown()
+        self.export_metrics(self.metrics_name)
+        self.kill_browser_process()
+
+    def stop_serving(self):
+        # serve returns once the jobs queued before this one are done
+        self.job_queue.put(None)
+
+    def start_scraping(self):
+        def session():
+            try:
+                self.scrape_session()
+            except RestartSession as e:
+                raise Retry(e)
+        try:
+            self.retries.run("session", session)
         except Exception as e:
             print("WhatsAppScraper.start_scraping Error2: ", e, traceback.format_exc())
+        self.close_sink()
+        self.export_metrics(self.metrics_name)
         self.kill_browser_process()
+
+    def scrape_session(self):
+        try:
+            self.config_browser()
+        except Exception as e:
+            print("WhatsAppScraper.start_scraping Error: ", e, traceback.format_exc())
+            raise Exception("Browser can't be configured at this moment!")
+        time.sleep(1)
+        if self.login():
+            WebDriverWait(self.browser, 20).until(EC.presence_of_element_located((By.TAG_NAME, "title")))
+            group_names = []
+            if self.batch is not None:
+                group_names = load_group_names()
+                if len(group_names)==0 and not self.batch.get("groups_file"):
+                    print("Fetching group names...")
+                    group_names = self.get_group_names(delta=not self.full_sync)
+                self.run_batch(group_names)
+                group_names = []
+            while self.batch is None:
+                if confirmation_input("Sync the group names?", "N/y")==True:
+                    print("Fetching group names...")
+                    group_names = self.get_group_names(delta=not self.full_sync)
+                else:
+                    if GROUP_NAMES_PATH.exists():
+                        print("Loading group names...")
+                        group_names = load_group_names()
+                    else:
+                        break
+                if len(group_names)==0:
+                    print("No group name found!!!")
+                else:
+                    break
             
+            while len(group_names)>0:
+                target_group_names = self.ask_target_group_name(group_names)
+                for i, group_name in enumerate(target_group_names):
+                    if confirmation_input(f"Process group name: {group_name}", 'y/N')==False:continue
+                    try:
+                        while True:
+                            print(f"Processing group name: {group_name}")
+                            try:
+                                self.deadline = Deadline(self.group_timeout)
+                                found = self.find_and_get_group(group_name)
+                                if found:
+                                    if self.parse_and_save(group_name)==True:break
+                                else:
+                                    print(f"Couldn't find group: {group_name}")
+                                    self.deadline = None
+                                    if confirmation_input(f"Retry with re-configuring and re-login...", "N/y")==True:
+                                        raise RestartSession(f"Couldn't find group: {group_name}")
+                                    else:
+                                        print(f"Trying to find the group {group_name} again...")
+                            except RestartSession:
+                                raise
+                            except DeadlineExceeded as e:
+                                print(f"Skipping group: {group_name}. {e}")
+                                self.reset_group_view()
+                                break
+                            except Exception as e:
+                                print("WhatsAppScraper.start_scraper Error: ", e, traceback.format_exc())
+                                print(f"Skipping group: {group_name}")
+                                break
+                            finally:
+                                self.deadline = None
+                        print("####################################################################")
+                        print()
+                    except RestartSession:
+                        raise
+                    except Exception as e:
+                        print("WhatsAppScraper.start_scraping Error1: ", e, traceback.format_exc())
+                print("######################## DONE ########################")
+                print()
+                if confirmation_input("Process again?", "Y/n")==False:
+                    break
+            print("######################## COMPLETED ########################")
 
 
 if __name__ == "__main__":
+    import argparse
     argv = sys.argv
+    load_settings()
     parser = argparse.ArgumentParser(prog=PROJECT_NAME, description=PROJECT_DESCRIPTION)
     parser.version = VERSION
     parser.add_argument("-v", "--version", action="version", version=parser.version)
@@ -680,10 +2820,261 @@ if __name__ == "__main__":
         required=False,
         help="Run script with visible mode, default: visible"
     )
+    parser.add_argument(
+        "-fp",
+        "--full-parse",
+        dest="FULL_PARSE",
+        action='store_true',
+        default=False,
+        required=False,
+        help="Re-parse the whole page source on every popup scroll step instead of fetching only the new rows, default: incremental"
+    )
+
+    parser.add_argument(
+        "-a",
+        "--all-groups",
+        dest="ALL_GROUPS",
+        action='store_true',
+        default=False,
+        required=False,
+        help="Process every group in groupnames.json without prompts"
+    )
+    parser.add_argument(
+        "-gf",
+        "--groups-file",
+        dest="GROUPS_FILE",
+        default=None,
+        required=False,
+        help="Process the group names listed in the file (one per line) without prompts"
+    )
+    parser.add_argument(
+        "-gg",
+        "--group-glob",
+        dest="GROUP_GLOB",
+        default=None,
+        required=False,
+        help="Process the groups in groupnames.json matching the glob pattern without prompts"
+    )
+    parser.add_argument(
+        "-gr",
+        "--group-regex",
+        dest="GROUP_REGEX",
+        default=None,
+        required=False,
+        help="Process the groups in groupnames.json matching the regular expression without prompts"
+    )
+
+    parser.add_argument(
+        "-w",
+        "--workers",
+        dest="WORKERS",
+        type=int,
+        default=1,
+        required=False,
+        help="Number of browser profiles scraping groups in parallel in batch mode, default: 1"
+    )
+
+    parser.add_argument(
+        "-o",
+        "--output-format",
+        dest="OUTPUT_FORMAT",
+        choices=list(OUTPUT_FORMATS.keys()),
+        default="xlsx",
+        required=False,
+        help="xlsx: one excel file per group, csv/jsonl/parquet: one file per group streamed while scraping, workbook: one excel file with a sheet per group, default: xlsx"
+    )
+
+    parser.add_argument(
+        "-d",
+        "--daemon",
+        dest="DAEMON",
+        action='store_true',
+        default=False,
+        required=False,
+        help="Keep a logged-in browser running and accept scrape jobs over a local HTTP API"
+    )
+    parser.add_argument(
+        "--host",
+        dest="HOST",
+        default="127.0.0.1",
+        required=False,
+        help="Daemon listen address, default: 127.0.0.1"
+    )
+    parser.add_argument(
+        "--port",
+        dest="PORT",
+        type=int,
+        default=8765,
+        required=False,
+        help="Daemon listen port, default: 8765"
+    )
+
+    parser.add_argument(
+        "-fs",
+        "--full-sync",
+        dest="FULL_SYNC",
+        action='store_true',
+        default=False,
+        required=False,
+        help="Walk the whole chat list when syncing the group names instead of stopping at the already indexed chats, default: delta sync"
+    )
+
+    parser.add_argument(
+        "-nc",
+        "--no-cache",
+        dest="NO_CACHE",
+        action='store_true',
+        default=False,
+        required=False,
+        help="Always re-scrape every group instead of reusing the last export of groups whose participant count is unchanged"
+    )
+
+    parser.add_argument(
+        "-p",
+        "--parser",
+        dest="PARSER",
+        choices=HTML_PARSERS,
+        default="html.parser",
+        required=False,
+        help="html.parser/lxml: parse the whole page with that parser, subtree: parse only the participant containers, default: html.parser"
+    )
+
+    parser.add_argument(
+        "-r",
+        "--record",
+        dest="RECORD",
+        default=None,
+        required=False,
+        help="Save the page source seen at each scraping step into a timestamped folder inside this folder"
+    )
+
+    parser.add_argument(
+        "-m",
+        "--metrics",
+        dest="METRICS",
+        default=None,
+        required=False,
+        help="Save per-stage timings and WebDriver command counts of the run as JSON and a Prometheus textfile into this folder"
+    )
+
+    parser.add_argument(
+        "-gt",
+        "--group-timeout",
+        dest="GROUP_TIMEOUT",
+        type=float,
+        default=None,
+        required=False,
+        help="Seconds a single group may take before it is skipped, default: group_timeout in settings.config"
+    )
+
+    parser.add_argument(
+        "-b",
+        "--backend",
+        dest="BACKEND",
+        choices=BROWSER_BACKENDS,
+        default="selenium",
+        required=False,
+        help="selenium: drive every step through chromedriver, cdp: send the scrolling, key and script steps straight to Chrome DevTools in pipelined batches, default: selenium"
+    )
+
+    parser.add_argument(
+        "-l",
+        "--lean",
+        dest="LEAN",
+        action='store_true',
+        default=False,
+        required=False,
+        help="Run a lean browser: block images, media and fonts, turn off animations and smooth scrolling and use a small fixed window, default: off"
+    )
+
+    parser.add_argument(
+        "-nci",
+        "--no-contact-index",
+        dest="CONTACT_INDEX",
+        action='store_false',
+        default=True,
+        required=False,
+        help="Don't write the scraped participants into the contacts.sqlite3 index, default: write"
+    )
+
+    parser.add_argument(
+        "-fc",
+        "--find-contact",
+        dest="FIND_CONTACT",
+        default=None,
+        required=False,
+        help="Look up a mobile number in the contact index and print the groups it is a member of, then exit"
+    )
+
+    parser.add_argument(
+        "-sc",
+        "--shared-contacts",
+        dest="SHARED_CONTACTS",
+        type=int,
+        nargs="?",
+        const=2,
+        default=None,
+        required=False,
+        help="Print the numbers of the contact index that are members of at least this many groups (2 when no value is given), then exit"
+    )
+
+    parser.add_argument(
+        "-nr",
+        "--no-resume",
+        dest="RESUME",
+        action='store_false',
+        default=True,
+        required=False,
+        help="Unattended runs: drop the journal of an interrupted run and start over instead of skipping its done groups and resuming its partial group"
+    )
 
     args = parser.parse_args(argv[1:])
     print(parser.description)
     INVISIBLE = args.INVISIBLE
     print("INVISIBLE: ", INVISIBLE)
-    wp_scraper = WhatsAppScraper(invisible=INVISIBLE)
-    wp_scraper.start_scraping()
+    INCREMENTAL = not args.FULL_PARSE
+    print("INCREMENTAL: ", INCREMENTAL)
+    BATCH = None
+    if args.ALL_GROUPS or args.GROUPS_FILE or args.GROUP_GLOB or args.GROUP_REGEX:
+        BATCH = {
+            "all_groups": args.ALL_GROUPS,
+            "groups_file": args.GROUPS_FILE,
+            "group_glob": args.GROUP_GLOB,
+            "group_regex": args.GROUP_REGEX,
+        }
+    print("BATCH: ", BATCH is not None)
+    FULL_SYNC = args.FULL_SYNC
+    USE_CACHE = not args.NO_CACHE
+    print("USE_CACHE: ", USE_CACHE)
+    OUTPUT_FORMAT = args.OUTPUT_FORMAT
+    print("OUTPUT_FORMAT: ", OUTPUT_FORMAT)
+    WORKERS = args.WORKERS
+    PARSER = args.PARSER
+    print("PARSER: ", PARSER)
+    SCRAPER_KWARGS = {
+        "invisible": INVISIBLE,
+        "incremental": INCREMENTAL,
+        "output_format": OUTPUT_FORMAT,
+        "full_sync": FULL_SYNC,
+        "use_cache": USE_CACHE,
+        "parser": PARSER,
+        "record": args.RECORD,
+        "metrics": args.METRICS,
+        "group_timeout": args.GROUP_TIMEOUT,
+        "backend": args.BACKEND,
+        "lean": args.LEAN,
+        "contact_index": args.CONTACT_INDEX,
+        "resume": args.RESUME,
+    }
+    if args.FIND_CONTACT is not None or args.SHARED_CONTACTS is not None:
+        query_contact_index(args.FIND_CONTACT, args.SHARED_CONTACTS)
+        sys.exit(0)
+    if args.DAEMON:
+        wp_scraper = WhatsAppScraper(**SCRAPER_KWARGS)
+        wp_scraper.serve(args.HOST, args.PORT)
+    elif BATCH is not None and WORKERS>1:
+        print("WORKERS: ", WORKERS)
+        run_pool(WORKERS, BATCH, **SCRAPER_KWARGS)
+    else:
+        wp_scraper = WhatsAppScraper(batch=BATCH, **SCRAPER_KWARGS)
+        wp_scraper.start_scraping()
@@ -0,0 +1,33 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # main.py resolves settings, data, exports and journals against the working directory
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def chrome():
+    # a headless Chrome for the tests that need a real DOM, skipped where Chrome or its driver is missing
+    import shutil
+    if not any(shutil.which(name) for name in ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome")):
+        pytest.skip("Chrome is not installed")
+    from selenium import webdriver
+    from selenium.common.exceptions import WebDriverException
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    try:
+        browser = webdriver.Chrome(options=options)
+    except WebDriverException as e:
+        pytest.skip(f"Chrome can't be started: {e.msg}")
+    yield browser
+    browser.quit()
@@ -0,0 +1,399 @@
+import json
+import shutil
+import time
+from collections import Counter
+from html import escape
+from pathlib import Path
+
+import main
+
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+
+def synthetic_members(count):
+    return [(f"Member {i}", f"+91 9{i:09d}") for i in range(count)]
+
+
+def make_scraper(driver, workdir, **kwargs):
+    # a real WhatsAppScraper set up in workdir (settings, data and profile dirs) driving the fake driver
+    shutil.copy(REPO_DIR / "settings.config", Path(workdir) / "settings.config")
+    kwargs.setdefault("batch", {})
+    kwargs.setdefault("use_cache", False)
+    kwargs.setdefault("contact_index", False)
+    kwargs.setdefault("output_format", "csv")
+    scraper = main.WhatsAppScraper(**kwargs)
+    scraper.browser = driver
+    return scraper
+
+
+class FakeElement:
+    def __init__(self, driver, locator) -> None:
+        self.driver = driver
+        self.locator = locator
+
+    def is_displayed(self):
+        return True
+
+    def is_enabled(self):
+        return True
+
+    def click(self):
+        self.driver.count("click")
+        self.driver.clicked(self.locator)
+
+    def send_keys(self, *keys):
+        self.driver.count("sendKeys")
+        self.driver.typed(self.locator, keys)
+
+
+class FakeDriver:
+    # Counts every WebDriver command and can inject faults: faults={"get": [TimeoutException(), ...]}
+    def __init__(self, faults=None) -> None:
+        self.calls = Counter()
+        self.faults = {command: list(errors) for command, errors in (faults or {}).items()}
+        self.session_id = "fake-session"
+        self.title = "WhatsApp"
+        self.current_url = "https://web.whatsapp.com/"
+
+    def count(self, command):
+        self.calls[command] += 1
+        errors = self.faults.get(command)
+        if errors:
+            raise errors.pop(0)
+
+    @property
+    def commands(self):
+        return sum(self.calls.values())
+
+    def get(self, url):
+        self.count("get")
+        self.current_url = url
+
+    def refresh(self):
+        self.count("refresh")
+
+    def set_script_timeout(self, timeout):
+        pass
+
+    def find_element(self, by, value):
+        self.count("findElement")
+        return FakeElement(self, (by, value))
+
+    def find_elements(self, by, value):
+        self.count("findElements")
+        return [FakeElement(self, (by, value))]
+
+    def execute_async_script(self, script, *args):
+        # the DOM of a fake page is always settled
+        self.count("executeAsyncScript")
+        return True
+
+    def execute_script(self, script, *args):
+        self.count("executeScript")
+        return None
+
+    @property
+    def page_source(self):
+        self.count("getPageSource")
+        return "<html><head><title>WhatsApp</title></head><body></body></html>"
+
+    def quit(self):
+        self.count("quit")
+
+    def clicked(self, locator):
+        pass
+
+    def typed(self, locator, keys):
+        pass
+
+
+class FakePopupDriver(FakeDriver):
+    # The participants popup as WhatsApp renders it: a virtual list keeping only the rows in the
+    # viewport plus a few buffer rows in the DOM. A lazy one only re-renders once a settle wait ran
+    def __init__(self, members, row_height=72, viewport=600, buffer=3, lazy=False, faults=None) -> None:
+        super().__init__(faults)
+        self.members = members
+        self.row_height = row_height
+        self.viewport = viewport
+        self.buffer = buffer
+        self.lazy = lazy
+        self.scroll_top = 0
+        self.rendered_top = 0
+        self.scroll_tops = []
+        self.lists = {}
+
+    @property
+    def scroll_height(self):
+        return len(self.members)*self.row_height
+
+    def scroll_to(self, top):
+        self.scroll_top = max(0, min(int(top), self.scroll_height - self.viewport))
+        self.scroll_tops.append(self.scroll_top)
+        if not self.lazy:
+            self.rendered_top = self.scroll_top
+
+    def execute_async_script(self, script, *args):
+        self.rendered_top = self.scroll_top
+        return super().execute_async_script(script, *args)
+
+    def at_end(self):
+        return self.scroll_top + self.viewport >= self.scroll_height - 1
+
+    def rendered(self):
+        if len(self.members)==0:
+            return range(0)
+        first = max(0, self.rendered_top//self.row_height - self.buffer)
+        last = min(len(self.members) - 1, (self.rendered_top + self.viewport)//self.row_height + self.buffer)
+        return range(first, last + 1)
+
+    def popup_html(self):
+        rows = "".join(
+            f'<div role="listitem" style="transform: translateY({i*self.row_height}px)"><div data-testid="cell-frame-container">'
+            f'<div data-testid="cell-frame-title"><span>{escape(name)}</span></div>'
+            f'<div data-testid="cell-frame-secondary"><div role="gridcell"><span><span>{escape(mobile)}</span></span></div></div>'
+            f'</div></div>'
+            for i in self.rendered() for name, mobile in [self.members[i]]
+        )
+        return f'<div data-testid="popup-contents"><div data-testid="contacts-modal"><div><div><div><div role="list">{rows}</div></div></div></div></div></div>'
+
+    @property
+    def page_source(self):
+        self.count("getPageSource")
+        return f"<html><head><title>WhatsApp</title></head><body>{self.popup_html()}</body></html>"
+
+    def virtual_list(self, item_selector, fields, key, reset, start_top):
+        # what VIRTUAL_LIST_SCRIPT does in the page
+        if reset or key not in self.lists:
+            self.lists[key] = set()
+        seen = self.lists[key]
+        if start_top is not None:
+            self.scroll_to(start_top)
+            return json.dumps({"rows": [], "top": self.scroll_top, "step": 0, "rowHeight": 0, "atEnd": False, "moved": True})
+        rendered = self.rendered()
+        rows = []
+        for i in rendered:
+            row = list(self.members[i])
+            if tuple(row) not in seen:
+                seen.add(tuple(row))
+                rows.append(row)
+        top = self.scroll_top
+        at_end = self.at_end()
+        step = max(self.row_height, len(rendered)*self.row_height - self.row_height)
+        moved = False
+        if not at_end:
+            self.scroll_to(top + step)
+            moved = self.scroll_top>top
+        return json.dumps({"rows": rows, "top": top, "step": step, "rowHeight": self.row_height, "atEnd": at_end, "moved": moved})
+
+    def execute_script(self, script, *args):
+        self.count("executeScript")
+        if script is main.VIRTUAL_LIST_SCRIPT:
+            return self.virtual_list(*args)
+        if script is main.POPUP_SCROLL_SCRIPT:
+            self.scroll_to(args[1])
+            return self.at_end()
+        if script is main.OUTER_HTML_SCRIPT:
+            return self.popup_html()
+        if script is main.MEMBER_COUNT_SCRIPT:
+            return len(self.members)
+        return None
+
+
+class ReplayDriver(FakeDriver):
+    # Serves a Recorder capture back to the real scraper methods: each chat list harvest, chat list or popup
+    # scroll step and group search returns the rows, offset or titles recorded for it, in order, and
+    # page_source returns the snapshot of the last step served
+    SCROLL_STAGES = {"popup": "popup-scroll", "chat_list": "chat-list-scroll"}
+
+    def __init__(self, recording_dir, faults=None) -> None:
+        super().__init__(faults)
+        self.path = Path(recording_dir)
+        with open(self.path / "index.jsonl", "r", encoding="UTF-8") as fp:
+            self.entries = [json.loads(line) for line in fp]
+        self.steps = {}
+        for entry in self.entries:
+            self.steps.setdefault(entry["stage"], []).append(entry)
+        self.cursors = {stage: -1 for stage in self.steps}
+        self.current = self.entries[0] if len(self.entries)>0 else None
+
+    def snapshot(self):
+        with open(self.path / self.current["file"], "r", encoding="UTF-8") as fp:
+            return fp.read()
+
+    @property
+    def page_source(self):
+        self.count("getPageSource")
+        return self.snapshot()
+
+    def advance(self, stage):
+        steps = self.steps.get(stage, [])
+        if len(steps)==0:
+            return None
+        self.cursors[stage] = min(self.cursors[stage] + 1, len(steps) - 1)
+        self.current = steps[self.cursors[stage]]
+        return self.current
+
+    def at_last(self, stage):
+        return self.cursors.get(stage, -1)>=len(self.steps.get(stage, [])) - 1
+
+    def typed(self, locator, keys):
+        # a group search: the results are the ones recorded for it
+        if "chat-list-search" in locator[1]:
+            self.advance("search-results")
+
+    def clicked(self, locator):
+        if locator[0]=="search-result":
+            self.advance("group-opened")
+
+    def execute_script(self, script, *args):
+        self.count("executeScript")
+        if script is main.VIRTUAL_LIST_SCRIPT:
+            stage = self.SCROLL_STAGES[args[2]]
+            if args[4] is not None:
+                return json.dumps({"rows": [], "top": args[4], "step": 0, "rowHeight": 0, "atEnd": False, "moved": True})
+            entry = self.advance(stage) or {}
+            at_end = entry.get("at_end", self.at_last(stage))
+            return json.dumps({"rows": entry.get("rows", []), "top": entry.get("y"), "step": 0, "rowHeight": 0, "atEnd": at_end, "moved": True})
+        if script is main.POPUP_SCROLL_SCRIPT:
+            self.advance("popup-scroll")
+            return self.at_last("popup-scroll")
+        if script is main.CHAT_LIST_ROWS_SCRIPT:
+            entry = self.advance("chat-list") or {}
+            return json.dumps(entry.get("rows", []))
+        if script is main.SEARCH_RESULTS_SCRIPT:
+            titles = self.current.get("titles", []) if self.current["stage"]=="search-results" else []
+            if args[1] is None:
+                return json.dumps(titles)
+            return FakeElement(self, ("search-result", titles[args[1]]))
+        if script is main.OUTER_HTML_SCRIPT:
+            return self.snapshot()
+        return None
+
+
+class FakeChatTitle(FakeElement):
+    # the title span of one rendered chat list row
+    def __init__(self, driver, index) -> None:
+        super().__init__(driver, ("chat-title", index))
+        self.index = index
+
+    @property
+    def text(self):
+        self.driver.count("getElementText")
+        return self.driver.members[self.index][0]
+
+
+STATUS_RING = '<div data-testid="chatlist-status-v3-ring"></div>'
+
+
+class FakeChatListDriver(FakePopupDriver):
+    # The chat list, top to bottom, as (title, is_normal_chat) rows in the same kind of virtual list.
+    # The rendered rows' title spans can also be found and read one by one, the way the chat list used to be read
+    @property
+    def page_source(self):
+        self.count("getPageSource")
+        rows = "".join(
+            f'<div role="listitem"><div data-testid="cell-frame-container"><div data-testid="cell-frame-title"><span>{escape(title)}</span></div>'
+            f'{STATUS_RING if is_normal_chat else ""}</div></div>'
+            for i in self.rendered() for title, is_normal_chat in [self.members[i]]
+        )
+        return f'<html><head><title>WhatsApp</title></head><body><div id="pane-side"><div aria-label="Chat list">{rows}</div></div></body></html>'
+
+    def find_elements(self, by, value):
+        if "cell-frame-title" in value:
+            self.count("findElements")
+            return [FakeChatTitle(self, i) for i in self.rendered()]
+        return super().find_elements(by, value)
+
+    def execute_script(self, script, *args):
+        if script is main.CHAT_LIST_ROWS_SCRIPT:
+            self.count("executeScript")
+            return json.dumps([list(self.members[i]) for i in self.rendered()])
+        if len(args)>0 and isinstance(args[0], FakeChatTitle):
+            # the status ring lookup on one row
+            self.count("executeScript")
+            return self.members[args[0].index][1]
+        return super().execute_script(script, *args)
+
+
+FAKE_ACCOUNT_PATH = Path("fake_account.json")
+
+
+class FakeWhatsAppDriver(FakePopupDriver):
+    # A logged in account: the chat search lists the groups whose title contains the typed text and
+    # opening one takes open_latency seconds, its participants popup then lists its members
+    def __init__(self, groups, open_latency=0.0, faults=None) -> None:
+        super().__init__([], faults=faults)
+        self.groups = groups
+        self.open_latency = open_latency
+        self.query = ""
+
+    def typed(self, locator, keys):
+        if "chat-list-search" in locator[1]:
+            self.query += "".join(str(key) for key in keys)
+
+    def clicked(self, locator):
+        if "Cancel search" in locator[1]:
+            self.query = ""
+        elif locator[0]=="search-result":
+            time.sleep(self.open_latency)
+            self.members = self.groups[locator[1]]
+            self.scroll_top = 0
+            self.rendered_top = 0
+            self.lists = {}
+
+    def search_results(self):
+        return [title for title in self.groups if self.query.lower() in title.lower()] if self.query else []
+
+    def execute_script(self, script, *args):
+        if script is main.SEARCH_RESULTS_SCRIPT:
+            self.count("executeScript")
+            titles = self.search_results()
+            if args[1] is None:
+                return json.dumps(titles)
+            return FakeElement(self, ("search-result", titles[args[1]]))
+        return super().execute_script(script, *args)
+
+
+def write_fake_account(groups, open_latency=0.0, workers=1):
+    # spawned pool workers read the account from the working directory
+    with open(FAKE_ACCOUNT_PATH, "w", encoding="UTF-8") as fp:
+        json.dump({"groups": groups, "open_latency": open_latency, "workers": workers}, fp)
+
+
+def fake_pool_worker(worker_id, scraper_kwargs, jobs, results):
+    # main.pool_worker with a FakeWhatsAppDriver over the fake account for a browser
+    with open(FAKE_ACCOUNT_PATH, "r", encoding="UTF-8") as fp:
+        account = json.load(fp)
+    driver = FakeWhatsAppDriver({title: [tuple(row) for row in rows] for title, rows in account["groups"].items()}, account["open_latency"])
+    scraper = main.pool_scraper(worker_id, scraper_kwargs)
+    scraper.config_browser = lambda: setattr(scraper, "browser", driver)
+    scraper.login = lambda: True
+    process_group = scraper.process_group_unattended
+
+    def timed_process_group(group_name):
+        # when each group started and finished, so tests can leave the process start up out of the timings
+        started = time.time()
+        result = process_group(group_name)
+        with open(f"fake-worker-{worker_id}.jsonl", "a", encoding="UTF-8") as fp:
+            fp.write(json.dumps({"group_name": group_name, "started": started, "finished": time.time()}) + "\n")
+        return result
+
+    scraper.process_group_unattended = timed_process_group
+    # workers start one after another, they all begin scraping together once the last one is up
+    Path(f"fake-worker-{worker_id}.ready").touch()
+    deadline = time.time() + 60
+    while len(list(Path(".").glob("fake-worker-*.ready")))<account["workers"] and time.time()<deadline:
+        time.sleep(0.01)
+    scraper.run_worker(jobs, results)
+
+
+def fake_pool_timings(workdir="."):
+    timings = []
+    for path in sorted(Path(workdir).glob("fake-worker-*.jsonl")):
+        with open(path, "r", encoding="UTF-8") as fp:
+            timings += [json.loads(line) for line in fp]
+        path.unlink()
+    for path in Path(workdir).glob("fake-worker-*.ready"):
+        path.unlink()
+    return timings
@@ -0,0 +1,25 @@
+import json
+import shutil
+import subprocess
+
+import pytest
+
+
+NODE = shutil.which("node")
+
+requires_node = pytest.mark.skipif(NODE is None, reason="node is not installed")
+
+
+def run_node(source, timeout=30):
+    # runs source in node and returns the JSON it prints last
+    completed = subprocess.run([NODE, "-e", source], capture_output=True, text=True, timeout=timeout)
+    assert completed.returncode==0, completed.stderr
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def page_script(script, args, callback=False):
+    # a selenium style script (arguments[n], return, the async callback last) as a node expression
+    args = json.dumps(args)
+    if callback:
+        return f"new Promise(function (done) {{ (function () {{{script}}}).apply(null, {args}.concat([done])); }})"
+    return f"(function () {{{script}}}).apply(null, {args})"
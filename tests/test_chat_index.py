@@ -0,0 +1,87 @@
+import json
+
+import main
+from selenium.webdriver.common.by import By
+from tests.fake_driver import FakeChatListDriver, make_scraper
+
+
+def chats(count, prefix="Chat"):
+    # every third chat is a normal chat, the others are groups
+    return [(f"{prefix} {i}", i%3==0) for i in range(count)]
+
+
+def sync(workdir, rows, delta=True):
+    driver = FakeChatListDriver(rows)
+    scraper = make_scraper(driver, workdir)
+    group_names = scraper.get_group_names(delta=delta)
+    return group_names, driver
+
+
+def per_row_chat_rows(browser):
+    # how the chat list was read before CHAT_LIST_ROWS_SCRIPT: a find_elements, then a text read and a script per row
+    rows = []
+    for el in browser.find_elements(By.XPATH, "//div[@id='pane-side']//div[@aria-label='Chat list']//div[@role='listitem']//div[@data-testid='cell-frame-container']//div[@data-testid='cell-frame-title']//span"):
+        is_normal_chat = browser.execute_script("""return (arguments[0].parentElement.parentElement.parentElement.parentElement.querySelector("div[data-testid='chatlist-status-v3-ring']")!=null);""", el)
+        rows.append((el.text, not is_normal_chat))
+    return rows
+
+
+def test_one_script_per_chat_list_harvest(workdir):
+    driver = FakeChatListDriver(chats(100))
+    scraper = make_scraper(driver, workdir)
+    rows = scraper.get_chat_rows()
+    assert driver.calls=={"executeScript": 1}
+    visible = len(driver.rendered())
+    assert rows==[(title, not is_normal) for title, is_normal in chats(visible)]
+
+    # the per-row loop on the same window: 1 + 2 round trips per visible row
+    driver.calls.clear()
+    assert per_row_chat_rows(driver)==rows
+    assert driver.calls=={"findElements": 1, "executeScript": visible, "getElementText": visible}
+    assert driver.commands==1 + 2*visible
+
+
+def test_observe_reaches_the_unchanged_run():
+    index = main.ChatIndex("groupnames.json")
+    index.chats = {title: {"is_group": not is_normal, "position": i} for i, (title, is_normal) in enumerate(chats(100))}
+    index.start_sync()
+    assert not index.observe([("New chat", False)] + [(title, not is_normal) for title, is_normal in chats(main.DELTA_SYNC_UNCHANGED_RUN - 1)])
+    assert index.observe([(title, not is_normal) for title, is_normal in chats(main.DELTA_SYNC_UNCHANGED_RUN)])
+
+
+def test_a_moved_or_retyped_chat_breaks_the_run():
+    index = main.ChatIndex("groupnames.json")
+    index.chats = {title: {"is_group": not is_normal, "position": i} for i, (title, is_normal) in enumerate(chats(100))}
+    index.start_sync()
+    rows = [(title, not is_normal) for title, is_normal in chats(60)]
+    rows[10], rows[11] = rows[11], rows[10]
+    rows[30] = (rows[30][0], not rows[30][1])
+    assert not index.observe(rows[:31 + main.DELTA_SYNC_UNCHANGED_RUN - 2])
+    assert index.observe(rows[31 + main.DELTA_SYNC_UNCHANGED_RUN - 2:])
+
+
+def test_delta_sync_stops_after_the_unchanged_run(workdir):
+    rows = chats(1000)
+    group_names, full = sync(workdir, rows)
+    assert sorted(group_names)==sorted(title for title, is_normal in rows if not is_normal)
+    full_steps = full.calls["executeScript"]
+
+    # three new groups and a chat moved up to the top since the last sync
+    rows = [("New group 1", False), ("New group 2", False), ("Chat 500", True), ("New group 3", False)] + [row for row in rows if row[0]!="Chat 500"]
+    group_names, delta = sync(workdir, rows)
+    assert delta.calls["executeScript"]<full_steps/10
+    assert sorted(group_names)==sorted(title for title, is_normal in rows if not is_normal)
+
+    with open(workdir / "groupnames.json", "r", encoding="UTF-8") as fp:
+        indexed = json.load(fp)["chats"]
+    assert [title for title, chat in sorted(indexed.items(), key=lambda item: item[1]["position"])]==[title for title, is_normal in rows]
+    assert indexed["New group 1"]["first_seen"]==indexed["New group 1"]["last_seen"]
+    assert indexed["Chat 999"]["last_seen"]<indexed["Chat 0"]["last_seen"]
+
+
+def test_full_sync_walks_everything_and_drops_removed_chats(workdir):
+    sync(workdir, chats(300))
+    rows = [row for row in chats(300) if row[0]!="Chat 250"]
+    group_names, driver = sync(workdir, rows, delta=False)
+    assert "Chat 250" not in main.ChatIndex(workdir / "groupnames.json").chats
+    assert sorted(group_names)==sorted(title for title, is_normal in rows if not is_normal)
@@ -0,0 +1,68 @@
+import pytest
+
+import main
+from tests.fake_driver import FakeWhatsAppDriver, make_scraper
+
+
+@pytest.mark.parametrize("raw, e164", [
+    ("+91 98765 43210", "+919876543210"),
+    ("+1 (202) 555-0100", "+12025550100"),
+    ("0044 7700 900123", "+447700900123"),
+    ("98765 43210", "+919876543210"),
+    ("098765 43210", "+919876543210"),
+    ("+91 98765", None),
+    ("+1234567890123456", None),
+    ("Hey there! I am using WhatsApp.", None),
+    ("", None),
+    (None, None),
+])
+def test_e164_mobiles(raw, e164):
+    assert main.e164_mobiles([raw], country_code="91")==[e164]
+
+
+def test_e164_mobiles_without_a_default_country_code():
+    assert main.e164_mobiles(["98765 43210", "+91 98765 43210"], country_code="")==[None, "+919876543210"]
+
+
+def test_shared_contacts_and_lookup_across_groups(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "DEFAULT_COUNTRY_CODE", "91")
+    index = main.ContactIndex(tmp_path / "contacts.sqlite3")
+    try:
+        assert index.save_group("Family", ["Asha", "Ravi", "~ Status"], ["+91 98765 43210", "+91 91234 56789", "Available"], 3)==2
+        assert index.save_group("Cricket", ["", "Vik"], ["098765-43210", "+44 7700 900123"], 2)==2
+        assert index.find_contact("9876543210")==[("Cricket", "", "098765-43210"), ("Family", "Asha", "+91 98765 43210")]
+        assert index.find_contact("not a number")==[]
+        assert index.shared_contacts(2)==[("+919876543210", "Asha", 2, "Family | Cricket")]
+        assert index.stats()=={"groups": 2, "contacts": 3, "memberships": 4}
+
+        # a re-scraped group replaces its memberships
+        index.save_group("Family", ["Asha"], ["+91 98765 43210"], 1)
+        assert index.stats()=={"groups": 2, "contacts": 3, "memberships": 3}
+        assert index.has_group("Cricket") and not index.has_group("Office")
+    finally:
+        index.close()
+
+
+def test_parse_and_save_indexes_the_group(workdir):
+    driver = FakeWhatsAppDriver({"Family": [("Asha", "+91 98765 43210"), ("Ravi", "+91 91234 56789")]})
+    scraper = make_scraper(driver, workdir, contact_index=True)
+    assert scraper.find_and_get_group("Family")
+    assert scraper.parse_and_save("Family")
+    assert scraper.contact_index.find_contact("+91 91234 56789")==[("Family", "Ravi", "+91 91234 56789")]
+    scraper.contact_index.close()
+
+
+def test_a_cached_group_missing_from_the_index_is_scraped_again(workdir):
+    groups = {"Family": [("Asha", "+91 98765 43210"), ("Ravi", "+91 91234 56789")]}
+    # cached by a run without the contact index
+    scraper = make_scraper(FakeWhatsAppDriver(groups), workdir, use_cache=True, contact_index=False)
+    assert scraper.find_and_get_group("Family") and scraper.parse_and_save("Family")
+
+    scraper = make_scraper(FakeWhatsAppDriver(groups), workdir, use_cache=True, contact_index=True)
+    assert scraper.find_and_get_group("Family") and scraper.parse_and_save("Family")
+    assert not scraper.cache_hit
+    assert scraper.contact_index.has_group("Family")
+
+    assert scraper.find_and_get_group("Family") and scraper.parse_and_save("Family")
+    assert scraper.cache_hit
+    scraper.contact_index.close()
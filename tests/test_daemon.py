@@ -0,0 +1,80 @@
+import csv
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from tests.fake_driver import FakeWhatsAppDriver, make_scraper, synthetic_members
+
+
+def request(address, method, path, payload=None):
+    data = None if payload is None else json.dumps(payload).encode("UTF-8")
+    req = urllib.request.Request(f"http://{address[0]}:{address[1]}{path}", data=data, method=method, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=10) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def wait_for(predicate, timeout=30):
+    deadline = time.time() + timeout
+    while time.time()<deadline:
+        value = predicate()
+        if value:
+            return value
+        time.sleep(0.02)
+    raise AssertionError("timed out")
+
+
+@pytest.fixture
+def daemon(workdir):
+    groups = {"Family": synthetic_members(40), "Office": synthetic_members(25)}
+    driver = FakeWhatsAppDriver(groups, open_latency=0.3)
+    scraper = make_scraper(driver, workdir)
+    scraper.config_browser = lambda: None
+    scraper.login = lambda: True
+    thread = threading.Thread(target=scraper.serve, kwargs={"port": 0}, daemon=True)
+    thread.start()
+    address = wait_for(lambda: getattr(scraper, "server_address", None))
+    yield scraper, address, groups
+    scraper.stop_serving()
+    thread.join(timeout=30)
+    assert not thread.is_alive()
+
+
+def test_jobs_run_through_the_http_api(daemon, workdir):
+    scraper, address, groups = daemon
+    assert request(address, "GET", "/health")==(200, {"status": "ok", "queued": 0})
+
+    status, job = request(address, "POST", "/jobs", {"group_names": ["Family", "Office"], "output_format": "csv"})
+    assert status==202 and job["status"]=="queued" and job["group_names"]==["Family", "Office"]
+
+    # the job is picked up, runs while the groups open and is done once both are exported
+    statuses = [job["status"]]
+    def finished():
+        current = request(address, "GET", f"/jobs/{job['id']}")[1]
+        if current["status"]!=statuses[-1]:
+            statuses.append(current["status"])
+        return current if current["status"] in ("done", "failed") else None
+    done = wait_for(finished)
+    assert statuses==["queued", "running", "done"]
+    assert [result["group_name"] for result in done["results"]]==["Family", "Office"]
+    assert all(result["saved"] for result in done["results"])
+    assert done["finished_at"]>=done["started_at"]>=done["queued_at"]
+
+    for title, members in groups.items():
+        with open(workdir / "data" / f"{title}.csv", "r", encoding="UTF-8", newline="") as fp:
+            assert [tuple(row) for row in csv.reader(fp)][1:]==members
+    assert request(address, "GET", "/jobs")==(200, [{"id": job["id"], "status": "done", "group_names": ["Family", "Office"]}])
+
+
+def test_invalid_jobs_are_rejected(daemon):
+    scraper, address, groups = daemon
+    assert request(address, "POST", "/jobs", {"group_names": []})[0]==400
+    assert request(address, "POST", "/jobs", {"group_names": ["Family"], "output_format": "doc"})[0]==400
+    assert request(address, "GET", "/jobs/42")[0]==404
+    assert request(address, "GET", "/jobs")==(200, [])
@@ -0,0 +1,125 @@
+import time
+
+import main
+from tests.fake_driver import FakeDriver, make_scraper
+from tests.node import page_script, requires_node, run_node
+
+
+# The node tests run DOM_SETTLED_SCRIPT against a stand-in MutationObserver that fires on a timer, so they only
+# cover its quiet period and cap timers. The *_in_chrome tests below run it on a real page in headless Chrome.
+
+# a document whose subtree mutates on a schedule: every `every` ms until `until` ms after start
+FIXTURE = """
+var observers = [];
+global.document = {documentElement: {id: "root"}, querySelector: function (selector) { return {selector: selector}; }};
+global.MutationObserver = function (callback) {
+    this.callback = callback;
+    this.observe = function (target, options) { observers.push(this); this.target = target; this.options = options; };
+    this.disconnect = function () { observers.splice(observers.indexOf(this), 1); };
+};
+function mutate(every, until) {
+    var started = Date.now();
+    var timer = setInterval(function () {
+        if (Date.now() - started >= until) { clearInterval(timer); return; }
+        observers.forEach(function (observer) { observer.callback([{type: "childList"}]); });
+    }, every);
+}
+"""
+
+
+def wait_settled(every, until, quiet, cap):
+    script = page_script(main.DOM_SETTLED_SCRIPT, ["div[data-testid='contacts-modal']", quiet, cap], callback=True)
+    return run_node(FIXTURE + f"""
+var started = Date.now();
+if ({every}>0) {{ mutate({every}, {until}); }}
+{script}.then(function (settled) {{
+    console.log(JSON.stringify({{settled: settled, elapsed: Date.now() - started, observers: observers.length}}));
+    process.exit(0);
+}});
+""")
+
+
+@requires_node
+def test_stable_dom_settles_after_one_quiet_period():
+    result = wait_settled(0, 0, quiet=50, cap=5000)
+    assert result["settled"] is True
+    assert result["elapsed"]<50 + 150
+    assert result["observers"]==0
+
+
+@requires_node
+def test_settles_once_mutations_stop():
+    result = wait_settled(10, 300, quiet=50, cap=5000)
+    assert result["settled"] is True
+    assert 300<=result["elapsed"]<300 + 50 + 200
+
+
+@requires_node
+def test_a_dom_that_keeps_changing_hits_the_cap():
+    result = wait_settled(10, 10000, quiet=50, cap=400)
+    assert result["settled"] is False
+    assert 400<=result["elapsed"]<400 + 200
+    assert result["observers"]==0
+
+
+@requires_node
+def test_cdp_settled_expression_evaluates_after_the_wait():
+    expression = main.settled_expression("#pane-side", 0.05, 1, "document.documentElement.id")
+    assert run_node(FIXTURE + f"Promise.resolve({expression}).then(function (value) {{ console.log(JSON.stringify(value)); }});")=="root"
+
+
+def test_wait_dom_settled_returns_what_the_page_reports(workdir):
+    class Unsettled(FakeDriver):
+        def execute_async_script(self, script, *args):
+            assert script is main.DOM_SETTLED_SCRIPT
+            assert args==("#pane-side", 50, 1000)
+            return False
+    assert make_scraper(FakeDriver(), workdir).wait_dom_settled("#pane-side", quiet=0.05, timeout=1)
+    assert not make_scraper(Unsettled(), workdir).wait_dom_settled("#pane-side", quiet=0.05, timeout=1)
+
+
+# a page whose #list gets a row every `every` ms until `until` ms after startMutations, #other can change on its own
+PAGE = """<html><head><title>Settle</title></head><body><div id="list"></div><div id="other"></div><script>
+function startMutations(id, every, until) {
+    var started = Date.now();
+    var timer = setInterval(function () {
+        if (Date.now() - started >= until) { clearInterval(timer); return; }
+        document.getElementById(id).appendChild(document.createElement("div"));
+    }, every);
+}
+</script></body></html>"""
+
+
+def settle_in_chrome(chrome, workdir, mutate=None, selector="#list", quiet=0.05, timeout=5):
+    (workdir / "settle.html").write_text(PAGE, encoding="UTF-8")
+    chrome.get((workdir / "settle.html").as_uri())
+    scraper = make_scraper(chrome, workdir)
+    if mutate is not None:
+        chrome.execute_script("startMutations(arguments[0], arguments[1], arguments[2])", *mutate)
+    started = time.perf_counter()
+    settled = scraper.wait_dom_settled(selector, quiet=quiet, timeout=timeout)
+    return settled, time.perf_counter() - started
+
+
+def test_stable_page_settles_in_chrome(chrome, workdir):
+    settled, elapsed = settle_in_chrome(chrome, workdir)
+    assert settled
+    assert 0.05<=elapsed<0.05 + 0.5
+
+
+def test_settles_once_the_list_stops_changing_in_chrome(chrome, workdir):
+    settled, elapsed = settle_in_chrome(chrome, workdir, mutate=("list", 10, 300))
+    assert settled
+    assert 0.3<=elapsed<0.3 + 0.05 + 0.5
+
+
+def test_a_list_that_keeps_changing_hits_the_cap_in_chrome(chrome, workdir):
+    settled, elapsed = settle_in_chrome(chrome, workdir, mutate=("list", 10, 10000), timeout=0.4)
+    assert not settled
+    assert 0.4<=elapsed<0.4 + 0.5
+
+
+def test_changes_outside_the_selector_do_not_hold_the_wait_in_chrome(chrome, workdir):
+    settled, elapsed = settle_in_chrome(chrome, workdir, mutate=("other", 10, 10000))
+    assert settled
+    assert elapsed<0.05 + 0.5
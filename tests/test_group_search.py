@@ -0,0 +1,51 @@
+import pytest
+
+import main
+from tests.fake_driver import FakeWhatsAppDriver, make_scraper, synthetic_members
+
+
+@pytest.mark.parametrize("group_name, title, rank", [
+    ("Family", "Family", 0),
+    ("Family", " FAMILY ", 1),
+    ("Ｆａｍｉｌｙ", "family", 1),
+    ("Family", "Family 2024", 2),
+    ("Family", "The Family", 3),
+    ("Weekend Cricket Club", "Weekend Cricket", 4),
+    ("Weekend Cricket Club", "Weekend", None),
+    ("Family", "Friends", None),
+    ("Family", "", None),
+])
+def test_rank_title(group_name, title, rank):
+    assert main.rank_title(group_name, title)==rank
+
+
+def test_best_title_index_prefers_the_better_rank():
+    titles = ["The Family", "Family 2024", "family"]
+    assert main.best_title_index("Family", titles)==2
+    assert main.best_title_index("Family", titles[:2])==1
+    assert main.best_title_index("Family", ["Friends"]) is None
+    assert main.best_title_index("Family", []) is None
+
+
+def test_best_title_index_breaks_ties_by_length_closeness():
+    # all three only share a 70% prefix with the name, the one closest in length wins
+    titles = ["Weekend Cricket", "Weekend Cricket Cl", "Weekend Cricket C"]
+    assert main.best_title_index("Weekend Cricket Club", titles)==1
+    assert main.best_title_index("Family", ["Family reunion 2024", "Family 24"])==1
+
+
+@pytest.mark.parametrize("value", ["Family", "Tom's group", 'The "A" team', "Tom's \"A\" team", "'", "''\"\""])
+def test_xpath_literal_matches_the_exact_text(value):
+    from lxml import etree
+    root = etree.fromstring("<div><span/></div>")
+    root[0].text = value
+    assert root.xpath(f"//span[text()={main.xpath_literal(value)}]")==[root[0]]
+    assert root.xpath(f"//span[contains(text(), {main.xpath_literal(value)})]")==[root[0]]
+
+
+def test_find_and_get_group_opens_the_best_search_result(workdir):
+    groups = {"Family 2024": synthetic_members(3), "The Family": synthetic_members(4), "Family": synthetic_members(5)}
+    driver = FakeWhatsAppDriver(groups)
+    scraper = make_scraper(driver, workdir)
+    assert scraper.find_and_get_group("Family")
+    assert driver.members==groups["Family"]
@@ -0,0 +1,24 @@
+import os
+import subprocess
+import sys
+
+from tests.fake_driver import REPO_DIR
+
+
+# the cumulative time python -X importtime reports for main, stdlib imports included
+IMPORT_BUDGET_SECONDS = 0.5
+HEAVY_MODULES = ("selenium", "pandas", "bs4", "psutil")
+
+
+def test_importing_main_is_cheap_and_has_no_side_effects(workdir):
+    # a fresh interpreter, so modules other tests imported don't hide what main pulls in
+    env = dict(os.environ, PYTHONPATH=str(REPO_DIR))
+    check = f"import sys, main; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", check], cwd=workdir, env=env, capture_output=True, text=True, check=True)
+
+    assert out.stdout.strip()=="", f"importing main loaded {out.stdout.strip()}"
+    # "import time: self [us] | cumulative [us] | imported package"
+    cumulative = {line.split("|")[2].strip(): int(line.split("|")[1]) for line in out.stderr.splitlines() if line.startswith("import time:") and line.split("|")[1].strip().isdigit()}
+    assert cumulative["main"]/1e6<IMPORT_BUDGET_SECONDS, f"importing main took {cumulative['main']/1e6:.3f}s"
+    # the data and chrome directories are only made once a scraper starts
+    assert sorted(path.name for path in workdir.iterdir())==[]
@@ -0,0 +1,116 @@
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import main
+from tests.fake_driver import REPO_DIR, FakePopupDriver, make_scraper, synthetic_members
+
+
+def test_rows_are_flushed_in_batches_and_done_groups_recorded(tmp_path):
+    journal = main.Journal(tmp_path / "journal.jsonl", flush_rows=2)
+    journal.start_group("Family")
+    journal.add("Asha", "+91 98765 43210")
+    assert not (tmp_path / "journal.jsonl").exists()
+    journal.scrolled(800)
+    journal.add("Ravi", "+91 91234 56789")
+    journal.add("Vik", "+44 7700 900123")
+    journal.end_group("Family", saved=False)
+    journal.start_group("Office")
+    journal.add("Meera", "+91 90000 00000")
+    journal.end_group("Office", saved=True)
+    journal.close()
+
+    journal = main.Journal(tmp_path / "journal.jsonl")
+    assert journal.is_done("Office") and not journal.is_done("Family")
+    journal.start_group("Family")
+    assert journal.resume()==([("Asha", "+91 98765 43210"), ("Ravi", "+91 91234 56789"), ("Vik", "+44 7700 900123")], 800)
+    journal.start_group("Office")
+    assert journal.resume()==([], None)
+
+
+def test_a_torn_last_line_is_skipped(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = main.Journal(path, flush_rows=1)
+    journal.start_group("Family")
+    journal.scrolled(1600)
+    journal.add("Asha", "+91 98765 43210")
+    journal.close()
+    with open(path, "a", encoding="UTF-8") as fp:
+        fp.write('{"type": "rows", "group": "Family", "y": 2400, "rows": [["Ra')
+
+    journal = main.Journal(path)
+    journal.start_group("Family")
+    assert journal.resume()==([("Asha", "+91 98765 43210")], 1600)
+    # the next record starts on a line of its own after the torn one
+    journal.add("Ravi", "+91 91234 56789")
+    journal.close()
+    journal = main.Journal(path)
+    journal.start_group("Family")
+    assert journal.resume()[0]==[("Asha", "+91 98765 43210"), ("Ravi", "+91 91234 56789")]
+
+
+def test_worker_journals_are_read_together(workdir):
+    for worker_id, group_name in [(1, "Family"), (2, "Office")]:
+        journal = main.Journal(main.worker_journal_path(worker_id))
+        journal.start_group(group_name)
+        journal.end_group(group_name, saved=True)
+        journal.close()
+    journal = main.Journal(read_paths=main.journal_paths())
+    assert journal.is_done("Family") and journal.is_done("Office")
+    main.clear_journals()
+    assert main.journal_paths()==[]
+
+
+# scrapes a 3000 member group slowly enough to be killed halfway through
+SCRAPE_UNTIL_KILLED = """
+import sys, time
+sys.path.insert(0, {repo!r})
+import main
+from tests.fake_driver import FakePopupDriver, make_scraper, synthetic_members
+
+class SlowPopupDriver(FakePopupDriver):
+    def virtual_list(self, *args):
+        time.sleep(0.02)
+        return super().virtual_list(*args)
+
+scraper = make_scraper(SlowPopupDriver(synthetic_members(3000)), ".")
+scraper.journal = main.Journal(flush_rows=50)
+scraper.journal.start_group("Big group")
+scraper.get_names_mobile()
+"""
+
+
+def journaled_rows(path):
+    if not path.exists():
+        return 0
+    with open(path, "r", encoding="UTF-8") as fp:
+        return sum(len(json.loads(line)["rows"]) for line in fp if line.endswith("\n"))
+
+
+def test_kill_and_resume(workdir):
+    process = subprocess.Popen([sys.executable, "-c", SCRAPE_UNTIL_KILLED.format(repo=str(REPO_DIR))], stdout=subprocess.DEVNULL)
+    try:
+        deadline = time.time() + 60
+        while journaled_rows(workdir / "journal.jsonl")<500 and time.time()<deadline and process.poll() is None:
+            time.sleep(0.02)
+    finally:
+        os.kill(process.pid, signal.SIGKILL)
+        process.wait()
+    journaled = journaled_rows(workdir / "journal.jsonl")
+    assert 500<=journaled<3000
+
+    members = synthetic_members(3000)
+    driver = FakePopupDriver(members)
+    scraper = make_scraper(driver, workdir)
+    scraper.journal = main.Journal()
+    scraper.journal.start_group("Big group")
+    rows, y = scraper.journal.resume()
+    assert len(rows)==journaled and y>0
+    names, mobiles, _ = scraper.get_names_mobile()
+    assert list(zip(names, mobiles))==members
+    # scrolling carried on from the journaled offset instead of the top
+    assert driver.scroll_tops[0]==y
+    assert min(driver.scroll_tops)>=y
@@ -0,0 +1,48 @@
+import main
+
+
+def test_first_seen_order_and_dedup_across_overlapping_windows():
+    rows = [(f"Member {i}", f"+91 9{i:09d}") for i in range(100)]
+    participants = main.Participants()
+    # the popup is read in overlapping windows, every row comes back several times
+    for start in range(0, 100, 7):
+        participants.extend(rows[start:start + 15])
+    names, mobiles = participants.names_mobiles()
+    assert list(zip(names, mobiles))==rows
+
+
+def test_same_number_in_another_format_is_one_participant():
+    participants = main.Participants()
+    assert participants.add("", "+91 98765 43210")
+    assert not participants.add("Ravi", "+91-98765-43210")
+    assert not participants.add("", "+91 (98765) 43210")
+    assert participants.names_mobiles()==([""], ["+91 98765 43210"])
+
+
+def test_saved_contacts_with_digits_in_their_status_are_kept_apart():
+    # a status is not phone-shaped, its digits must not merge two saved contacts
+    participants = main.Participants()
+    assert participants.add("Asha", "Available 24x7")
+    assert participants.add("Vikram", "Available 24x7")
+    assert participants.add("Meera", "Call me on 98765 43210")
+    assert participants.add("Kiran", "Call me at 9876543210")
+    assert not participants.add("Asha", "Available 24x7")
+    assert participants.names_mobiles()[0]==["Asha", "Vikram", "Meera", "Kiran"]
+
+
+def test_rows_without_a_mobile_fall_back_to_the_name():
+    participants = main.Participants()
+    assert participants.add("~ Priya", "")
+    assert not participants.add("~ Priya", None)
+    assert participants.add("~ Rahul", "")
+    assert participants.add("", "Hey there! I am using WhatsApp.")
+    assert not participants.add("", "")
+    assert participants.names_mobiles()==(["~ Priya", "~ Rahul", ""], ["", "", "Hey there! I am using WhatsApp."])
+
+
+def test_on_add_sees_each_new_participant_once():
+    added = []
+    participants = main.Participants(on_add=lambda name, mobile: added.append((name, mobile)))
+    assert participants.extend([("A", "+1 202 555 0100"), ("B", "+1 202 555 0101"), ("A", "+1 202 555 0100")])==2
+    assert added==[("A", "+1 202 555 0100"), ("B", "+1 202 555 0101")]
+    assert len(participants)==2
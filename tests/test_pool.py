@@ -0,0 +1,32 @@
+import csv
+
+import main
+from tests.fake_driver import fake_pool_timings, fake_pool_worker, synthetic_members, write_fake_account
+
+
+SCRAPER_KWARGS = dict(use_cache=False, contact_index=False, output_format="csv")
+
+
+def scrape_seconds(workdir, groups, workers):
+    write_fake_account(groups, open_latency=0.5, workers=workers)
+    processed, failed = main.run_pool(workers, {"groups_file": str(workdir / "groups.txt")}, worker=fake_pool_worker, **SCRAPER_KWARGS)
+    assert (processed, failed)==(12, [])
+    # from the first group opened to the last one saved, the workers' start up is left out
+    timings = fake_pool_timings(workdir)
+    assert len(timings)==12
+    return max(timing["finished"] for timing in timings) - min(timing["started"] for timing in timings)
+
+
+def test_pool_scales_with_workers(workdir):
+    groups = {f"Group {i}": synthetic_members(20 + i) for i in range(12)}
+    (workdir / "groups.txt").write_text("\n".join(groups), encoding="UTF-8")
+    (workdir / "settings.config").write_bytes((main.Path(__file__).resolve().parent.parent / "settings.config").read_bytes())
+
+    one_worker = scrape_seconds(workdir, groups, 1)
+    four_workers = scrape_seconds(workdir, groups, 4)
+    # near-linear, with headroom for the workers sharing a single core while they parse
+    assert one_worker/four_workers>2.5
+
+    for title, members in groups.items():
+        with open(workdir / "data" / f"{title}.csv", "r", encoding="UTF-8", newline="") as fp:
+            assert [tuple(row) for row in csv.reader(fp)][1:]==members
@@ -0,0 +1,86 @@
+from tests.fake_driver import FakePopupDriver, make_scraper, synthetic_members
+
+
+class StepSizes(FakePopupDriver):
+    # keeps the JSON size of every VIRTUAL_LIST_SCRIPT step
+    def __init__(self, members, **kwargs) -> None:
+        super().__init__(members, **kwargs)
+        self.step_bytes = []
+
+    def virtual_list(self, *args):
+        result = super().virtual_list(*args)
+        self.step_bytes.append(len(result.encode("utf-8")))
+        return result
+
+
+def scrape(workdir, members, incremental, driver_class=FakePopupDriver, **kwargs):
+    driver = driver_class(members)
+    scraper = make_scraper(driver, workdir, incremental=incremental, **kwargs)
+    return scraper.get_names_mobile(), driver
+
+
+def test_incremental_rows_match_full_parse(workdir):
+    members = synthetic_members(250) + [("~ Saved contact", "Hey there! I am using WhatsApp."), ("Ann & Bob <home>", "+44 7700 900123")]
+    (names, mobiles, is_popup), _ = scrape(workdir, members, incremental=True)
+    assert is_popup
+    assert (names, mobiles, True)==scrape(workdir, members, incremental=False)[0]
+    assert (names, mobiles, True)==scrape(workdir, members, incremental=False, parser="subtree")[0]
+    assert (names, mobiles, True)==scrape(workdir, members, incremental=False, parser="lxml")[0]
+    assert list(zip(names, mobiles))==members
+
+
+def test_incremental_step_cost_does_not_grow_with_group_size(workdir):
+    costs = []
+    for count in (100, 10000):
+        (names, _, _), driver = scrape(workdir, synthetic_members(count), incremental=True, driver_class=StepSizes)
+        assert len(names)==count
+        steps = len(driver.step_bytes)
+        costs.append((driver.commands/steps, max(driver.step_bytes)))
+    (small_commands, small_bytes), (large_commands, large_bytes) = costs
+    # a handful of commands and one window of rows per step, whatever the group size
+    assert large_commands<=small_commands*1.1
+    assert large_bytes<=small_bytes*1.2
+
+
+
+def full_parse_peak(workdir, count):
+    import tracemalloc
+    driver = FakePopupDriver(synthetic_members(count))
+    scraper = make_scraper(driver, workdir, incremental=False)
+    rows = 0
+    tracemalloc.start()
+    try:
+        for step in scraper.get_popup_rows_full_parse(None):
+            assert all(type(row) is tuple for row in step)
+            rows += len(step)
+        return rows, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_full_parse_peak_memory_stays_flat_as_the_group_grows(workdir):
+    # warms up the selector and parser caches
+    full_parse_peak(workdir, 50)
+    small_rows, small_peak = full_parse_peak(workdir, 200)
+    large_rows, large_peak = full_parse_peak(workdir, 2000)
+    assert small_rows>=200 and large_rows>=2000
+    assert large_peak<small_peak*1.5
+
+
+def test_full_parse_reaches_the_end_of_lists_taller_than_100000px(workdir):
+    members = synthetic_members(1500)
+    driver = FakePopupDriver(members)
+    scraper = make_scraper(driver, workdir, incremental=False)
+    names, mobiles, _ = scraper.get_names_mobile()
+    assert driver.scroll_height>100000
+    assert list(zip(names, mobiles))==members
+
+
+def test_lists_that_render_after_the_scroll_lose_no_rows(workdir):
+    # the lazy popup only shows the new window once the settle wait ran, the bottom rows included
+    members = synthetic_members(500)
+    for incremental in (True, False):
+        driver = FakePopupDriver(members, lazy=True)
+        scraper = make_scraper(driver, workdir, incremental=incremental)
+        names, mobiles, _ = scraper.get_names_mobile()
+        assert list(zip(names, mobiles))==members
@@ -0,0 +1,77 @@
+import functools
+
+from tests.fake_driver import FakeChatListDriver, FakePopupDriver, FakeWhatsAppDriver, ReplayDriver, make_scraper, synthetic_members
+
+
+def record_popup(workdir, members, incremental):
+    driver = FakePopupDriver(members)
+    scraper = make_scraper(driver, workdir, incremental=incremental, record=str(workdir / "recordings"))
+    names, mobiles, is_popup = scraper.get_names_mobile()
+    return scraper.recorder.path, names, mobiles
+
+
+def test_incremental_recording_replays_to_the_same_participants(workdir):
+    members = synthetic_members(300)
+    path, names, mobiles = record_popup(workdir, members, incremental=True)
+    assert list(zip(names, mobiles))==members
+
+    replay = ReplayDriver(path)
+    scraper = make_scraper(replay, workdir, incremental=True)
+    assert scraper.get_names_mobile()==(names, mobiles, True)
+    assert replay.at_last("popup-scroll")
+
+
+def test_full_parse_recording_replays_to_the_same_participants(workdir):
+    members = synthetic_members(300)
+    path, names, mobiles = record_popup(workdir, members, incremental=False)
+    assert list(zip(names, mobiles))==members
+
+    replay = ReplayDriver(path)
+    scraper = make_scraper(replay, workdir, incremental=False)
+    assert scraper.get_names_mobile()==(names, mobiles, True)
+
+
+def test_recording_dir_is_keyed_by_pid(workdir):
+    # pool workers started in the same second write to their own directory
+    import main
+    recorder = main.Recorder(workdir)
+    recorder.snapshot("chat-list", "<html></html>")
+    assert recorder.path.name.endswith(f"-{main.os.getpid()}")
+    assert (recorder.path / "index.jsonl").exists()
+
+
+def test_chat_list_recording_replays_to_the_same_group_names(workdir):
+    rows = [(f"Chat {i}", i%3==0) for i in range(200)]
+    scraper = make_scraper(FakeChatListDriver(rows), workdir, record=str(workdir / "recordings"))
+    group_names = scraper.get_group_names()
+    assert sorted(group_names)==sorted(title for title, is_normal in rows if not is_normal)
+
+    # from an empty index again, so the replay walks the whole list like the recorded run did
+    (workdir / "groupnames.json").unlink()
+    replay = ReplayDriver(scraper.recorder.path)
+    assert make_scraper(replay, workdir).get_group_names()==group_names
+    assert replay.at_last("chat-list") and replay.at_last("chat-list-scroll")
+    assert replay.calls["executeScript"]==len(replay.steps["chat-list"]) + len(replay.steps["chat-list-scroll"]) + 1
+
+
+def search_scraper(driver, workdir, **kwargs):
+    scraper = make_scraper(driver, workdir, **kwargs)
+    # a search without results waits for them until the timeout
+    scraper.get_search_result_titles = functools.partial(scraper.get_search_result_titles, timeout=0.2)
+    return scraper
+
+
+def test_group_search_recording_replays_to_the_same_group(workdir):
+    groups = {"Family": synthetic_members(120), "Family Trip": synthetic_members(30), "Office": synthetic_members(50)}
+    scraper = search_scraper(FakeWhatsAppDriver(groups), workdir, record=str(workdir / "recordings"))
+    assert scraper.find_and_get_group("Family")
+    recorded = scraper.get_names_mobile()
+    assert not scraper.find_and_get_group("Cricket")
+
+    replay = ReplayDriver(scraper.recorder.path)
+    scraper = search_scraper(replay, workdir)
+    assert scraper.find_and_get_group("Family")
+    assert replay.current["stage"]=="group-opened" and replay.current["group_name"]=="Family"
+    assert scraper.get_names_mobile()==recorded
+    assert not scraper.find_and_get_group("Cricket")
+    assert [entry["titles"] for entry in replay.steps["search-results"]]==[["Family", "Family Trip"], []]
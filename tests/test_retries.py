@@ -0,0 +1,109 @@
+import pytest
+
+import main
+from tests.fake_driver import FakeDriver, make_scraper
+
+
+POLICIES = {"flaky": (3, 2, 5)}
+
+
+class Flaky:
+    # fails `failures` times with `error` (or returns `bad`), then returns "ok"
+    def __init__(self, failures, error=main.Retry, bad=None) -> None:
+        self.failures = failures
+        self.error = error
+        self.bad = bad
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls<=self.failures:
+            if self.error is None:
+                return self.bad
+            raise self.error(f"attempt {self.calls}")
+        return "ok"
+
+
+def scheduler(threshold=100, cooldown=60, max_cooldown=900):
+    sleeps = []
+    breaker = main.CircuitBreaker(threshold, cooldown, max_cooldown, sleep=sleeps.append)
+    return main.RetryScheduler(POLICIES, breaker, sleep=sleeps.append), sleeps
+
+
+def test_retries_until_success_with_capped_jittered_backoff():
+    retries, sleeps = scheduler()
+    func = Flaky(3)
+    assert retries.run("flaky", func)=="ok"
+    assert func.calls==4 and retries.attempts["flaky"]==4
+    assert len(sleeps)==3
+    assert all(0<=delay<=cap for delay, cap in zip(sleeps, [2, 4, 5]))
+    assert retries.breaker.failures==0
+
+
+def test_the_budget_is_exhausted_and_the_last_error_raised():
+    retries, sleeps = scheduler()
+    func = Flaky(10)
+    with pytest.raises(main.Retry, match="attempt 4"):
+        retries.run("flaky", func)
+    assert func.calls==4 and len(sleeps)==3
+    assert retries.breaker.failures==4
+
+
+def test_retry_if_gives_back_the_last_value_once_the_budget_is_spent():
+    retries, sleeps = scheduler()
+    assert retries.run("flaky", Flaky(2, error=None, bad=False), retry_if=lambda ok: not ok)=="ok"
+    assert retries.run("flaky", Flaky(10, error=None, bad=False), retry_if=lambda ok: not ok) is False
+
+
+def test_other_errors_are_not_retried():
+    retries, sleeps = scheduler()
+    func = Flaky(1, error=KeyError)
+    with pytest.raises(KeyError):
+        retries.run("flaky", func, retry_on=(TimeoutError,))
+    assert func.calls==1 and sleeps==[]
+
+
+def test_circuit_breaker_pauses_and_doubles_its_cooldown_up_to_the_cap():
+    sleeps = []
+    breaker = main.CircuitBreaker(threshold=3, cooldown=10, max_cooldown=35, sleep=sleeps.append)
+    for _ in range(2):
+        breaker.record(False)
+    breaker.wait()
+    assert sleeps==[] and breaker.opened==0
+
+    cooldowns = []
+    for _ in range(4):
+        # the trial after each pause fails too
+        breaker.record(False)
+        cooldowns.append(breaker.current_cooldown)
+        breaker.wait()
+    assert cooldowns==[10, 20, 35, 35]
+    assert breaker.opened==4 and len(sleeps)==4
+    assert all(cooldown - 1<pause<=cooldown for pause, cooldown in zip(sleeps, cooldowns))
+
+    breaker.record(True)
+    assert breaker.failures==0 and breaker.current_cooldown==10
+    breaker.wait()
+    assert len(sleeps)==4
+
+
+def test_a_failing_run_opens_the_shared_breaker_before_the_next_attempt():
+    retries, sleeps = scheduler(threshold=2, cooldown=30)
+    func = Flaky(3)
+    assert retries.run("flaky", func)=="ok"
+    # backoff, backoff + a 30s pause, backoff + a 60s pause
+    assert [delay for delay in sleeps if delay>5]==pytest.approx([30, 60], abs=1)
+
+
+def test_get_page_retries_page_load_timeouts(workdir):
+    from selenium.common.exceptions import TimeoutException
+    sleeps = []
+    driver = FakeDriver(faults={"get": [TimeoutException("page load"), TimeoutException("page load")]})
+    scraper = make_scraper(driver, workdir)
+    scraper.retries = main.RetryScheduler(breaker=main.CircuitBreaker(sleep=sleeps.append), sleep=sleeps.append)
+    assert scraper.get_page("https://web.whatsapp.com/", "WhatsApp")
+    assert driver.calls["get"]==3 and len(sleeps)==2
+
+    driver.faults["get"] = [TimeoutException("page load")]*10
+    assert not scraper.get_page("https://web.whatsapp.com/", "WhatsApp")
+    assert driver.calls["get"]==3 + main.RETRY_POLICIES["get_page"][0] + 1
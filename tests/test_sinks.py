@@ -0,0 +1,90 @@
+import csv
+import json
+
+import pytest
+
+import main
+from tests.fake_driver import fake_pool_timings, fake_pool_worker, synthetic_members, write_fake_account
+
+
+def read_export(path):
+    if path.suffix==".csv":
+        with open(path, "r", encoding="UTF-8", newline="") as fp:
+            return [tuple(row) for row in csv.reader(fp)][1:]
+    if path.suffix==".jsonl":
+        with open(path, "r", encoding="UTF-8") as fp:
+            return [(row["Name"], row["Mobile"]) for row in map(json.loads, fp)]
+    if path.suffix==".parquet":
+        import pyarrow.parquet
+        table = pyarrow.parquet.read_table(str(path))
+        return list(zip(table.column("Name").to_pylist(), table.column("Mobile").to_pylist()))
+    import openpyxl
+    workbook = openpyxl.load_workbook(str(path), read_only=True)
+    try:
+        return [tuple(row) for row in workbook.worksheets[0].iter_rows(min_row=2, values_only=True)]
+    finally:
+        workbook.close()
+
+
+def export(sink, group_name, rows, abort=False):
+    sink.start_group(group_name, group_name)
+    for name, mobile in rows:
+        sink.write(name, mobile)
+    if abort:
+        sink.abort_group()
+    else:
+        sink.end_group()
+
+
+@pytest.mark.parametrize("output_format", ["csv", "jsonl", "parquet", "xlsx"])
+def test_an_aborted_group_keeps_the_last_good_export(tmp_path, output_format):
+    pytest.importorskip({"parquet": "pyarrow", "xlsx": "pandas"}.get(output_format, "csv"))
+    sink = main.OUTPUT_FORMATS[output_format](tmp_path)
+    good = synthetic_members(50)
+    export(sink, "Family", good)
+    path = tmp_path / f"Family.{output_format}"
+    assert read_export(path)==good
+
+    # a re-scrape that fails halfway
+    export(sink, "Family", synthetic_members(20), abort=True)
+    assert read_export(path)==good
+    assert sorted(p.name for p in tmp_path.iterdir())==[path.name]
+
+    export(sink, "Family", synthetic_members(70))
+    assert read_export(path)==synthetic_members(70)
+    assert sorted(p.name for p in tmp_path.iterdir())==[path.name]
+    sink.close()
+
+
+def test_an_aborted_group_leaves_no_sheet_in_the_workbook(tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    sink = main.WorkbookSink(tmp_path, "participants.xlsx")
+    export(sink, "Family", synthetic_members(3))
+    export(sink, "Office", synthetic_members(5), abort=True)
+    export(sink, "Cricket", synthetic_members(2))
+    sink.close()
+    workbook = openpyxl.load_workbook(str(tmp_path / "participants.xlsx"), read_only=True)
+    assert workbook.sheetnames==["Family", "Cricket"]
+    assert len(list(workbook["Cricket"].iter_rows(values_only=True)))==3
+    workbook.close()
+
+
+def test_pool_workers_workbooks_are_merged_into_one(workdir):
+    openpyxl = pytest.importorskip("openpyxl")
+    groups = {f"Group {i}": synthetic_members(10 + i) for i in range(6)}
+    (workdir / "groups.txt").write_text("\n".join(groups), encoding="UTF-8")
+    (workdir / "settings.config").write_bytes((main.Path(__file__).resolve().parent.parent / "settings.config").read_bytes())
+    write_fake_account(groups, workers=3)
+    processed, failed = main.run_pool(3, {"groups_file": str(workdir / "groups.txt")}, worker=fake_pool_worker, use_cache=False, contact_index=False, output_format="workbook")
+    fake_pool_timings(workdir)
+    assert (processed, failed)==(6, [])
+
+    workbooks = list((workdir / "data").glob("*.xlsx"))
+    assert len(workbooks)==1 and "worker" not in workbooks[0].name
+    workbook = openpyxl.load_workbook(str(workbooks[0]), read_only=True)
+    try:
+        assert sorted(workbook.sheetnames)==sorted(groups)
+        for title, members in groups.items():
+            assert [tuple(row) for row in workbook[title].iter_rows(min_row=2, values_only=True)]==members
+    finally:
+        workbook.close()
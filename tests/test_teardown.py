@@ -0,0 +1,80 @@
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+import psutil
+
+import main
+from tests.fake_driver import FakeDriver, make_scraper
+
+
+# a chromedriver that starts a browser with two renderers
+FAKE_CHROMEDRIVER = """
+import subprocess, sys, time
+browser = subprocess.Popen([sys.executable, "-c", "import subprocess, sys, time; [subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)']) for _ in range(2)]; time.sleep(60)"])
+time.sleep(60)
+"""
+
+
+class ChromedriverBackedDriver(FakeDriver):
+    def __init__(self) -> None:
+        super().__init__()
+        process = subprocess.Popen([sys.executable, "-c", FAKE_CHROMEDRIVER])
+        self.service = SimpleNamespace(process=process)
+        driver = psutil.Process(process.pid)
+        deadline = time.time() + 20
+        while len(driver.children(recursive=True))<3 and time.time()<deadline:
+            time.sleep(0.05)
+        self.tree = [driver] + driver.children(recursive=True)
+        assert len(self.tree)==4
+
+
+def host_processes(count):
+    processes = [subprocess.Popen(["sleep", "60"]) for _ in range(count)]
+    # started and idle, so they only add to the process table
+    deadline = time.time() + 20
+    while any(psutil.Process(process.pid).name()!="sleep" for process in processes) and time.time()<deadline:
+        time.sleep(0.05)
+    return processes
+
+
+def teardown_seconds(workdir):
+    driver = ChromedriverBackedDriver()
+    scraper = make_scraper(driver, workdir)
+    scraper.record_browser_processes()
+    assert sorted(process.pid for process in scraper.browser_processes)==sorted(process.pid for process in driver.tree)
+    started = time.perf_counter()
+    scraper.kill_browser_process()
+    elapsed = time.perf_counter() - started
+    driver.service.process.wait(5)
+    assert not any(process.is_running() and process.status()!=psutil.STATUS_ZOMBIE for process in driver.tree)
+    assert scraper.browser is None and scraper.browser_processes==[]
+    return elapsed
+
+
+def test_teardown_time_does_not_grow_with_the_host_process_count(workdir):
+    few = teardown_seconds(workdir)
+    others = host_processes(150)
+    try:
+        many = teardown_seconds(workdir)
+        # only the recorded tree is touched
+        assert all(process.poll() is None for process in others)
+    finally:
+        for process in others:
+            process.kill()
+        for process in others:
+            process.wait()
+    assert many<few + 0.5
+
+
+def test_processes_ignoring_terminate_are_killed_after_the_grace_period(workdir, monkeypatch):
+    monkeypatch.setattr(main, "BROWSER_EXIT_GRACE", 0.5)
+    stubborn = subprocess.Popen([sys.executable, "-c", "import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); print(flush=True); time.sleep(60)"], stdout=subprocess.PIPE)
+    stubborn.stdout.readline()
+    scraper = make_scraper(FakeDriver(), workdir)
+    started = time.perf_counter()
+    scraper.terminate_browser_processes([psutil.Process(stubborn.pid)])
+    # psutil reaped it, it is gone rather than a zombie
+    assert not psutil.pid_exists(stubborn.pid)
+    assert 0.5<=time.perf_counter() - started<3
@@ -0,0 +1,111 @@
+import json
+
+import pytest
+
+import main
+from tests.node import requires_node, run_node
+
+
+# A virtualized list: `count` rows of `row_height` px in a scroller `viewport` px tall that renders only the rows
+# in view plus `buffer` rows either side, in reverse DOM order like WhatsApp's absolutely positioned rows
+FIXTURE = """
+var count = %(count)d, rowHeight = %(row_height)d, viewport = %(viewport)d, buffer = %(buffer)d;
+var scroller = {
+    clientHeight: viewport, scrollHeight: count*rowHeight, top: 0, isConnected: true, parentElement: null,
+    get scrollTop() { return this.top; },
+    set scrollTop(value) { this.top = Math.max(0, Math.min(value, Math.max(0, count*rowHeight - viewport))); }
+};
+var list = {parentElement: scroller};
+global.getComputedStyle = function (node) { return {overflowY: node === scroller ? "auto" : "visible"}; };
+global.window = {};
+function rendered() {
+    var first = Math.max(0, Math.floor(scroller.top/rowHeight) - buffer);
+    var last = Math.min(count - 1, Math.floor((scroller.top + viewport)/rowHeight) + buffer);
+    var items = [];
+    for (var i = last; i >= first; i--) { items.push(item(i)); }
+    return items;
+}
+function item(i) {
+    var fields = {};
+    fields[%(name_selector)s] = {textContent: "Member " + i};
+    fields[%(mobile_selector)s] = {textContent: "+91 " + (9000000000 + i)};
+    return {
+        parentElement: list,
+        getBoundingClientRect: function () { return {top: i*rowHeight - scroller.top, bottom: (i + 1)*rowHeight - scroller.top, height: rowHeight}; },
+        querySelector: function (selector) { return fields[selector] || null; }
+    };
+}
+global.document = {querySelectorAll: function (selector) { return selector === %(item_selector)s ? rendered() : []; }};
+var step = function () { %(script)s };
+function call(reset, startTop) {
+    return JSON.parse(step.apply(null, [%(item_selector)s, %(fields)s, "popup", reset, startTop]));
+}
+"""
+
+
+def walk(count, row_height=72, viewport=600, buffer=3, start_top=None):
+    fixture = FIXTURE % {
+        "count": count, "row_height": row_height, "viewport": viewport, "buffer": buffer,
+        "script": main.VIRTUAL_LIST_SCRIPT,
+        "item_selector": json.dumps(main.POPUP_LISTITEM_SELECTOR),
+        "fields": json.dumps(main.POPUP_FIELDS),
+        "name_selector": json.dumps(main.PARTICIPANT_NAME_SELECTOR),
+        "mobile_selector": json.dumps(main.PARTICIPANT_MOBILE_SELECTOR),
+    }
+    return run_node(fixture + """
+var start = %s, results = [], result = null;
+if (start !== null) { results.push(call(true, start)); }
+do {
+    result = call(results.length === 0, null);
+    results.push(result);
+} while (!result.atEnd && results.length < 10000);
+console.log(JSON.stringify(results));
+""" % json.dumps(start_top))
+
+
+def members(indexes):
+    return [[f"Member {i}", f"+91 {9000000000 + i}"] for i in indexes]
+
+
+@requires_node
+@pytest.mark.parametrize("count, viewport, buffer", [(1000, 600, 3), (1000, 300, 0), (7, 600, 0), (1, 600, 3)])
+def test_walk_returns_every_row_once_in_order(count, viewport, buffer):
+    results = walk(count, viewport=viewport, buffer=buffer)
+    assert [row for result in results for row in result["rows"]]==members(range(count))
+    assert results[-1]["atEnd"]
+
+
+@requires_node
+def test_each_step_moves_one_rendered_window_less_a_row():
+    results = walk(1000, viewport=600, buffer=3)
+    # 600px of viewport plus 3 buffer rows above and below (none above at the top)
+    assert results[0]["rowHeight"]==72
+    assert results[0]["step"]==(600//72 + 1 + 3)*72 - 72
+    assert all(result["moved"] for result in results[:-1])
+    # about one step per window of new rows
+    assert len(results)<=1000*72//(600 - 72) + 2
+
+
+@requires_node
+def test_walk_resumes_from_a_scroll_offset():
+    results = walk(1000, viewport=600, buffer=3, start_top=36000)
+    assert results[0]=={"rows": [], "top": 36000, "step": 0, "rowHeight": 0, "atEnd": False, "moved": True}
+    assert [row for result in results for row in result["rows"]]==members(range(36000//72 - 3, 1000))
+
+
+@requires_node
+def test_a_fixed_800px_step_loses_rows_when_less_than_800px_are_rendered():
+    # what the old popup loop did: scroll 800px and read whatever is rendered
+    fixture = FIXTURE % {
+        "count": 1000, "row_height": 72, "viewport": 300, "buffer": 0, "script": "", "item_selector": json.dumps("li"),
+        "fields": "[]", "name_selector": json.dumps("name"), "mobile_selector": json.dumps("mobile"),
+    }
+    rows = run_node(fixture + """
+var seen = {};
+for (var y = 0; y < count*rowHeight; y += 800) {
+    scroller.scrollTop = y;
+    rendered().forEach(function (item) { seen[item.querySelector("name").textContent] = 1; });
+}
+console.log(JSON.stringify(Object.keys(seen).length));
+""")
+    assert rows<1000